@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+
+"""The BenchmarkSuite module times the game's hot paths: Pitcher.pitch(),
+Batter.get_pitch_outcome_code(), StrikeZone updates and drawing, loading a
+POPZ table from JSON, full Plate Appearances and games (interactive
+with scripted input and no pauses, and headless), and the game snapshots
+autosaved after every pitch. Each benchmark reports
+operations per second (best of several timeit runs) and the memory
+allocated while running it (with tracemalloc). Results can be saved as a
+baseline, and later runs flag any benchmark that is slower or allocates
+more than the baseline by more than a threshold. Run it from the
+strikezone-arcade-21 directory:
+    python3 -m benchmarks.benchmarksuite
+    python3 -m benchmarks.benchmarksuite --save-baseline"""
+
+
+# -------------------- Import Modules -------------------- #
+import argparse
+import builtins
+import contextlib
+import json
+import os
+import os.path
+import platform
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from players.batter import Batter
+from players.pitcher import Pitcher, pitch_zones
+from game_structure.loadgame import create_pitchers, create_baseball_teams
+from game_structure.strikezone import StrikeZone
+from game_structure.pacing import PacingClock
+from game_structure.plateappearance import PlateAppearance
+from game_structure.baseballgame import BaseballGame
+from game_structure.gamesnapshot import GameAutosave, pack_snapshot
+from game_structure.simulation import simulate_plate_appearance, simulate_game, RandomPitchPolicy
+from game_structure.renderer import default_screen_rows
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Baseline results, next to this file
+baseline_filename = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# A benchmark regresses if it is this much slower, or allocates this much more, than its baseline
+default_threshold = 0.25
+
+# Number of timeit runs, the best of which is reported
+default_repeat = 5
+
+# Every benchmark, in the order they are run. Filled in by the benchmark decorator below.
+benchmarks = {}
+
+# Benchmarks whose speed varies a lot from run to run (whole interactive Plate Appearances
+# and games, and disk writes), and how many times the threshold they are allowed
+noisy_benchmarks = set()
+noisy_threshold_factor = 2
+
+
+
+
+# -------------------- Benchmark Helpers -------------------- #
+
+class NullTerminal:
+    """A stand-in for the terminal that throws away everything written to it,
+    so drawing is measured without the cost of a real terminal."""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return True
+
+
+class ScriptedInput:
+    """A stand-in for input() that answers pitch command prompts with random
+    pitch commands and every other prompt with enter."""
+
+    def __init__(self, pitcher, seed=0):
+        self.rng = random.Random(seed)
+        self.commands = [pitch_type[0] + zone.strip('zone') for pitch_type in pitcher.pitch_types for zone in pitch_zones]
+
+    def __call__(self, prompt=''):
+        if 'pitch command' in prompt:
+            return self.rng.choice(self.commands)
+        return ''
+
+
+@contextlib.contextmanager
+def interactive_session(pitcher, seed=0):
+    """Run the interactive game with scripted input and without console output.
+    The screen is a standard terminal's height, whatever the terminal running the
+    benchmarks, so the at bat screen is drawn with the same layout on every machine."""
+    real_input = builtins.input
+    real_lines = os.environ.get('LINES')
+    builtins.input = ScriptedInput(pitcher, seed)
+    os.environ['LINES'] = str(default_screen_rows)
+    try:
+        with contextlib.redirect_stdout(NullTerminal()):
+            yield
+    finally:
+        builtins.input = real_input
+        if real_lines is None:
+            del os.environ['LINES']
+        else:
+            os.environ['LINES'] = real_lines
+
+def benchmark(name, noisy=False):
+    """Decorator that adds a benchmark to the suite. A benchmark is a function
+    taking the shared fixtures dictionary and returning the function to time.
+    A noisy benchmark is only flagged when it is noisy_threshold_factor times
+    further below its baseline speed than the threshold."""
+    def add_benchmark(setup):
+        benchmarks[name] = setup
+        if noisy:
+            noisy_benchmarks.add(name)
+        return setup
+    return add_benchmark
+
+def game_in_progress(fixtures):
+    """Return a BaseballGame that has faced a lineup's worth of batters and the
+    PlateAppearance in progress after its first pitch, as a snapshot would find them."""
+    pitcher, team, instant = fixtures['pitcher'], fixtures['team'], fixtures['instant']
+    game = BaseballGame(pitcher, team, seed=0, clock=instant, announce=False)
+    for i in range(len(team.players)):
+        batter, batting_spot = game.next_batter()
+        this_PA = game.new_plate_appearance(batter)
+        while this_PA.PA_outcome == '':
+            this_PA.deliver_pitch(this_PA.get_pitch('F5'))
+        game.score_plate_appearance(this_PA, batting_spot)
+    batter, batting_spot = game.next_batter()
+    this_PA = game.new_plate_appearance(batter)
+    this_PA.deliver_pitch(this_PA.get_pitch('B13'))
+    return game, this_PA
+
+def create_fixtures():
+    """Load the Pitcher, team and Batter shared by the benchmarks."""
+    pitcher = create_pitchers()['Clayton Kershaw']
+    team = create_baseball_teams()['Seattle Mariners']
+    return {'pitcher': pitcher,
+            'team': team,
+            'batter': Batter(team.players[0]),
+            'instant': PacingClock('instant')}
+
+
+
+
+# -------------------- Benchmarks -------------------- #
+
+@benchmark('pitcher_pitch')
+def bench_pitcher_pitch(fixtures):
+    pitcher, batter = fixtures['pitcher'], fixtures['batter']
+    return lambda: pitcher.pitch('Fastball', 'zone5', batter)
+
+@benchmark('pitcher_pitch_uncached')
+def bench_pitcher_pitch_uncached(fixtures):
+    pitcher, batter = fixtures['pitcher'], fixtures['batter']
+    def run():
+        pitcher.invalidate_pitch_cache()
+        pitcher.pitch('Fastball', 'zone5', batter)
+    return run
+
+@benchmark('get_pitch_outcome')
+def bench_get_pitch_outcome(fixtures):
+    batter = fixtures['batter']
+    the_pitch = fixtures['pitcher'].pitch('Breaking', 'zone12', batter)
+    rng = random.Random(0)
+    return lambda: batter.get_pitch_outcome_code(the_pitch, rng)
+
+@benchmark('strikezone_update')
+def bench_strikezone_update(fixtures):
+    pitches = [fixtures['pitcher'].pitch('Fastball', zone, fixtures['batter']) for zone in pitch_zones]
+    def run():
+        strikezone = StrikeZone()
+        for the_pitch in pitches:
+            strikezone.update_strikezone(the_pitch, 'Ball')
+            strikezone.update_strikezone(the_pitch, 'Called Strike')
+    return run
+
+@benchmark('strikezone_str')
+def bench_strikezone_str(fixtures):
+    strikezone = StrikeZone()
+    for zone in pitch_zones:
+        strikezone.update_strikezone(fixtures['pitcher'].pitch('Fastball', zone, fixtures['batter']), 'Ball')
+    return lambda: str(strikezone)
+
+@benchmark('load_popz_from_json')
+def bench_load_popz_from_json(fixtures):
+    def run():
+        pitcher = Pitcher('Clayton', 'Kershaw', 'Los Angeles', 'Dodgers')
+        pitcher.load_popz_from_json()
+    return run
+
+@benchmark('plate_appearance_interactive', noisy=True)
+def bench_plate_appearance_interactive(fixtures):
+    pitcher, batter, instant = fixtures['pitcher'], fixtures['batter'], fixtures['instant']
+    rng = random.Random(0)
+    def run():
+        with interactive_session(pitcher):
+            PlateAppearance(pitcher, batter, rng=rng, clock=instant).at_bat()
+    return run
+
+@benchmark('plate_appearance_headless')
+def bench_plate_appearance_headless(fixtures):
+    pitcher, batter = fixtures['pitcher'], fixtures['batter']
+    policy = RandomPitchPolicy()
+    rng = random.Random(0)
+    return lambda: simulate_plate_appearance(pitcher, batter, policy, rng)
+
+@benchmark('game_interactive', noisy=True)
+def bench_game_interactive(fixtures):
+    pitcher, team, instant = fixtures['pitcher'], fixtures['team'], fixtures['instant']
+    def run():
+        with interactive_session(pitcher):
+            BaseballGame(pitcher, team, seed=0, clock=instant).play_ball()
+    return run
+
+@benchmark('game_headless')
+def bench_game_headless(fixtures):
+    pitcher, team = fixtures['pitcher'], fixtures['team']
+    rng = random.Random(0)
+    return lambda: simulate_game(pitcher, team, rng=rng)
+
+@benchmark('snapshot_pack')
+def bench_snapshot_pack(fixtures):
+    game, this_PA = game_in_progress(fixtures)
+    return lambda: pack_snapshot(game, this_PA)
+
+@benchmark('snapshot_autosave', noisy=True)
+def bench_snapshot_autosave(fixtures):
+    game, this_PA = game_in_progress(fixtures)
+    autosave = GameAutosave(game, os.path.join(tempfile.gettempdir(), 'strikezone_benchmark.sav'))
+    return lambda: autosave.save(this_PA)
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def measure(function, repeat=default_repeat):
+    """Time a function and measure its memory use. Returns a dictionary with:
+     - 'ops_per_sec': calls per second, from the best of repeat timeit runs
+     - 'peak_kb': the most memory allocated at once while calling it (in KB)
+     - 'retained_bytes_per_op': memory still allocated afterwards, per call"""
+
+    # Warm up caches first, so that every run measures the same work
+    function()
+
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    best = min([elapsed] + timer.repeat(repeat=repeat - 1, number=number))
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for i in range(number):
+            function()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'ops_per_sec': number / best,
+            'peak_kb': (peak - before) / 1024,
+            'retained_bytes_per_op': max(0, after - before) / number}
+
+def run_benchmarks(names=None, repeat=default_repeat):
+    """Run the benchmarks in names (all of them by default).
+    Returns a dictionary of {benchmark name: measure() result}."""
+    fixtures = create_fixtures()
+    results = {}
+    for name, setup in benchmarks.items():
+        if names is None or name in names:
+            results[name] = measure(setup(fixtures), repeat)
+    return results
+
+def load_baseline(filename=baseline_filename):
+    """Return the saved baseline results, or an empty dictionary if there are none."""
+    try:
+        with open(filename, 'r') as infile:
+            return json.load(infile)['results']
+    except FileNotFoundError:
+        return {}
+
+def save_baseline(results, filename=baseline_filename):
+    """Save benchmark results as the baseline, with the Python version and machine they ran on."""
+    with open(filename, 'w+') as outfile:
+        json.dump({'python': platform.python_version(),
+                    'machine': platform.machine(),
+                    'results': results},
+                    outfile, indent=1, sort_keys=True)
+
+def find_regressions(results, baseline, threshold=default_threshold):
+    """Compare results to the baseline. Returns a list of messages, one for each
+    benchmark that is slower or allocates more memory by more than the threshold
+    (or, for the speed of noisy benchmarks, noisy_threshold_factor times the threshold)."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        speed_threshold = threshold * noisy_threshold_factor if name in noisy_benchmarks else threshold
+        if result['ops_per_sec'] < base['ops_per_sec'] * (1 - speed_threshold):
+            regressions.append(f"{name}: {result['ops_per_sec']:.0f} ops/sec, "
+                                f"baseline {base['ops_per_sec']:.0f} ops/sec")
+        # Ignore small peaks, which vary from run to run
+        if result['peak_kb'] > max(base['peak_kb'] * (1 + threshold), base['peak_kb'] + 4):
+            regressions.append(f"{name}: {result['peak_kb']:.1f} KB peak, baseline {base['peak_kb']:.1f} KB")
+    return regressions
+
+
+
+
+# -------------------- Command Line Access -------------------- #
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of StrikeZone Arcade '21.")
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default: all): {', '.join(benchmarks)}")
+    parser.add_argument('--baseline', default=baseline_filename, help='baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='save these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=default_threshold,
+                        help='fraction slower (or more memory) than the baseline that counts as a regression')
+    parser.add_argument('--repeat', type=int, default=default_repeat, help='timeit runs per benchmark')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in benchmarks]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.names or None, args.repeat)
+    baseline = load_baseline(args.baseline)
+
+    # Report the results next to the baseline
+    print(f"{'benchmark':<30} {'ops/sec':>12} {'baseline':>12} {'peak KB':>9} {'retained B/op':>14}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        base_ops = f"{base['ops_per_sec']:.0f}" if base else '-'
+        print(f"{name:<30} {result['ops_per_sec']:>12.0f} {base_ops:>12} "
+                f"{result['peak_kb']:>9.1f} {result['retained_bytes_per_op']:>14.1f}")
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+    else:
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%} "
+                    f"({args.threshold * noisy_threshold_factor:.0%} slower for {', '.join(sorted(noisy_benchmarks))}):")
+            for message in regressions:
+                print(f"    {message}")
+            sys.exit(1)
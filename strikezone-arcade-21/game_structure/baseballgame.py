@@ -3,17 +3,33 @@
 """The BaseballGame class is modeled after a real-life baseball game
 but is translated to arcade-style gameplay. It initializes the game's
 objects such as baseball Players, the user's score, Mound Visits, etc.
-Currently, the only method is to Play Ball, which creates a new
-PlateAppearance for each batter, checks for when MoundVisits should
-occur, and progresses through the game."""
+The main method is to Play Ball, which creates a new PlateAppearance
+for each batter, checks for when MoundVisits should occur, and
+progresses through the game. Each of these steps is also a method of
+its own, so the game server can drive the same game without a console.
+A game can be autosaved after every pitch and resumed from its snapshot."""
 
 
 # -------------------- Import Modules -------------------- #
-import time
+import random
 
 from players.batter import Batter
+from game_structure import pacing
+from game_structure.instrumentation import instruments
+from game_structure.gamestats import GameStats
+from game_structure.gamesnapshot import GameAutosave, restore_snapshot
 from game_structure.plateappearance import PlateAppearance
 from game_structure.moundvisit import MoundVisit
+from game_structure.sessioncontext import SessionContext
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Messages that applaud the user after this many batters in a game
+batter_milestones = {10: "Well done! You've encountered 10 batters and you're still going! Keep it up!",
+                    20: "Wow, 20 batters! How's the arm? Keep going!",
+                    30: "Woah. 30 batters. Buy me some peanuts and cracker jacks!"}
+
 
 
 # -------------------- BaseballGame Class -------------------- #
@@ -23,11 +39,17 @@ class BaseballGame:
     real-life baseball game. After input is validated, the user's Pitcher
     is instantiated along with the opposing team's batters in their proper
     batting lineup order. Other game information such as the player's score
-    and mound visits are set to starting values."""
+    and mound visits are set to starting values.
+    The game belongs to a SessionContext, which counts its games and Plate
+    Appearances and holds its pitch settings. Without one, the game gets a
+    SessionContext of its own.
+    With an autosave filename, a snapshot of the game is saved after every
+    pitch and batter. A game created from a snapshot (with the snapshot's
+    seed, pitcher and team) continues where the snapshot was taken."""
 
-    games_played = 0
-
-    def __init__(self, pitcher = None, opponent = None):
+    def __init__(self, pitcher = None, opponent = None, pitch_advisor = None, seed = None, recorder = None,
+                clock = None, event_store = None, announce = True, context = None, autosave = None,
+                snapshot = None):
         
         # Validate parameters
         if pitcher is None or opponent is None:
@@ -36,17 +58,39 @@ class BaseballGame:
 
         # Commence game
         else:
+            # Pauses use the given PacingClock, or the game's shared clock
+            self.clock = clock if clock is not None else pacing.clock
+
+            # Session this game belongs to, and the seed drawn from it if none is given
+            self.context = context if context is not None else SessionContext()
+            if snapshot is not None:
+                seed = snapshot.game_id
+            elif seed is None:
+                seed = self.context.new_game_seed()
+
             # Initialize players
             self.pitcher = pitcher
             self.opponent = opponent
             self.batting_order = self.opponent.players
             self.batting_order_index = 0
 
-            # Increment number of games played
-            BaseballGame.games_played += 1
+            # Optional pitch-selection policy that shows a pitch hint during at bats
+            self.pitch_advisor = pitch_advisor
 
-            # Initialize trackers
-            self.outcome_history = []
+            # Seeded random number generator for pitch outcomes, so the game can be replayed,
+            # and an optional GameRecorder that logs every pitch
+            self.rng = random.Random(seed)
+            self.recorder = recorder
+
+            # Optional PitchEventStore that every pitch is appended to, using the seed as the game id
+            self.event_store = event_store
+            self.game_id = seed
+
+            # Increment number of games played in this session
+            self.context.games_played += 1
+
+            # Initialize live game statistics
+            self.stats = GameStats()
             
             # Begin game with:
             # - 0 Player Points
@@ -55,20 +99,148 @@ class BaseballGame:
             self.mound_visits = 3
             self.mound_visit_break = 3
 
-            # Welcome the user to the game and bring in the game announcer
-            # Begin game intro
-            print()
-            print('--------------------------------------------------------------------------------')
-            print()
-            print('"Welcome everyone to today\'s game!"')
-            time.sleep(0.5)
-            print(f'"Tonight we have {self.pitcher.first_name} {self.pitcher.last_name} pitching against the {self.opponent}!"\n')
-            time.sleep(0.5)
-            print(f'"{self.pitcher.last_name} is a real ace, we are expecting great things from him today."\n')
-            print()
-            print('--------------------------------------------------------------------------------')
-            print()
-            time.sleep(1)
+            # Optional GameAutosave that keeps a snapshot of the game on disk
+            self.autosave = GameAutosave(self, autosave) if autosave is not None else None
+
+            # Continue a game from its snapshot, including the Plate Appearance in progress
+            self.resumed = snapshot is not None
+            self.resumed_PA = restore_snapshot(self, snapshot) if snapshot is not None else None
+
+            # Welcome the user to the game and bring in the game announcer,
+            # unless the caller presents the intro itself (e.g. the game server)
+            if announce:
+                self.play_script(self.intro_script())
+
+    def play_script(self, script):
+        """This method plays a script (see intro_script()) on the console,
+        printing its lines and pausing with the game's clock."""
+        for step in script:
+            if isinstance(step, str):
+                print(step)
+            else:
+                self.clock.sleep(step)
+
+    def intro_script(self):
+        """This method returns the game intro as a script: a list of lines to
+        print and pauses (numbers of seconds) in between."""
+        if self.resumed:
+            return ['',
+                    '--------------------------------------------------------------------------------',
+                    '',
+                    '"Welcome back to the ballpark, folks!"',
+                    0.5,
+                    f'"{self.pitcher.first_name} {self.pitcher.last_name} returns to the mound against the {self.opponent}."\n',
+                    0.5,
+                    f'"The score is {self.player_score}, with {self.mound_visits} Mound Visits left."\n',
+                    '',
+                    '--------------------------------------------------------------------------------',
+                    '',
+                    1]
+        return ['',
+                '--------------------------------------------------------------------------------',
+                '',
+                '"Welcome everyone to today\'s game!"',
+                0.5,
+                f'"Tonight we have {self.pitcher.first_name} {self.pitcher.last_name} pitching against the {self.opponent}!"\n',
+                0.5,
+                f'"{self.pitcher.last_name} is a real ace, we are expecting great things from him today."\n',
+                '',
+                '--------------------------------------------------------------------------------',
+                '',
+                1]
+
+    def batter_up_script(self, batter, resumed = False):
+        """This method returns the script that brings a batter up to bat, or back up to
+        bat for the Plate Appearance of a resumed game."""
+        stepping_up = 'Back up to bat' if resumed else 'Stepping up to bat'
+        return [f"{stepping_up}: {batter.first_name} {batter.last_name}, Batting Avg: {batter.bat_avg}", 2]
+
+    def outcome_script(self, this_outcome):
+        """This method returns the script that announces a scored Plate Appearance,
+        given the outcome dictionary from score_plate_appearance()."""
+        return ['',
+                f"It's a {this_outcome['outcome']}! Points: {this_outcome['score']}",
+                f"New user score: {self.player_score}",
+                '',
+                1, '3', 1, '2', 1, '1',
+                "\nBatter Up!"]
+
+    def milestone_script(self):
+        """This method returns the script that applauds the user after 10, 20 and 30
+        batters in this game, or an empty script if it is not a milestone."""
+        message = self.milestone_message()
+        if message is None:
+            return []
+        return ['', message, 3, '']
+
+    def end_script(self, user_quit):
+        """This method returns the script that ends the game, either because
+        the user quit or because they are out of Mound Visits."""
+        if user_quit:
+            script = ['', "You quit the game.", '', 1]
+        else:
+            script = ['', "You are out of Mound Visits", "       GAME OVER!", '', '']
+        return script + [f"Final score: {self.player_score}", *self.stats.summary_lines(), 3,
+                        '', "Returning to Main Menu...", 2]
+
+    def next_batter(self):
+        """This method moves the batting order on to the next batter, returning to the
+        first batter after the last one. It returns the Batter and their batting order spot."""
+
+        # Loop through batting lineup
+        # Batting order returns to the first batter after the last batter
+        if self.batting_order_index  == len(self.batting_order):
+            self.batting_order_index = 0
+        
+        # Report the new batter to the recorder (before the batting order moves on)
+        if self.recorder is not None:
+            self.recorder.record_batter_up(self)
+
+        # Create Batter from player at this batting order index
+        batter = Batter(self.batting_order[self.batting_order_index])
+        batting_spot = self.batting_order_index
+        self.batting_order_index += 1
+        self.mound_visit_break -= 1
+        return batter, batting_spot
+
+    def new_plate_appearance(self, batter, renderer = None):
+        """This method creates the PlateAppearance of a batter with this game's state."""
+        return PlateAppearance(self.pitcher, batter, self.player_score, self.mound_visits, self.stats,
+                                self.pitch_advisor, self.rng, self.recorder, self.clock, renderer,
+                                event_store=self.event_store, game_id=self.game_id, context=self.context,
+                                autosave=self.autosave)
+
+    def score_plate_appearance(self, this_PA, batting_spot):
+        """This method scores a finished PlateAppearance, adding its outcome to the game
+        statistics and its points to the player's score. It returns the outcome dictionary
+        from PlateAppearance.score_at_bat(), which is empty if the PA had no outcome."""
+        this_outcome = this_PA.score_at_bat()
+        if this_outcome != {}:
+            self.stats.record_plate_appearance(this_outcome['outcome'], this_outcome['score'], batting_spot)
+            self.player_score += this_outcome['score']
+        return this_outcome
+
+    def mound_visit_due(self):
+        """This method returns the "reason" string if the manager should come out
+        for a Mound Visit, in the form of "the base hits" or "your low score", or None."""
+        return self.stats.mound_visit_reason(self.mound_visit_break, self.player_score)
+
+    def use_mound_visit(self):
+        """This method uses up a Mound Visit and restarts the break before the next one is checked for."""
+        if self.recorder is not None:
+            self.recorder.record_mound_visit()
+        self.mound_visits -= 1
+        self.mound_visit_break = 3
+
+    def milestone_message(self):
+        """This method returns the message that applauds the user for the number
+        of batters they have faced in this game, or None if it is not a milestone."""
+        return batter_milestones.get(self.stats.batters_faced)
+
+    def quit_game(self):
+        """This method records that the user quit the game."""
+        if self.recorder is not None:
+            self.recorder.record_quit()
             
 
     def play_ball(self):
@@ -80,134 +252,92 @@ class BaseballGame:
         # Game continues until the player is out of mound visits or the user quits
         user_quit = False
 
+        # Time each phase of this game if instrumentation is on
+        instruments.begin_game(self.game_id)
+
+        started = instruments.start()
         proceed = input('Press enter to continue (q to quit). ')
+        instruments.stop('input', started)
         # If the user quits, return False to the MainMenu so it knows how to handle
         if proceed.lower() in ['q', 'quit', 'exit']:
             user_quit = True
+            self.quit_game()
 
         # Main loop that creates new PlateAppearances for each batter
         # and updates game information like the player's score
         while True and not user_quit:
             print()
             if self.mound_visits == 0:
-                print()
-                print("You are out of Mound Visits")
-                print("       GAME OVER!")
-                print()
-                print()
-                print(f"Final score: {self.player_score}")
-                time.sleep(3)
-                print()
-                print("Returning to Main Menu...")
-                time.sleep(2)
+                # A finished game cannot be resumed
+                if self.autosave is not None:
+                    self.autosave.discard()
+                self.play_script(self.end_script(user_quit))
                 break
             else:
-                
-                # Loop through batting lineup
-                # Batting order returns to the first batter after the last batter
-                if self.batting_order_index  == len(self.batting_order):
-                    self.batting_order_index = 0
-                
-                # Create Batter from player at this batting order index
-                batter = Batter(self.batting_order[self.batting_order_index])
-                self.batting_order_index += 1
-                self.mound_visit_break -= 1
-                print(f"Stepping up to bat: {batter.first_name} {batter.last_name}, Batting Avg: {batter.bat_avg}")
-                time.sleep(2)
-
-                # Create Plate Appearance
-                this_PA = PlateAppearance(self.pitcher, batter, self.player_score, self.mound_visits, self.outcome_history)
+
+                # Continue the Plate Appearance of a resumed game
+                if self.resumed_PA is not None:
+                    this_PA, self.resumed_PA = self.resumed_PA, None
+                    batter, batting_spot = this_PA.batter, self.batting_order_index - 1
+                    self.play_script(self.batter_up_script(batter, resumed=True))
+
+                else:
+                    # Next batter in the batting order
+                    batter, batting_spot = self.next_batter()
+                    self.play_script(self.batter_up_script(batter))
+
+                    # Create Plate Appearance
+                    this_PA = self.new_plate_appearance(batter)
                 
                 # Play through At Bat
-                if this_PA.at_bat() == 'quit':
+                instruments.begin_plate_appearance()
+                at_bat_result = this_PA.at_bat()
+                instruments.end_plate_appearance(f"{batter.first_name} {batter.last_name}", this_PA.PA_outcome)
+                if at_bat_result == 'quit':
                     user_quit = True
+                    self.quit_game()
                     break
                 else:
                     # Once an outcome occurs, score it and add to player score
-                    this_outcome = this_PA.score_at_bat()
+                    this_outcome = self.score_plate_appearance(this_PA, batting_spot)
                     if this_outcome != {}:
-                        self.outcome_history.append(this_outcome['outcome'])
-                        self.player_score += this_outcome['score']
-                        print()
-                        print(f"It's a {this_outcome['outcome']}! Points: {this_outcome['score']}")
-                        print(f"New user score: {self.player_score}")
-                        print()
-                        for i in range(3,0,-1):
-                            time.sleep(1)
-                            print(i)
-                        print("\nBatter Up!")
-
-                # Get 4 most recent outcomes to evaluate if mound visit should occur
-                recent_outcomes = self.outcome_history[-4:]
-                # Count the number of base hits recently
-                recent_basehits = 0
-                for outcome in recent_outcomes:
-                    if outcome in ['Single', 'Double', 'Triple', 'Homerun']:
-                        recent_basehits += 1
-                print(f"plateappearance count: {PlateAppearance.plate_app_count}")
-                print(f"recent_outcomes: {recent_outcomes} - basehits: {recent_basehits}", flush=True)
+                        self.play_script(self.outcome_script(this_outcome))
+
+                # The 4 most recent outcomes and their base hits are kept by GameStats
+                print(f"plateappearance count: {self.stats.batters_faced}")
+                print(f"recent_outcomes: {self.stats.recent_outcomes} - basehits: {self.stats.recent_basehits}", flush=True)
                 print(f"mound visit break: {self.mound_visit_break}")
-                time.sleep(4)
+                self.clock.sleep(4)
                 # --- Mound Visits
-                # Once the user has seen 3 batters, begin checking for mound visits
                 # "Reason" string in the form of "the base hits" or "your low score"
-                if (self.mound_visit_break < 0 or 
-                    recent_basehits > 2):
-
-                    # If there have been too many base hits recently
-                    if recent_basehits > 2:
-                        reason = "these recent base hits"
-                        mound_visit = MoundVisit(self.pitcher, self.player_score, self.mound_visits, reason)
-                        self.mound_visits -= 1
-                        self.mound_visit_break = 3
-
-                    # If the user has a low score, execute mound visit
-                    elif self.player_score <= 4000:
-                        reason = "your low score"
-                        mound_visit = MoundVisit(self.pitcher, self.player_score, self.mound_visits, reason)
-                        self.mound_visits -= 1
-                        self.mound_visit_break = 3
-                    
-                    # If the pitcher keeps hitting batters
-                    elif recent_outcomes.count('Hit By Pitch') > 1:
-                        reason = 'you hitting batters'
-                        mound_visit = MoundVisit(self.pitcher, self.player_score, self.mound_visits, reason)
-                        self.mound_visits -= 1
-                        self.mound_visit_break = 3
-
-                # After 10 batters, applaud the user
-                elif PlateAppearance.plate_app_count == 10:
-                    print()
-                    print("Well done! You've encountered 10 batters and you're still going! Keep it up!")
-                    time.sleep(3)
-                    print()
-
-                # After 20 batters, applaud the user
-                elif PlateAppearance.plate_app_count == 20:
-                    print()
-                    print("Wow, 20 batters! How's the arm? Keep going!")
-                    time.sleep(3)
-                    print()
-
-                # After 30 batters, applaud the user
-                elif PlateAppearance.plate_app_count == 30:
-                    print()
-                    print("Woah. 30 batters. Buy me some peanuts and cracker jacks!")
-                    time.sleep(3)
-                    print()
+                reason = self.mound_visit_due()
+                if reason is not None:
+                    mound_visit = MoundVisit(self.pitcher, self.player_score, self.mound_visits, reason, self.clock)
+                    self.use_mound_visit()
+
+                # After 10, 20 and 30 batters in this game, applaud the user
+                else:
+                    self.play_script(self.milestone_script())
+
+                # Save the game between batters, once the last one is scored
+                if self.autosave is not None:
+                    self.autosave.save()
 
         
         # If user has quit the game, let them know and return the player score to the main menu
         if user_quit:
+            self.play_script(self.end_script(user_quit))
+
+        # Report where the game's time went if instrumentation is on
+        profile_filename = instruments.end_game()
+        report = instruments.report_lines()
+        if report:
             print()
-            print("You quit the game.")
-            print()
-            time.sleep(1)
-            print(f"Final score: {self.player_score}")
-            time.sleep(3)
+            for line in report:
+                print(line)
+            if profile_filename is not None:
+                print(f"cProfile stats saved to {profile_filename}")
             print()
-            print("Returning to Main Menu...")
-            time.sleep(2)
 
         # Return player score
         return self.player_score
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+"""The BatchSimulation module plays many independent Plate Appearances
+at once with NumPy. Each Plate Appearance is a row in a set of arrays
+(Count code, outcome) and every pass throws one pitch to all
+unfinished Plate Appearances, looking up the next Count or PA outcome
+in the CountRules module's transition table, as advance_count() does.
+NumPy is required to use this module."""
+
+
+# -------------------- Import Modules -------------------- #
+from players.popztensor import np, require_numpy
+from game_structure.plateappearance import PA_outcome_scoring_dict
+from game_structure.countrules import PA_outcomes, count_codes, count_transition_table
+from game_structure.simulation import RandomPitchPolicy
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def transition_arrays():
+    """Convert the CountRules transition table into NumPy arrays indexed by
+    [Count code, PitchOutcome code]: the next Count code (-1 once the PA is over)
+    and the PA outcome code (-1 while the PA continues). Also returns the
+    balls and strikes of each Count code."""
+    require_numpy()
+    next_counts = np.array([[-1 if transition.next_count is None else transition.next_count for transition in row]
+                            for row in count_transition_table], dtype=np.intp)
+    PA_results = np.array([[-1 if transition.PA_outcome is None else transition.PA_outcome for transition in row]
+                            for row in count_transition_table], dtype=np.intp)
+    count_balls = np.array([balls for balls, strikes in count_codes], dtype=np.int8)
+    count_strikes = np.array([strikes for balls, strikes in count_codes], dtype=np.int8)
+    return next_counts, PA_results, count_balls, count_strikes
+
+def simulate_plate_appearances(pitcher, batters=None, policy=None, n=None, rng=None):
+    """This function resolves many independent Plate Appearances in lock-step.
+    pitcher = Pitcher object with a loaded POPZ table
+    batters = a single Batter, a sequence of batting averages (one per PA),
+              or None for unadjusted probabilities
+    policy = pitch-selection policy with a choose_batch() method, RandomPitchPolicy() by default
+    n = number of Plate Appearances when a single Batter (or None) is given
+    rng = numpy.random.Generator for seeded simulations
+    It returns an integer array of indices into the PA_outcomes global."""
+    require_numpy()
+
+    if policy is None:
+        policy = RandomPitchPolicy()
+    if rng is None:
+        rng = np.random.default_rng()
+
+    # One batting average per Plate Appearance
+    if batters is None:
+        bat_avgs = None
+    elif hasattr(batters, 'bat_avg'):
+        bat_avgs = np.full(n, batters.bat_avg, dtype=float)
+    else:
+        bat_avgs = np.asarray(batters, dtype=float)
+        n = len(bat_avgs)
+
+    # State of every Plate Appearance: the Count code and the outcome (-1 while still at bat)
+    counts = np.zeros(n, dtype=np.intp)
+    outcomes = np.full(n, -1, dtype=np.intp)
+    next_counts, PA_results, count_balls, count_strikes = transition_arrays()
+
+    # Indices of the Plate Appearances still in progress
+    active = np.arange(n)
+
+    while active.size > 0:
+        # Throw one pitch to every unfinished Plate Appearance
+        active_counts = counts[active]
+        pitch_type_index, zone_index = policy.choose_batch(pitcher, count_balls[active_counts],
+                                                            count_strikes[active_counts], rng)
+        pitch_outcome = pitcher.sample_outcomes(pitch_type_index, zone_index,
+                                                None if bat_avgs is None else bat_avgs[active],
+                                                rng=rng)
+
+        # Move each Plate Appearance to its next Count, or end it with a PA outcome
+        counts[active] = next_counts[active_counts, pitch_outcome]
+        outcomes[active] = PA_results[active_counts, pitch_outcome]
+
+        # Keep only the Plate Appearances without an outcome
+        active = active[outcomes[active] < 0]
+
+    return outcomes
+
+def summarize_plate_appearances(outcomes):
+    """Count each PA outcome in a batch result and compute the total score
+    with the scoring dictionary. Returns a dictionary of the form
+    {'outcomes': {outcome: count}, 'score': total score}."""
+    counts = np.bincount(outcomes, minlength=len(PA_outcomes))
+    outcome_counts = {outcome: int(count) for outcome, count in zip(PA_outcomes, counts)}
+    score = sum(PA_outcome_scoring_dict[outcome] * count for outcome, count in outcome_counts.items())
+    return {'outcomes': outcome_counts, 'score': score}
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+"""The CountModel module computes the exact outcome distribution of a
+Plate Appearance instead of estimating it with random simulations.
+The Count only has 12 states before the PA ends (0-3 balls and 0-2
+strikes), so the PA is an absorbing Markov chain: every pitch either
+moves to a later Count or ends the PA with an outcome such as a Walk.
+The chain is solved exactly with the probabilities from Pitcher.pitch()
+and the Count rules from the CountRules module's transition table."""
+
+
+# -------------------- Import Modules -------------------- #
+import random
+
+from players.pitcher import pitch_outcomes
+from game_structure.plateappearance import PA_outcome_scoring_dict
+from game_structure.countrules import PA_outcomes, count_code, count_transition_table
+from game_structure.simulation import RandomPitchPolicy
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Every Count a Plate Appearance can be in before it ends, as (balls, strikes).
+# Ordered so that each Count comes after all the Counts it can move to.
+count_states = tuple(sorted(((balls, strikes) for balls in range(4) for strikes in range(3)),
+                            key=lambda state: -(state[0] + state[1])))
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def count_transitions():
+    """Read the CountRules transition table for every Count and pitch outcome. Returns a dictionary
+    {(balls, strikes): {pitch outcome: ('count', next_state) or ('outcome', PA outcome)}}."""
+    transitions = {}
+    for state in count_states:
+        transitions[state] = {}
+        for code, pitch_outcome in enumerate(pitch_outcomes):
+            transition = count_transition_table[count_code(*state)][code]
+            if transition.PA_outcome is not None:
+                transitions[state][pitch_outcome] = ('outcome', PA_outcomes[transition.PA_outcome])
+            else:
+                transitions[state][pitch_outcome] = ('count', (transition.balls, transition.strikes))
+    return transitions
+
+# The table only needs to be read once
+count_state_transitions = count_transitions()
+
+def pitch_distribution(pitcher, batter, policy, state, pitch_probs):
+    """Mix the outcome probabilities of every pitch the policy may throw at this Count.
+    pitch_probs caches the Pitch outcome probabilities per (pitch_type, zone).
+    Returns a dictionary {pitch outcome: probability} that adds up to 1."""
+
+    # Policies with a distribution() method can mix pitches. Any other policy
+    # is treated as deterministic and asked for its pitch once.
+    if hasattr(policy, 'distribution'):
+        chosen_pitches = policy.distribution(pitcher, batter, list(state))
+    else:
+        chosen_pitches = {tuple(policy(pitcher, batter, list(state), random)): 1.0}
+
+    outcome_probs = {pitch_outcome: 0.0 for pitch_outcome in pitch_outcomes}
+    for chosen_pitch, weight in chosen_pitches.items():
+        if chosen_pitch not in pitch_probs:
+            pitch_type, zone = chosen_pitch
+            pitch_probs[chosen_pitch] = pitcher.pitch(pitch_type, zone, batter).get_zone_outcome_probs()
+        zone_dict = pitch_probs[chosen_pitch]
+        for pitch_outcome in pitch_outcomes:
+            # Pitch probabilities are percentages
+            outcome_probs[pitch_outcome] += weight * zone_dict[pitch_outcome] / 100
+    return outcome_probs
+
+def evaluate_plate_appearance(pitcher, batter, policy=None, the_count=(0, 0)):
+    """This function computes the exact outcome distribution of a Plate Appearance.
+    pitcher = Pitcher object with a loaded POPZ table
+    batter = Batter (or Player) at the plate
+    policy = pitch-selection policy, RandomPitchPolicy() by default
+    the_count = the (balls, strikes) Count to start from
+    It returns a dictionary with:
+     - 'outcomes': probability of each PA outcome, e.g. {'Walk': 0.08, ...}
+     - 'expected_score': expected points with PA_outcome_scoring_dict
+     - 'expected_pitches': expected number of pitches until the PA ends"""
+
+    if policy is None:
+        policy = RandomPitchPolicy()
+
+    transitions = count_state_transitions
+    pitch_probs = {}
+
+    # Solve each Count from the last to the first. A Count can only move to a later
+    # Count, except a Foul Ball with 2 strikes, which stays at the same Count.
+    # That self-loop is solved directly: value = (value of leaving) / (1 - chance of staying)
+    outcome_dists = {}
+    expected_pitches = {}
+    for state in count_states:
+        outcome_probs = pitch_distribution(pitcher, batter, policy, state, pitch_probs)
+
+        stay_prob = 0.0
+        dist = {PA_outcome: 0.0 for PA_outcome in PA_outcome_scoring_dict}
+        pitches = 1.0
+        for pitch_outcome, prob in outcome_probs.items():
+            kind, result = transitions[state][pitch_outcome]
+            if kind == 'outcome':
+                dist[result] += prob
+            elif result == state:
+                stay_prob += prob
+            else:
+                for PA_outcome, next_prob in outcome_dists[result].items():
+                    dist[PA_outcome] += prob * next_prob
+                pitches += prob * expected_pitches[result]
+
+        if stay_prob >= 1.0:
+            raise ValueError(f'The Plate Appearance never ends from the Count {state}.')
+
+        outcome_dists[state] = {PA_outcome: prob / (1.0 - stay_prob) for PA_outcome, prob in dist.items()}
+        expected_pitches[state] = pitches / (1.0 - stay_prob)
+
+    start = tuple(the_count)
+    expected_score = sum(PA_outcome_scoring_dict[PA_outcome] * prob
+                        for PA_outcome, prob in outcome_dists[start].items())
+
+    return {'outcomes': outcome_dists[start],
+            'expected_score': expected_score,
+            'expected_pitches': expected_pitches[start]}
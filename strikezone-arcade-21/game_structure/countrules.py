@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""The CountRules module is the single source of truth for how pitch
+outcomes move the Count of a Plate Appearance. Pitch types, zones,
+pitch outcomes and PA outcomes are given integer codes (IntEnums in
+the order of their name tuples), and the Count rules are applied once
+to every Count and pitch outcome to build a transition table. The
+interactive at bat, the headless simulation, the batch simulation and
+the Count model all look up this table instead of comparing strings."""
+
+
+# -------------------- Import Modules -------------------- #
+from collections import namedtuple
+from enum import IntEnum
+
+from players.pitcher import pitch_types, pitch_zones, pitch_outcomes
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Plate Appearance outcomes, in the order of PA_outcome_scoring_dict
+PA_outcomes = ("Single", "Double", "Triple", "Homerun", "Hit By Pitch", "Walk", "Strikeout", "In Play Out")
+
+# Integer codes, e.g. PitchType.FASTBALL == 0, Zone.ZONE11 == 9, PitchOutcome.HIT_BY_PITCH == 9.
+# Each code is the index of the name in pitch_types, pitch_zones, pitch_outcomes or PA_outcomes.
+PitchType = IntEnum('PitchType', [(name.upper(), code) for code, name in enumerate(pitch_types)])
+Zone = IntEnum('Zone', [(name.upper(), code) for code, name in enumerate(pitch_zones)])
+PitchOutcome = IntEnum('PitchOutcome', [(name.upper().replace(' ', '_'), code)
+                                        for code, name in enumerate(pitch_outcomes)])
+PAOutcome = IntEnum('PAOutcome', [(name.upper().replace(' ', '_'), code) for code, name in enumerate(PA_outcomes)])
+
+# Lookups from names to codes, e.g. pitch_outcome_codes['Ball'] == PitchOutcome.BALL
+pitch_type_codes = {name: PitchType(code) for code, name in enumerate(pitch_types)}
+zone_codes = {name: Zone(code) for code, name in enumerate(pitch_zones)}
+pitch_outcome_codes = {name: PitchOutcome(code) for code, name in enumerate(pitch_outcomes)}
+PA_outcome_codes = {name: PAOutcome(code) for code, name in enumerate(PA_outcomes)}
+
+# Pitch outcomes grouped by how they move the Count
+ball_outcomes = frozenset({PitchOutcome.BALL})
+strike_outcomes = frozenset({PitchOutcome.CALLED_STRIKE, PitchOutcome.SWINGING_STRIKE})
+foul_outcomes = frozenset({PitchOutcome.FOUL_BALL})
+
+# Pitch outcomes that end the Plate Appearance as the PA outcome of the same name
+contact_outcomes = {code: PA_outcome_codes[pitch_outcomes[code]]
+                    for code in PitchOutcome if pitch_outcomes[code] in PA_outcome_codes}
+
+# Every Count a Plate Appearance can be in before it ends, as (balls, strikes).
+# A Count's code is its index here, which is balls * 3 + strikes.
+count_codes = tuple((balls, strikes) for balls in range(4) for strikes in range(3))
+
+# The Count after a pitch, and the code of that Count or None if the Plate Appearance
+# is over, in which case PA_outcome holds the code of the PA outcome.
+CountTransition = namedtuple('CountTransition', ['balls', 'strikes', 'next_count', 'PA_outcome'])
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def count_code(balls, strikes):
+    """Return the code of a Count, e.g. (3, 2) -> 11."""
+    return balls * 3 + strikes
+
+def count_rule(balls, strikes, outcome):
+    """This function holds the Count rules of a Plate Appearance.
+    balls, strikes = the Count before the pitch
+    outcome = PitchOutcome code
+    It returns the CountTransition for this pitch."""
+
+    PA_outcome = None
+
+    # Case: Ball - if this Ball results in a walk, the PA is over
+    if outcome in ball_outcomes:
+        balls += 1
+        if balls == 4:
+            PA_outcome = PAOutcome.WALK
+
+    # Case: true Strike - if this Strike results in a strikeout, the PA is over
+    elif outcome in strike_outcomes:
+        strikes += 1
+        if strikes == 3:
+            PA_outcome = PAOutcome.STRIKEOUT
+
+    # Case: Foul Ball - increment Strikes if there are less than 2
+    # Foul Balls cannot result in a strikeout
+    elif outcome in foul_outcomes:
+        if strikes < 2:
+            strikes += 1
+
+    # Case: Base Hit, Hit By Pitch or In Play Out
+    # These outcomes end the Plate Appearance
+    elif outcome in contact_outcomes:
+        PA_outcome = contact_outcomes[outcome]
+
+    next_count = count_code(balls, strikes) if PA_outcome is None else None
+    return CountTransition(balls, strikes, next_count, PA_outcome)
+
+# The transition table: count_transition_table[count code][PitchOutcome code] -> CountTransition
+count_transition_table = tuple(tuple(count_rule(balls, strikes, outcome) for outcome in PitchOutcome)
+                                for balls, strikes in count_codes)
+
+def advance_count_code(the_count, pitch_outcome):
+    """This function applies a PitchOutcome code to the Count of a Plate Appearance.
+    the_count = [balls, strikes] list, which is updated in place
+    It returns the PAOutcome code if this pitch ends the Plate Appearance, or None
+    if the PA continues. The simulation engines and the game replay use this
+    version, so no strings are handled per pitch."""
+
+    transition = count_transition_table[the_count[0] * 3 + the_count[1]][pitch_outcome]
+    the_count[0] = transition.balls
+    the_count[1] = transition.strikes
+    return transition.PA_outcome
+
+def advance_count(the_count, pitch_outcome):
+    """This function applies a pitch outcome to the Count of a Plate Appearance.
+    the_count = [balls, strikes] list, which is updated in place
+    pitch_outcome = PitchOutcome code, or the string representation of the outcome,
+                    e.g. "Called Strike", "Homerun"
+    It returns the PA outcome string if this pitch ends the Plate Appearance
+    (e.g. "Walk", "Strikeout", "Single") or an empty string if the PA continues.
+    The interactive at_bat() uses this version, as it displays the PA outcome."""
+
+    if pitch_outcome.__class__ is str:
+        pitch_outcome = pitch_outcome_codes[pitch_outcome]
+
+    PA_outcome = advance_count_code(the_count, pitch_outcome)
+
+    # The Plate Appearance continues
+    if PA_outcome is None:
+        return ''
+    return PA_outcomes[PA_outcome]
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+
+"""The GameRecord module records a BaseballGame pitch by pitch and
+replays it at engine speed. A recording holds the game's random seed,
+the Pitcher, the opposing lineup and a compact event log of every pitch
+command and outcome, the Mound Visits and a quit. Keyframes of the game
+state are saved every few batters so a replay can seek straight to any
+batter instead of replaying the whole game."""
+
+
+# -------------------- Import Modules -------------------- #
+import json
+import os.path
+import random
+
+from players.player import Player
+from players.batter import Batter
+from players.pitcher import PitchSettings
+from game_structure.plateappearance import PA_outcome_scoring_dict
+from game_structure.countrules import advance_count, advance_count_code
+from game_structure.gamestats import base_hit_outcomes, mound_visit_rule
+from game_structure.optimalpolicy import decode_pitch_command, current_pitch_settings
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Data directory shortcuts
+recording_dir = 'data/recordings/'
+recording_filepath = os.path.join( os.path.split(os.path.dirname(__file__))[0] , recording_dir )
+
+# Most recordings kept in data/recordings/; the oldest are deleted when a new one is saved
+max_recordings = 100
+
+# Save a keyframe of the game state every this many batters
+default_keyframe_interval = 10
+
+# Event codes in the event log:
+#  - a pitch is its command and outcome index, e.g. 'F3:2' for a Ball on a Fastball in Zone 3
+#  - a Mound Visit is 'M'
+#  - the user quitting is 'Q'
+mound_visit_event = 'M'
+quit_event = 'Q'
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def recording_filename(seed):
+    """Return the default recording file of a game, e.g. data/recordings/game_<seed>.json"""
+    return recording_filepath + f"game_{seed}.json"
+
+def prune_recordings(keep=max_recordings):
+    """Delete all but the keep most recently saved game_<seed>.json files in data/recordings/.
+    Recordings saved to other filenames are never deleted."""
+    try:
+        with os.scandir(recording_filepath) as entries:
+            recordings = [entry for entry in entries
+                            if entry.name.startswith('game_') and entry.name.endswith('.json')]
+    except FileNotFoundError:
+        return
+    recordings.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in recordings[keep:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            # Another game already removed it
+            pass
+
+
+
+
+# -------------------- GameRecorder Class -------------------- #
+
+class GameRecorder:
+    """The GameRecorder class is handed to a BaseballGame, which reports
+    every batter, pitch and Mound Visit to it while the game is played.
+    The recording can then be saved to a JSON file in data/recordings/.
+    settings are the game's PitchSettings (e.g. SessionContext.settings),
+    the current players.pitcher globals by default, which a replay needs
+    to draw the same outcomes."""
+
+    def __init__(self, seed, pitcher, opponent, keyframe_interval=default_keyframe_interval, settings=None):
+        if settings is None:
+            settings = current_pitch_settings()
+        self.record = {'seed': seed,
+                        'settings': list(settings),
+                        'pitcher': f"{pitcher.first_name} {pitcher.last_name}",
+                        'team': f"{opponent}",
+                        'lineup': [[player.first_name, player.last_name, player.bat_avg]
+                                    for player in opponent.players],
+                        'keyframe_interval': keyframe_interval,
+                        'keyframes': [],
+                        'events': []}
+
+    @classmethod
+    def load(cls, filename):
+        """Create a GameRecorder that continues a saved recording, e.g. of a resumed game.
+        A quit at the end of the recording is removed, since the game goes on."""
+        recorder = cls.__new__(cls)
+        with open(filename, 'r') as infile:
+            recorder.record = json.load(infile)
+        if recorder.record['events'] and recorder.record['events'][-1] == quit_event:
+            recorder.record['events'].pop()
+        return recorder
+
+    def pitches_recorded(self):
+        """Return the number of pitches in the recording."""
+        return sum(event not in (mound_visit_event, quit_event) for event in self.record['events'])
+
+    def record_batter_up(self, game):
+        """Called before each batter steps up. Saves a keyframe of the BaseballGame
+        every keyframe_interval batters."""
+        batters_faced = game.stats.batters_faced
+        if batters_faced % self.record['keyframe_interval'] == 0:
+            self.record['keyframes'].append({'batters_faced': batters_faced,
+                                            'event_index': len(self.record['events']),
+                                            'batting_order_index': game.batting_order_index,
+                                            'player_score': game.player_score,
+                                            'mound_visits': game.mound_visits,
+                                            'mound_visit_break': game.mound_visit_break,
+                                            'recent_outcomes': game.stats.recent_outcomes})
+
+    def record_pitch(self, pitch, pitch_outcome):
+        """Record a Pitch and the PitchOutcome code the Batter produced."""
+        self.record['events'].append(f"{pitch}:{int(pitch_outcome)}")
+
+    def record_mound_visit(self):
+        """Record that the manager came out for a Mound Visit."""
+        self.record['events'].append(mound_visit_event)
+
+    def record_quit(self):
+        """Record that the user quit the game."""
+        self.record['events'].append(quit_event)
+
+    def save(self, filename=None):
+        """Write the recording to a JSON file, by default data/recordings/game_<seed>.json.
+        Saving to the default directory keeps only the newest max_recordings there.
+        Returns the filename."""
+        prune = filename is None
+        if filename is None:
+            os.makedirs(recording_filepath, exist_ok=True)
+            filename = recording_filename(self.record['seed'])
+        with open(filename, 'w+') as outfile:
+            json.dump(self.record, outfile, separators=(',', ':'))
+        if prune:
+            prune_recordings()
+        return filename
+
+
+
+
+# -------------------- GameReplay Class -------------------- #
+
+class GameReplay:
+    """The GameReplay class plays a recorded game back without any user
+    input or sleeping. It re-scores the game with the current scoring
+    dictionary and Mound Visit rules, can seek to any batter using the
+    keyframes, and can re-draw every outcome from the recorded seed to
+    check that the game reproduces exactly."""
+
+    def __init__(self, record):
+        self.record = record
+        self.lineup = [Player(first_name, last_name, bat_avg=bat_avg)
+                        for first_name, last_name, bat_avg in record['lineup']]
+
+    @classmethod
+    def load(cls, filename):
+        """Create a GameReplay from a recording JSON file."""
+        with open(filename, 'r') as infile:
+            return cls(json.load(infile))
+
+    def start_state(self, keyframe=None):
+        """Return the game state at the start of the game or at a keyframe."""
+        state = {'batters_faced': 0,
+                'event_index': 0,
+                'batting_order_index': 0,
+                'player_score': 0,
+                'mound_visits': 3,
+                'mound_visit_break': 3,
+                'recent_outcomes': []}
+        if keyframe is not None:
+            state.update(keyframe)
+            state['recent_outcomes'] = list(keyframe['recent_outcomes'])
+        state.update({'the_count': [0, 0],
+                    'at_bat': False,
+                    'user_quit': False,
+                    'mound_visit_mismatches': 0})
+        return state
+
+    def replay(self, to_batter=None, state=None):
+        """This method replays events until the game ends, or until to_batter batters
+        have been faced (stopping before the next batter steps up). It follows the same
+        rules as BaseballGame.play_ball() and returns the game state dictionary.
+        Recorded Mound Visits that the current rules would not call (or the reverse)
+        are counted in 'mound_visit_mismatches'."""
+
+        if state is None:
+            state = self.start_state()
+        events = self.record['events']
+
+        while state['event_index'] < len(events) and state['mound_visits'] > 0:
+            if to_batter is not None and state['batters_faced'] >= to_batter and not state['at_bat']:
+                break
+
+            event = events[state['event_index']]
+            state['event_index'] += 1
+
+            if event == quit_event:
+                state['user_quit'] = True
+                break
+
+            elif event == mound_visit_event:
+                # Recorded Mound Visits are checked when the Plate Appearance before them ends
+                continue
+
+            # A new batter steps up with the first pitch of the Plate Appearance
+            if not state['at_bat']:
+                if state['batting_order_index'] == len(self.lineup):
+                    state['batting_order_index'] = 0
+                state['batting_order_index'] += 1
+                state['mound_visit_break'] -= 1
+                state['at_bat'] = True
+                state['the_count'] = [0, 0]
+
+            # Apply the pitch to the Count
+            command, outcome_index = event.split(':')
+            PA_outcome = advance_count(state['the_count'], int(outcome_index))
+            if PA_outcome == '':
+                continue
+
+            # The Plate Appearance is over, so score it and check for a Mound Visit
+            state['at_bat'] = False
+            state['batters_faced'] += 1
+            state['player_score'] += PA_outcome_scoring_dict[PA_outcome]
+            state['recent_outcomes'] = (state['recent_outcomes'] + [PA_outcome])[-4:]
+            recent_basehits = sum(outcome in base_hit_outcomes for outcome in state['recent_outcomes'])
+            recent_hit_by_pitches = state['recent_outcomes'].count('Hit By Pitch')
+            reason = mound_visit_rule(recent_basehits, recent_hit_by_pitches,
+                                      state['mound_visit_break'], state['player_score'])
+            if reason is not None:
+                state['mound_visits'] -= 1
+                state['mound_visit_break'] = 3
+
+            # Compare against the Mound Visit recorded after this batter, if any
+            recorded_visit = state['event_index'] < len(events) and events[state['event_index']] == mound_visit_event
+            if recorded_visit:
+                state['event_index'] += 1
+            if recorded_visit != (reason is not None):
+                state['mound_visit_mismatches'] += 1
+
+        return state
+
+    def seek(self, batter_number):
+        """Return the game state just before batter number batter_number + 1 steps up,
+        starting from the closest keyframe instead of the first pitch."""
+        keyframe = None
+        for frame in self.record['keyframes']:
+            if frame['batters_faced'] <= batter_number:
+                keyframe = frame
+        return self.replay(batter_number, self.start_state(keyframe))
+
+    def verify(self, pitcher):
+        """This method re-draws every pitch outcome from the recorded seed with the
+        given Pitcher and the recorded PitchSettings, as the game did. It returns the index
+        of the first event whose outcome differs from the recording, or None if the whole
+        game reproduces. Recordings without settings are checked with the current globals."""
+
+        rng = random.Random(self.record['seed'])
+        settings = PitchSettings(*self.record['settings']) if 'settings' in self.record else None
+        the_count = [0, 0]
+        batting_order_index = 0
+        batter = None
+
+        for event_index, event in enumerate(self.record['events']):
+            if event in (quit_event, mound_visit_event):
+                continue
+
+            # A new batter steps up with the first pitch of the Plate Appearance
+            if batter is None:
+                if batting_order_index == len(self.lineup):
+                    batting_order_index = 0
+                batter = Batter(self.lineup[batting_order_index])
+                batting_order_index += 1
+                the_count = [0, 0]
+
+            command, outcome_index = event.split(':')
+            pitch_type, zone = decode_pitch_command(command)
+            pitch_outcome = batter.get_pitch_outcome_code(pitcher.pitch(pitch_type, zone, batter, settings), rng)
+            if pitch_outcome != int(outcome_index):
+                return event_index
+
+            if advance_count_code(the_count, pitch_outcome) is not None:
+                batter = None
+
+        return None
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+
+"""The GameServer module hosts many games of StrikeZone Arcade '21 in
+one process. Players connect over TCP with a line-based terminal client
+(e.g. telnet or nc), and each connection gets its own GameSession,
+which runs on asyncio instead of blocking input() and print() calls.
+A session drives the same BaseballGame, PlateAppearance and MoundVisit
+rules as the console game through their step methods, and its pauses
+are awaited with the session's PacingClock, so a pause in one game
+never holds up the others. Start a server with server.py:
+    python3 server.py --port 2121
+and connect to it with:
+    telnet localhost 2121"""
+
+
+# -------------------- Import Modules -------------------- #
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import sqlite3
+
+from game_structure.loadgame import create_pitchers
+from game_structure.loadgame import create_baseball_teams
+from game_structure.baseballgame import BaseballGame
+from game_structure.moundvisit import MoundVisit
+from game_structure.gamerecord import GameRecorder
+from game_structure.instrumentation import instruments
+from game_structure.leaderboard import Leaderboard, leaderboard_filename, player_sources
+from game_structure.pacing import PacingClock
+from game_structure.renderer import FrameRenderer, default_screen_rows
+from game_structure.sessioncontext import SessionContext
+from game_structure.strikezoneexceptions import PitchTypeError, SessionClosedError
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Server errors that do not belong to one player's session are logged here
+logger = logging.getLogger(__name__)
+
+# Where the server listens by default
+default_host = '127.0.0.1'
+default_port = 2121
+
+# Most players connected at once, and seconds a player may take to answer a prompt
+default_max_sessions = 500
+default_idle_timeout = 600
+
+# Longest line a player may send, in bytes
+max_line_length = 1024
+
+# Answers that quit a prompt
+quit_commands = ['q', 'quit', 'exit']
+
+# Seconds a finished game waits for the leaderboard database (e.g. while a simulation
+# writes a batch to it) before the player is told it could not be saved yet
+leaderboard_timeout = 2.0
+
+
+
+
+# -------------------- SessionIO Class -------------------- #
+
+class SessionIO:
+    """The SessionIO class is a player's terminal: it writes text to the
+    connection (with telnet line endings) and reads the player's answers.
+    It has write(), flush() and isatty() so a FrameRenderer can draw the
+    at bat screen to it. Pauses and prompts are coroutines, so other
+    sessions keep playing while this one waits. screen_rows is the height of
+    the player's terminal, which cannot be measured from the server."""
+
+    def __init__(self, reader, writer, clock, idle_timeout=default_idle_timeout, screen_rows=default_screen_rows):
+        self.reader = reader
+        self.writer = writer
+        self.clock = clock
+        self.idle_timeout = idle_timeout
+        self.screen_rows = screen_rows
+
+    def write(self, text):
+        self.writer.write(text.replace('\n', '\r\n').encode('utf-8'))
+        return len(text)
+
+    def flush(self):
+        # Written text is sent when the session next pauses or prompts
+        pass
+
+    def isatty(self):
+        # Telnet clients understand ANSI escape sequences
+        return True
+
+    def print(self, *lines):
+        """Write each line followed by a newline, like print()."""
+        for line in lines or ['']:
+            self.write(f"{line}\n")
+
+    async def pause(self, seconds):
+        """Send what has been written, then pause for a scaled number of seconds."""
+        await self.writer.drain()
+        delay = self.clock.delay(seconds)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def play(self, script):
+        """Play a script from the game, a list of lines and pauses (numbers of seconds)."""
+        for step in script:
+            if isinstance(step, str):
+                self.print(step)
+            else:
+                await self.pause(step)
+
+    async def input(self, prompt=''):
+        """Write the prompt and return the player's next line, like input().
+        Raises a SessionClosedError if the player disconnects or is idle too long."""
+        self.write(prompt)
+        await self.writer.drain()
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            raise SessionClosedError('idle for too long')
+        except ValueError:
+            raise SessionClosedError('line too long')
+        if not line:
+            raise SessionClosedError()
+
+        # Drop telnet negotiation and other control characters
+        return ''.join(ch for ch in line.decode('utf-8', 'ignore') if ch.isprintable()).strip()
+
+
+
+
+# -------------------- GameSession Class -------------------- #
+
+class GameSession:
+    """The GameSession class runs one player's visit to the arcade: a small
+    menu to pick a pitcher, a team and the game speed, and the games they
+    play. Each game gets its own seeded random number generator and is
+    recorded like a console game. The session's SessionContext seeds its
+    games and counts them, apart from every other session. Finished games
+    are added to the server's Leaderboard, if it has one."""
+
+    def __init__(self, io, event_store=None, context=None, leaderboard=None):
+        self.io = io
+        self.event_store = event_store
+        self.leaderboard = leaderboard
+        self.context = context if context is not None else SessionContext()
+        self.renderer = FrameRenderer(io, io.screen_rows)
+        self.recent_score = 0
+
+    async def run(self):
+        """Show the session menu until the player quits."""
+        io = self.io
+        while True:
+            io.print('', "------------------- STRIKEZONE: ARCADE '21 -------------------", '',
+                    "1: Take the Mound (Play Game)",
+                    f"2: Game Speed (currently {io.clock})", '',
+                    'Press q to quit the game.', '')
+            if self.recent_score != 0:
+                io.print(f"Last Player Score: {self.recent_score}", '')
+
+            command = (await io.input("Input a menu option: ")).lower()
+            if command in quit_commands:
+                io.print('', "Thank you for playing!", '')
+                await io.writer.drain()
+                return
+            elif command == '1':
+                await self.choose_game()
+            elif command == '2':
+                command = await io.input("Input a game speed (normal, fast or instant): ")
+                try:
+                    io.clock.set_mode(command)
+                except ValueError:
+                    io.print("Please provide a valid game speed.")
+            else:
+                io.print("Please provide a valid command.")
+
+    async def choose(self, kind, options):
+        """Ask the player to pick one of options (a dictionary-like of names) by number or name.
+        Returns the name, or None if the player quits."""
+        names = list(options)
+        self.io.print('', f"Pick a {kind}:")
+        for number, name in enumerate(names, start=1):
+            self.io.print(f"{number:>3}: {name}")
+        while True:
+            command = await self.io.input(f"Input a {kind} number or name (q to quit): ")
+            if command.lower() in quit_commands:
+                return None
+            elif command.isdigit() and 1 <= int(command) <= len(names):
+                return names[int(command) - 1]
+            elif command.strip().lower().title() in options:
+                return command.strip().lower().title()
+            self.io.print("Please provide a valid command.")
+
+    async def choose_game(self):
+        """Pick a pitcher and a team, then play a game."""
+        pitchers = create_pitchers()
+        while True:
+            pitcher_name = await self.choose('pitcher', pitchers)
+            if pitcher_name is None:
+                return
+            try:
+                pitcher = pitchers[pitcher_name]
+                break
+            except ValueError as err:
+                # The pitcher's POPZ table is missing or broken
+                self.io.print(str(err))
+        teams = create_baseball_teams()
+        team_name = await self.choose('team', teams)
+        if team_name is None:
+            return
+        self.recent_score = await self.play_game(pitcher, teams[team_name])
+
+    async def play_game(self, pitcher, opponent):
+        """Play a BaseballGame through its step methods, like BaseballGame.play_ball().
+        Returns the player's score."""
+        io = self.io
+        seed = self.context.new_game_seed()
+        recorder = GameRecorder(seed, pitcher, opponent, settings=self.context.settings)
+
+        # The game itself never pauses; the session awaits every pause instead
+        game = BaseballGame(pitcher, opponent, seed=seed, recorder=recorder, clock=PacingClock('instant'),
+                            event_store=self.event_store, announce=False, context=self.context)
+        await io.play(game.intro_script())
+
+        user_quit = False
+        proceed = await io.input('Press enter to continue (q to quit). ')
+        if proceed.lower() in quit_commands:
+            user_quit = True
+            game.quit_game()
+
+        while not user_quit and game.mound_visits > 0:
+            batter, batting_spot = game.next_batter()
+            io.print('')
+            await io.play(game.batter_up_script(batter))
+
+            this_PA = game.new_plate_appearance(batter, self.renderer)
+            if await self.at_bat(this_PA) == 'quit':
+                user_quit = True
+                game.quit_game()
+                break
+
+            this_outcome = game.score_plate_appearance(this_PA, batting_spot)
+            if this_outcome != {}:
+                await io.play(game.outcome_script(this_outcome))
+
+            # --- Mound Visits
+            reason = game.mound_visit_due()
+            if reason is not None:
+                mound_visit = MoundVisit(game.pitcher, game.player_score, game.mound_visits, reason, play=False)
+                await io.play(mound_visit.manager_script(reason) or [])
+                await io.input('Press enter to continue.')
+                game.use_mound_visit()
+
+            # After 10, 20 and 30 batters in this game, applaud the player
+            else:
+                await io.play(game.milestone_script())
+
+        # End of game, saving the recording off the event loop
+        await io.play(game.end_script(user_quit))
+        try:
+            io.print(f"Game recording saved to {await asyncio.to_thread(recorder.save)}")
+        except OSError as err:
+            io.print(f'An error occurred while saving the game recording: {type(err)} {err}')
+
+        # Add a finished game to the leaderboard, then rank it among the games written so far
+        if self.leaderboard is not None and not user_quit:
+            try:
+                rank = await self.leaderboard.add_game(f"{pitcher.first_name} {pitcher.last_name}", opponent,
+                                                        game.player_score, game.stats.batters_faced,
+                                                        game.stats.outcome_counts, seed)
+                if rank is not None:
+                    io.print(f"Better than {rank:.1f}% of players' games")
+            except sqlite3.Error as err:
+                io.print(f'An error occurred while saving to the leaderboard: {type(err)} {err}')
+        await io.input("Press enter to return to the menu.")
+        return game.player_score
+
+    async def at_bat(self, this_PA):
+        """Play a PlateAppearance through its step methods, like PlateAppearance.at_bat().
+        Returns 'quit' if the player quits, or the PA outcome."""
+        io = self.io
+        while True:
+            this_PA.display_at_bat()
+            command = await io.input('Please provide a pitch command (q to quit): ')
+            if command.lower() in [''] + quit_commands:
+                return 'quit'
+
+            try:
+                the_pitch = this_PA.get_pitch(command)
+            except ValueError:
+                io.print("Please provide a valid pitch command.")
+            except PitchTypeError:
+                io.print(f"{this_PA.pitcher.first_name} {this_PA.pitcher.last_name} does not have that pitch type.")
+                await io.pause(3)
+                continue
+            except Exception as err:
+                io.print(f"An error occurred during the At Bat: {type(err)} {err}")
+                await io.pause(3)
+                continue
+            else:
+                # Announce that the pitcher is pitching
+                await io.pause(0.5)
+                io.write("\nThe wind up... ")
+                await io.pause(0.25)
+                io.print("and the pitch!")
+                await io.pause(1)
+
+                try:
+                    pitch_outcome = this_PA.deliver_pitch(the_pitch)
+                except Exception as err:
+                    # Keep the server running; the player may try another pitch
+                    io.print(f"An error occurred during the At Bat: {type(err)} {err}")
+                    await io.pause(3)
+                    continue
+                io.print(f"\nPitch resulted in a {pitch_outcome}.")
+                if this_PA.PA_outcome != '':
+                    return this_PA.PA_outcome
+
+            # Rest before presenting the updated strikezone
+            await io.pause(2.5)
+
+
+
+
+# -------------------- ServerLeaderboard Class -------------------- #
+
+class ServerLeaderboard:
+    """The ServerLeaderboard class gives the game server a Leaderboard that never
+    blocks the event loop. The Leaderboard is opened, used and closed on a worker
+    thread of its own, with its own connection to the database and a short busy
+    timeout, so a simulation holding the database's write lock delays only the
+    player whose game just finished, and for at most timeout seconds.
+    The coroutines add_game() and flush() run the Leaderboard's work on that thread."""
+
+    def __init__(self, filename=leaderboard_filename, timeout=leaderboard_timeout):
+        # One thread, as an SQLite connection may only be used by the thread that opened it
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='leaderboard')
+        self.leaderboard = self.executor.submit(Leaderboard, filename, timeout=timeout).result()
+        self.flush_interval = self.leaderboard.flush_interval
+
+    def record_and_rank(self, pitcher, opponent, score, batters_faced, outcome_counts, game_id):
+        """Write a game and return its percentile among players' games. Runs on the leaderboard thread.
+        If the write fails, the game stays buffered and is written by a later flush."""
+        self.leaderboard.record_game(pitcher, opponent, score, batters_faced, outcome_counts, 'server', game_id)
+        self.leaderboard.flush()
+        return self.leaderboard.percentile_rank(score, source=player_sources)
+
+    async def add_game(self, pitcher, opponent, score, batters_faced, outcome_counts, game_id=None):
+        """Add a finished server game to the leaderboard and return its percentile
+        among players' games (or None), computed once the game has been written."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.record_and_rank, pitcher, opponent, score, batters_faced, outcome_counts, game_id)
+
+    async def flush(self):
+        """Write any games still buffered, e.g. after the database was busy."""
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.leaderboard.flush)
+
+    def close(self):
+        """Write any buffered games, close the database and stop the leaderboard thread."""
+        try:
+            self.executor.submit(self.leaderboard.close).result()
+        finally:
+            self.executor.shutdown()
+
+
+
+
+# -------------------- GameServer Class -------------------- #
+
+class GameServer:
+    """The GameServer class accepts player connections and runs a GameSession
+    for each one, up to max_sessions at a time. Every session starts at the
+    server's pacing mode. Finished games are added to the leaderboard, if
+    one (a ServerLeaderboard) is given, and games it could not write yet are
+    retried every flush_interval seconds. If an event_store is given, the
+    pitches of every game are appended to it. Instrumentation is process-wide
+    and times one game at a time, so it is turned off while a server runs."""
+
+    def __init__(self, host=default_host, port=default_port, max_sessions=default_max_sessions,
+                pacing_mode='normal', idle_timeout=default_idle_timeout, event_store=None, leaderboard=None,
+                screen_rows=default_screen_rows):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.pacing_mode = pacing_mode
+        self.idle_timeout = idle_timeout
+        self.screen_rows = screen_rows
+        self.event_store = event_store
+        self.leaderboard = leaderboard
+        self.sessions = set()
+        self.server = None
+
+        # Fail now, not when the first player connects, if the pacing mode is not valid
+        PacingClock(pacing_mode)
+
+        # Sessions would all add their timings to the same totals, so keep instrumentation off
+        instruments.set_mode('off')
+
+    async def start(self):
+        """Start listening for players. Returns the asyncio Server."""
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                limit=max_line_length)
+        return self.server
+
+    async def serve_forever(self):
+        """Start the server if needed and accept players until cancelled."""
+        if self.server is None:
+            await self.start()
+        flusher = asyncio.create_task(self.flush_leaderboard()) if self.leaderboard is not None else None
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            if flusher is not None:
+                flusher.cancel()
+
+    async def flush_leaderboard(self):
+        """Write the leaderboard's buffered games every flush_interval seconds,
+        so games that found the database busy are saved even when no more games finish."""
+        while True:
+            await asyncio.sleep(self.leaderboard.flush_interval)
+            try:
+                await self.leaderboard.flush()
+            except sqlite3.Error as err:
+                logger.error(f'An error occurred while saving to the leaderboard: {type(err)} {err}')
+
+    async def handle_connection(self, reader, writer):
+        """Run a GameSession for a new connection, or turn it away if the server is full."""
+        try:
+            if len(self.sessions) >= self.max_sessions:
+                writer.write(b"All the mounds are taken, please try again later.\r\n")
+            else:
+                io = SessionIO(reader, writer, PacingClock(self.pacing_mode), self.idle_timeout, self.screen_rows)
+                session = GameSession(io, self.event_store, leaderboard=self.leaderboard)
+                self.sessions.add(session)
+                try:
+                    await session.run()
+                except (SessionClosedError, ConnectionError):
+                    pass
+                finally:
+                    self.sessions.discard(session)
+
+        # Close the connection, ignoring a player who has already gone
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def close(self):
+        """Stop accepting players and write any buffered pitch events."""
+        if self.server is not None:
+            self.server.close()
+        if self.event_store is not None:
+            self.event_store.close()
+        if self.leaderboard is not None:
+            self.leaderboard.close()
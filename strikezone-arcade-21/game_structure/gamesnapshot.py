@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+"""The GameSnapshot module saves the complete state of a BaseballGame in
+progress to a small binary file, so a game that was quit (or cut off)
+can be resumed from the Main Menu. A snapshot holds the game's fields,
+its live statistics, the Plate Appearance in progress (its Count and
+pitches, from which the strike zone marks are redrawn) and the state of
+the game's random number generator. Snapshots are a few hundred bytes
+and are written to a temporary file that replaces the last snapshot, so
+a game can be autosaved after every pitch:
+    python3 -m game_structure.gamesnapshot data/saves/autosave.sav"""
+
+
+# -------------------- Import Modules -------------------- #
+import argparse
+from array import array
+from collections import namedtuple
+import os
+import os.path
+import struct
+import sys
+
+from players.batter import Batter
+from players.pitcher import pitch_types, pitch_zones, pitch_outcomes
+from game_structure.countrules import PA_outcomes, PA_outcome_codes, pitch_type_codes, zone_codes
+from game_structure.countrules import pitch_outcome_codes
+from game_structure.gamestats import recent_window_size, base_hit_outcomes
+from game_structure.instrumentation import instruments
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Data directory shortcuts
+save_dir = 'data/saves/'
+save_filepath = os.path.join( os.path.split(os.path.dirname(__file__))[0] , save_dir )
+autosave_filename = os.path.join(save_filepath, 'autosave.sav')
+
+# Totals kept for each zone by GameStats, in the order they are saved
+zone_stat_names = ('pitches', 'balls', 'strikes', 'base hits')
+
+# File layout (little-endian):
+#  - header: magic, version, numbers of PA outcomes, pitch outcomes and zones (to check the layout),
+#            the game's id (its seed), score, Mound Visit break, batting order index, Mound Visits,
+#            the recent PA outcome codes, batters faced, pitches, GameStats score, whether a Plate
+#            Appearance is in progress with its Count and number of pitches, the number of batters
+#            with statistics and the lengths of the pitcher and team names
+#  - totals: uint32 counts per PA outcome, per pitch outcome and per zone (zone_stat_names)
+#  - pitches of the Plate Appearance in progress: pitch type, zone and outcome codes
+#  - batter statistics: batting order spot, Plate Appearances, base hits and score
+#  - the pitcher and team names (utf-8)
+# The random number generator is saved as the game's seed and the number of numbers drawn
+# from it: every pitch draws exactly one (see OutcomeSampler.sample()), so the pitch count is
+# the number of draws. This keeps the snapshot small where the generator's own state is 2.5KB.
+snapshot_magic = b'SZSV'
+snapshot_version = 1
+header_struct = struct.Struct(f'<4sHBBBQiiHbB{recent_window_size}sIIiBBBHBBB')
+totals_count = len(PA_outcomes) + len(pitch_outcomes) + len(pitch_zones) * len(zone_stat_names)
+totals_size = totals_count * 4
+PA_pitch_struct = struct.Struct('<BBB')
+batter_stats_struct = struct.Struct('<BIIi')
+
+# The contents of a snapshot, as read back by unpack_snapshot()
+#  - stats: {'batters_faced', 'pitches', 'score', 'recent', 'outcome_counts', 'pitch_outcome_counts',
+#            'zone_stats', 'batter_stats'} in the form GameStats keeps them
+#  - at_bat: True if a Plate Appearance was in progress, with its Count and
+#            PA_pitches, a list of (pitch type, zone, pitch outcome) names
+GameSnapshot = namedtuple('GameSnapshot', ['pitcher', 'team', 'game_id', 'player_score', 'batting_order_index',
+                                            'mound_visits', 'mound_visit_break', 'stats', 'at_bat', 'the_count',
+                                            'PA_pitches'])
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def pack_snapshot(game, this_PA=None):
+    """This function packs the state of a BaseballGame into bytes.
+    this_PA = the PlateAppearance in progress, if any. A PlateAppearance that has
+              ended (its PA_outcome is set) must be scored before the game is packed."""
+
+    stats = game.stats
+    at_bat = this_PA is not None and this_PA.PA_outcome == ''
+    PA_pitches = list(zip(this_PA.pitch_history, this_PA.pitch_outcome_history)) if at_bat else []
+    the_count = this_PA.the_count if at_bat else (0, 0)
+    pitcher_name = f"{game.pitcher.first_name} {game.pitcher.last_name}".encode('utf-8')
+    team_name = str(game.opponent).encode('utf-8')
+
+    recent = bytes(PA_outcome_codes[outcome] for outcome in stats.recent)
+    snapshot = bytearray(header_struct.pack(snapshot_magic, snapshot_version,
+                                            len(PA_outcomes), len(pitch_outcomes), len(pitch_zones),
+                                            game.game_id, game.player_score, game.mound_visit_break,
+                                            game.batting_order_index, game.mound_visits, len(recent), recent,
+                                            stats.batters_faced, stats.pitches, stats.score,
+                                            at_bat, the_count[0], the_count[1], len(PA_pitches),
+                                            len(stats.batter_stats), len(pitcher_name), len(team_name)))
+
+    totals = array('I', stats.outcome_counts.values())
+    totals.extend(stats.pitch_outcome_counts.values())
+    for zone in pitch_zones:
+        zone_stats = stats.zone_stats[zone]
+        totals.extend([zone_stats[name] for name in zone_stat_names])
+    if sys.byteorder != 'little':
+        totals.byteswap()
+    snapshot += totals.tobytes()
+
+    for the_pitch, pitch_outcome in PA_pitches:
+        snapshot += PA_pitch_struct.pack(pitch_type_codes[the_pitch.pitch_type], zone_codes[the_pitch.zone],
+                                        pitch_outcome_codes[pitch_outcome])
+    for spot, batter_stats in stats.batter_stats.items():
+        snapshot += batter_stats_struct.pack(spot, batter_stats['plate appearances'], batter_stats['base hits'],
+                                            batter_stats['score'])
+    snapshot += pitcher_name + team_name
+    return bytes(snapshot)
+
+def unpack_snapshot(data):
+    """This function reads the bytes written by pack_snapshot() back into a GameSnapshot.
+    It raises a ValueError if the data is not a complete snapshot of this version."""
+
+    try:
+        (magic, version, n_PA_outcomes, n_pitch_outcomes, n_zones,
+            game_id, player_score, mound_visit_break, batting_order_index, mound_visits, n_recent, recent,
+            batters_faced, pitches, stats_score, at_bat, balls, strikes, n_PA_pitches,
+            n_batter_stats, pitcher_length, team_length) = header_struct.unpack_from(data, 0)
+    except struct.error:
+        raise ValueError('The snapshot is cut off.')
+    if magic != snapshot_magic or version != snapshot_version:
+        raise ValueError(f'This is not a version {snapshot_version} game snapshot.')
+    if (n_PA_outcomes, n_pitch_outcomes, n_zones) != (len(PA_outcomes), len(pitch_outcomes), len(pitch_zones)):
+        raise ValueError("The snapshot does not match the game's outcomes and zones.")
+    expected_size = (header_struct.size + totals_size + n_PA_pitches * PA_pitch_struct.size +
+                    n_batter_stats * batter_stats_struct.size + pitcher_length + team_length)
+    if len(data) != expected_size:
+        raise ValueError(f'The snapshot is {len(data)} bytes instead of {expected_size}.')
+
+    offset = header_struct.size
+    totals = array('I', data[offset:offset + totals_size])
+    if sys.byteorder != 'little':
+        totals.byteswap()
+    offset += totals_size
+    totals = iter(totals)
+    outcome_counts = {outcome: next(totals) for outcome in PA_outcomes}
+    pitch_outcome_counts = {outcome: next(totals) for outcome in pitch_outcomes}
+    zone_stats = {zone: {name: next(totals) for name in zone_stat_names} for zone in pitch_zones}
+
+    PA_pitches = []
+    for i in range(n_PA_pitches):
+        pitch_type, zone, pitch_outcome = PA_pitch_struct.unpack_from(data, offset)
+        PA_pitches.append((pitch_types[pitch_type], pitch_zones[zone], pitch_outcomes[pitch_outcome]))
+        offset += PA_pitch_struct.size
+
+    batter_stats = {}
+    for i in range(n_batter_stats):
+        spot, plate_appearances, base_hits, score = batter_stats_struct.unpack_from(data, offset)
+        batter_stats[spot] = {'plate appearances': plate_appearances, 'base hits': base_hits, 'score': score}
+        offset += batter_stats_struct.size
+
+    pitcher = bytes(data[offset:offset + pitcher_length]).decode('utf-8')
+    team = bytes(data[offset + pitcher_length:offset + pitcher_length + team_length]).decode('utf-8')
+
+    stats = {'batters_faced': batters_faced,
+            'pitches': pitches,
+            'score': stats_score,
+            'recent': [PA_outcomes[code] for code in recent[:n_recent]],
+            'outcome_counts': outcome_counts,
+            'pitch_outcome_counts': pitch_outcome_counts,
+            'zone_stats': zone_stats,
+            'batter_stats': batter_stats}
+    return GameSnapshot(pitcher, team, game_id, player_score, batting_order_index, mound_visits,
+                        mound_visit_break, stats, bool(at_bat), [balls, strikes], PA_pitches)
+
+def load_snapshot(filename=autosave_filename):
+    """Read a snapshot file. Returns the GameSnapshot, or None if there is no snapshot.
+    Raises a ValueError if the file is not a snapshot."""
+    try:
+        with open(filename, 'rb') as infile:
+            return unpack_snapshot(infile.read())
+    except FileNotFoundError:
+        return None
+
+def discard_snapshot(filename=autosave_filename):
+    """Delete a snapshot file, e.g. once its game is over."""
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+def restore_snapshot(game, snapshot):
+    """This function puts a new BaseballGame, created with the snapshot's seed, pitcher and team,
+    into the snapshot's state. A Plate Appearance that was in progress is recreated with its
+    pitches and strike zone, and returned so the game can continue it; otherwise None is returned."""
+
+    game.player_score = snapshot.player_score
+    game.batting_order_index = snapshot.batting_order_index
+    game.mound_visits = snapshot.mound_visits
+    game.mound_visit_break = snapshot.mound_visit_break
+
+    stats = game.stats
+    for name, value in snapshot.stats.items():
+        if name == 'recent':
+            stats.recent.clear()
+            stats.recent.extend(value)
+        else:
+            setattr(stats, name, value)
+    stats.recent_basehits = sum(PA_outcome in base_hit_outcomes for PA_outcome in stats.recent)
+    stats.recent_hit_by_pitches = stats.recent_outcomes.count('Hit By Pitch')
+
+    # Draw the numbers the game has already used, one per pitch, to put the generator back in its state
+    for i in range(stats.pitches):
+        game.rng.random()
+
+    if not snapshot.at_bat:
+        return None
+
+    # Recreate the Plate Appearance in progress with the batter before the batting order index
+    batter = Batter(game.batting_order[snapshot.batting_order_index - 1])
+    this_PA = game.new_plate_appearance(batter)
+    this_PA.the_count = list(snapshot.the_count)
+    for pitch_type, zone, pitch_outcome in snapshot.PA_pitches:
+        the_pitch = game.pitcher.pitch(pitch_type, zone, batter, this_PA.settings)
+        this_PA.pitch_history.append(the_pitch)
+        this_PA.pitch_outcome_history.append(pitch_outcome)
+        this_PA.strikezone.update_strikezone(the_pitch, pitch_outcome)
+    return this_PA
+
+
+
+
+# -------------------- GameAutosave Class -------------------- #
+
+class GameAutosave:
+    """The GameAutosave class is created by a BaseballGame to save a snapshot
+    of it after every pitch and every batter. Each snapshot is written to a
+    temporary file first and then moved over the last one, so the snapshot
+    on disk is always complete even if the program stops while saving."""
+
+    def __init__(self, game, filename=autosave_filename):
+        self.game = game
+        self.filename = filename
+        self.saves = 0
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def save(self, this_PA=None):
+        """Save a snapshot of the game, with the PlateAppearance in progress if given."""
+        started = instruments.start()
+        snapshot = pack_snapshot(self.game, this_PA)
+        with open(self.filename + '.tmp', 'wb') as outfile:
+            outfile.write(snapshot)
+        os.replace(self.filename + '.tmp', self.filename)
+        self.saves += 1
+        instruments.stop('autosave', started)
+
+    def discard(self):
+        """Delete the snapshot, e.g. when the game is over and cannot be resumed."""
+        discard_snapshot(self.filename)
+
+
+
+
+# -------------------- Command Line Access -------------------- #
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Show a StrikeZone Arcade '21 game snapshot.")
+    parser.add_argument('filename', nargs='?', default=autosave_filename, help='snapshot file')
+    args = parser.parse_args()
+
+    snapshot = load_snapshot(args.filename)
+    if snapshot is None:
+        print(f"No snapshot in {args.filename}")
+    else:
+        print(f"{args.filename}: {os.path.getsize(args.filename)} bytes")
+        print(f"Game {snapshot.game_id}: {snapshot.pitcher} against the {snapshot.team}")
+        print(f"Score: {snapshot.player_score}   Mound Visits: {snapshot.mound_visits}   "
+                f"Batters Faced: {snapshot.stats['batters_faced']}   Pitches: {snapshot.stats['pitches']}")
+        if snapshot.at_bat:
+            print(f"At bat: Count {snapshot.the_count[0]}-{snapshot.the_count[1]} after "
+                    f"{', '.join(f'{pitch_type[0]}{zone[4:]} {outcome}' for pitch_type, zone, outcome in snapshot.PA_pitches)}")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+"""The GameStats module keeps the live statistics of a BaseballGame.
+Statistics are updated as each pitch and Plate Appearance happens,
+instead of rescanning the game's history: a window of the 4 most
+recent PA outcomes with running counts of its base hits and Hit By
+Pitches (used for the Mound Visit rules), and running totals per
+outcome, per zone and per batter. Memory does not grow with the
+length of the game, so headless games can run for any number of
+batters."""
+
+
+# -------------------- Import Modules -------------------- #
+from collections import deque
+
+from players.pitcher import pitch_zones, pitch_outcomes
+from game_structure.countrules import PA_outcomes, PitchOutcome, ball_outcomes, strike_outcomes, foul_outcomes
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Number of recent Plate Appearances checked by the Mound Visit rules
+recent_window_size = 4
+
+# Outcomes counted as base hits
+base_hit_outcomes = frozenset({'Single', 'Double', 'Triple', 'Homerun'})
+base_hit_pitch_outcomes = frozenset({PitchOutcome.SINGLE, PitchOutcome.DOUBLE, PitchOutcome.TRIPLE,
+                                    PitchOutcome.HOMERUN})
+
+# Pitch outcomes counted as strikes in the zone statistics
+zone_strike_outcomes = strike_outcomes | foul_outcomes
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def mound_visit_rule(recent_basehits, recent_hit_by_pitches, mound_visit_break, player_score):
+    """This function holds the Mound Visit rules.
+    recent_basehits, recent_hit_by_pitches = counts over the 4 most recent Plate Appearances
+    mound_visit_break = batters left before mound visits are checked for (below 0 = check)
+    player_score = the user's current score
+    It returns the "reason" string for the MoundVisit, in the form of "these recent
+    base hits" or "your low score", or None if no Mound Visit should occur."""
+
+    # Once the user has seen 3 batters, begin checking for mound visits
+    if (mound_visit_break < 0 or
+        recent_basehits > 2):
+
+        # If there have been too many base hits recently
+        if recent_basehits > 2:
+            return "these recent base hits"
+
+        # If the user has a low score
+        elif player_score <= 4000:
+            return "your low score"
+
+        # If the pitcher keeps hitting batters
+        elif recent_hit_by_pitches > 1:
+            return 'you hitting batters'
+
+    # No Mound Visit needed
+    return None
+
+
+
+
+# -------------------- GameStats Class -------------------- #
+
+class GameStats:
+    """The GameStats class is updated with record_pitch() for every pitch
+    and record_plate_appearance() for every PA outcome. Each update takes
+    constant time. It holds:
+     - the 4 most recent PA outcomes and their base hit and Hit By Pitch counts
+     - the batters faced, pitches thrown and score
+     - totals per PA outcome and per pitch outcome
+     - pitches, balls, strikes and base hits per zone
+     - Plate Appearances, base hits and points per batter"""
+
+    def __init__(self):
+        # Sliding window of recent PA outcomes with running counts
+        self.recent = deque(maxlen=recent_window_size)
+        self.recent_basehits = 0
+        self.recent_hit_by_pitches = 0
+
+        # Running totals
+        self.batters_faced = 0
+        self.pitches = 0
+        self.score = 0
+        self.outcome_counts = {outcome: 0 for outcome in PA_outcomes}
+        self.pitch_outcome_counts = {outcome: 0 for outcome in pitch_outcomes}
+        self.zone_stats = {zone: {'pitches': 0, 'balls': 0, 'strikes': 0, 'base hits': 0} for zone in pitch_zones}
+        # {batter: {'plate appearances', 'base hits', 'score'}}, keyed by e.g. the batting order spot
+        self.batter_stats = {}
+
+    @property
+    def recent_outcomes(self):
+        """The most recent PA outcomes as a list, oldest first."""
+        return list(self.recent)
+
+    def record_pitch(self, zone, pitch_outcome):
+        """Add one pitch with its PitchOutcome code, e.g. record_pitch('zone3', PitchOutcome.BALL)."""
+        self.pitches += 1
+        self.pitch_outcome_counts[pitch_outcomes[pitch_outcome]] += 1
+
+        zone_stats = self.zone_stats[zone]
+        zone_stats['pitches'] += 1
+        if pitch_outcome in ball_outcomes:
+            zone_stats['balls'] += 1
+        elif pitch_outcome in zone_strike_outcomes:
+            zone_stats['strikes'] += 1
+        elif pitch_outcome in base_hit_pitch_outcomes:
+            zone_stats['base hits'] += 1
+
+    def record_plate_appearance(self, PA_outcome, score, batter=None):
+        """Add one Plate Appearance's outcome and points. batter is an optional key
+        for the per batter totals, e.g. the spot in the batting order."""
+
+        # Drop the oldest outcome from the window counts before it is pushed out
+        if len(self.recent) == self.recent.maxlen:
+            oldest = self.recent[0]
+            self.recent_basehits -= oldest in base_hit_outcomes
+            self.recent_hit_by_pitches -= oldest == 'Hit By Pitch'
+        self.recent.append(PA_outcome)
+        self.recent_basehits += PA_outcome in base_hit_outcomes
+        self.recent_hit_by_pitches += PA_outcome == 'Hit By Pitch'
+
+        self.batters_faced += 1
+        self.score += score
+        self.outcome_counts[PA_outcome] += 1
+
+        if batter is not None:
+            if batter not in self.batter_stats:
+                self.batter_stats[batter] = {'plate appearances': 0, 'base hits': 0, 'score': 0}
+            batter_stats = self.batter_stats[batter]
+            batter_stats['plate appearances'] += 1
+            batter_stats['base hits'] += PA_outcome in base_hit_outcomes
+            batter_stats['score'] += score
+
+    def mound_visit_reason(self, mound_visit_break, player_score=None):
+        """Apply the Mound Visit rules to the recent window, see mound_visit_rule().
+        The player's score is this game's score unless another is given."""
+        if player_score is None:
+            player_score = self.score
+        return mound_visit_rule(self.recent_basehits, self.recent_hit_by_pitches, mound_visit_break, player_score)
+
+    def header_lines(self):
+        """Return the game lines of the at bat header: batters faced, recent outcomes and outcome totals."""
+        totals = ', '.join(f"{outcome}: {count}" for outcome, count in self.outcome_counts.items() if count > 0)
+        return [f"Batters Faced: {self.batters_faced}",
+                f"Recent Outcomes: {self.recent_outcomes}",
+                f"Outcome Totals: {totals if totals else 'none yet'}"]
+
+    def summary_lines(self):
+        """Return an end of game summary as a list of lines."""
+        lines = [f"Batters Faced: {self.batters_faced}   Pitches Thrown: {self.pitches}"]
+        for outcome, count in self.outcome_counts.items():
+            if count > 0:
+                lines.append(f"    {outcome}: {count}")
+
+        # The zones where the most base hits were given up
+        hit_zones = sorted((zone for zone in pitch_zones if self.zone_stats[zone]['base hits'] > 0),
+                            key=lambda zone: -self.zone_stats[zone]['base hits'])
+        if hit_zones:
+            lines.append("Base hits given up by zone: " +
+                        ', '.join(f"{zone.strip('zone')}: {self.zone_stats[zone]['base hits']}" for zone in hit_zones[:3]))
+        return lines
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+"""The Instrumentation module measures where the time of an interactive
+game goes. When it is turned on, each phase of the game (loading POPZ
+tables, Pitcher.pitch, sampling the outcome, updating the StrikeZone,
+drawing the at bat screen, waiting for the user's input and pacing
+pauses) is timed and counted per Plate Appearance and per game, and a
+report is printed when the game ends. It can also run cProfile over the
+whole game and save the stats for pstats, snakeviz or flameprof.
+Instrumentation is off unless it is turned on in the Main Menu or with
+the STRIKEZONE_INSTRUMENTS environment variable:
+    STRIKEZONE_INSTRUMENTS=on       phase timings and counters
+    STRIKEZONE_INSTRUMENTS=profile  timings, counters and a cProfile file
+When it is off, each instrumented call costs one method call that
+returns immediately, and the headless simulations are not instrumented.
+There is one Instrumentation per process (instruments), which times one
+game at a time, so the game server turns it off for all its sessions."""
+
+
+# -------------------- Import Modules -------------------- #
+import cProfile
+import os
+import os.path
+import time
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Environment variable used to turn on instrumentation, and its accepted values
+instruments_env_var = 'STRIKEZONE_INSTRUMENTS'
+instrument_modes = ('off', 'on', 'profile')
+
+# Phases of the game that are timed, in the order they are reported
+phases = ('popz load', 'pitch', 'outcome', 'strikezone', 'render', 'autosave', 'input', 'pacing sleep')
+
+# Directory the cProfile stats of each game are saved to
+profile_dir = 'data/profiles/'
+profile_filepath = os.path.join( os.path.split(os.path.dirname(__file__))[0] , profile_dir )
+
+
+
+
+# -------------------- Instrumentation Class -------------------- #
+
+class Instrumentation:
+    """The Instrumentation class collects phase timings and counters.
+    A phase is timed by calling start() before it and stop() after it:
+        started = instruments.start()
+        the_pitch = pitcher.pitch('Fastball', 'zone5', batter)
+        instruments.stop('pitch', started)
+    start() returns None when instrumentation is off, and stop() ignores it.
+    Totals are kept for the current Plate Appearance, the current game and
+    the whole session, and are available as attributes:
+     - pa_totals, game_totals, session_totals: {phase: [calls, seconds, longest]}
+     - counters: {name: count} for the current game, e.g. 'pitches', 'frames'
+     - plate_appearances: one dictionary per Plate Appearance of the current game"""
+
+    def __init__(self, mode='off'):
+        self.set_mode(mode)
+        self.session_totals = new_phase_totals()
+        self.reset_game()
+
+    def set_mode(self, mode):
+        """Turn instrumentation 'off', 'on', or on with cProfile ('profile').
+        Raises a ValueError for anything else."""
+        mode = str(mode).strip().lower()
+        if mode not in instrument_modes:
+            raise ValueError(f"Instrumentation mode must be one of {', '.join(instrument_modes)}.")
+        self.mode = mode
+        self.enabled = mode != 'off'
+        self.profile = mode == 'profile'
+
+    def reset_game(self):
+        """Empty the totals of the current game and Plate Appearance."""
+        self.game_totals = new_phase_totals()
+        self.pa_totals = new_phase_totals()
+        self.counters = {}
+        self.plate_appearances = []
+        self.game_id = None
+        self.game_started = None
+        self.game_seconds = 0.0
+        self.pa_started = None
+        self.profiler = None
+
+    def start(self):
+        """Return the start time of a phase, or None if instrumentation is off."""
+        if self.enabled:
+            return time.perf_counter()
+        return None
+
+    def stop(self, phase, started):
+        """Add the time since started to a phase's totals."""
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        for totals in (self.pa_totals, self.game_totals, self.session_totals):
+            phase_totals = totals[phase]
+            phase_totals[0] += 1
+            phase_totals[1] += elapsed
+            if elapsed > phase_totals[2]:
+                phase_totals[2] = elapsed
+
+    def count(self, name, n=1):
+        """Add n to a counter of the current game, e.g. count('frame bytes', 812)."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def begin_game(self, game_id=0):
+        """Start the totals of a new game, and cProfile if it is on."""
+        if not self.enabled:
+            return
+        self.reset_game()
+        self.game_id = game_id
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.game_started = time.perf_counter()
+
+    def begin_plate_appearance(self):
+        """Start the totals of a new Plate Appearance."""
+        if not self.enabled:
+            return
+        self.pa_totals = new_phase_totals()
+        self.pa_started = time.perf_counter()
+
+    def end_plate_appearance(self, batter=None, PA_outcome=None):
+        """Save the totals of the current Plate Appearance to plate_appearances."""
+        if not self.enabled or self.pa_started is None:
+            return
+        self.plate_appearances.append({'batter': batter,
+                                        'outcome': PA_outcome,
+                                        'seconds': time.perf_counter() - self.pa_started,
+                                        'phases': self.pa_totals})
+        self.pa_started = None
+        self.count('plate appearances')
+
+    def end_game(self):
+        """Stop timing the game and save its cProfile stats, if any.
+        Returns the profile's filename, or None if it was not profiled."""
+        if not self.enabled or self.game_started is None:
+            return None
+        self.game_seconds = time.perf_counter() - self.game_started
+        self.game_started = None
+
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+        os.makedirs(profile_filepath, exist_ok=True)
+        filename = os.path.join(profile_filepath, f'game_{self.game_id}.prof')
+        self.profiler.dump_stats(filename)
+        self.profiler = None
+        return filename
+
+    def report_lines(self):
+        """Return the current game's phase timings and counters as a list of lines.
+        Each phase shows its calls, total and average time per Plate Appearance, the
+        longest call and its share of the game's wall time."""
+        if not self.enabled:
+            return []
+        n_PAs = max(1, len(self.plate_appearances))
+        game_seconds = self.game_seconds if self.game_seconds > 0 else 1.0
+
+        lines = [f"Instrumentation: {self.game_seconds:.2f} s over {len(self.plate_appearances)} plate appearances",
+                f"{'phase':<14}{'calls':>8}{'total s':>10}{'s per PA':>10}{'max ms':>10}{'% game':>8}"]
+        timed_seconds = 0.0
+        for phase in phases:
+            calls, seconds, longest = self.game_totals[phase]
+            if calls == 0:
+                continue
+            timed_seconds += seconds
+            lines.append(f"{phase:<14}{calls:>8}{seconds:>10.3f}{seconds / n_PAs:>10.3f}"
+                        f"{longest * 1000:>10.2f}{100 * seconds / game_seconds:>7.1f}%")
+        other_seconds = max(0.0, self.game_seconds - timed_seconds)
+        lines.append(f"{'other':<14}{'':>8}{other_seconds:>10.3f}{other_seconds / n_PAs:>10.3f}"
+                    f"{'':>10}{100 * other_seconds / game_seconds:>7.1f}%")
+        if self.counters:
+            lines.append("Counters: " + ', '.join(f"{name}: {count}" for name, count in self.counters.items()))
+
+        # POPZ tables are loaded before the game starts, so they are reported for the session
+        calls, seconds, longest = self.session_totals['popz load']
+        if calls > 0:
+            lines.append(f"POPZ loads this session: {calls}, {seconds:.3f} s (longest {longest * 1000:.2f} ms)")
+        return lines
+
+    def __str__(self):
+        return self.mode
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def new_phase_totals():
+    """Return empty phase totals: {phase: [calls, total seconds, longest call in seconds]}."""
+    return {phase: [0, 0.0, 0.0] for phase in phases}
+
+def instruments_from_environment():
+    """Create an Instrumentation with the mode in the STRIKEZONE_INSTRUMENTS environment variable,
+    or turned off if it is not set or not valid."""
+    try:
+        return Instrumentation(os.environ.get(instruments_env_var, 'off'))
+    except ValueError:
+        print(f'Invalid {instruments_env_var} value, instrumentation is off.')
+        return Instrumentation()
+
+# The instrumentation shared by every game in this process
+instruments = instruments_from_environment()
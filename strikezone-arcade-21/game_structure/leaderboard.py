@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+"""The Leaderboard module keeps every finished game in an SQLite database
+(data/leaderboard.db) so scores outlive the program. Each game is stored
+with its pitcher, opponent, score, batters faced and PA outcome counts,
+and whether it was played at the console, on the game server or in a
+simulation. Games are buffered and written in batches, one transaction
+per batch, and the database runs in WAL mode so the leaderboard can be
+read while simulations write to it. Top scores, per-pitcher summaries
+and percentiles are answered from indexes on the score:
+    python3 -m game_structure.leaderboard --top 10 --pitcher "Clayton Kershaw" """
+
+
+# -------------------- Import Modules -------------------- #
+import argparse
+import os
+import os.path
+import sqlite3
+import time
+
+from game_structure.countrules import PA_outcomes
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Data directory shortcuts
+leaderboard_filename = os.path.join( os.path.split(os.path.dirname(__file__))[0] , 'data/leaderboard.db' )
+
+# Games buffered before they are written, and the longest a game waits to be written (seconds)
+default_batch_size = 500
+default_flush_interval = 5.0
+
+# Seconds to wait for another process (e.g. a simulation worker) to finish writing
+busy_timeout = 30.0
+
+# Where a game was played, and the sources of games played by people
+game_sources = ('game', 'server', 'simulation')
+player_sources = ('game', 'server')
+
+# Column of each PA outcome's count, e.g. "Hit By Pitch" -> hit_by_pitch
+outcome_columns = {outcome: outcome.lower().replace(' ', '_') for outcome in PA_outcomes}
+
+# Columns of the games table, in insert order
+game_columns = (('played_at', 'REAL NOT NULL'),
+                ('source', 'TEXT NOT NULL'),
+                ('game_id', 'INTEGER'),
+                ('pitcher', 'TEXT NOT NULL'),
+                ('opponent', 'TEXT NOT NULL'),
+                ('score', 'INTEGER NOT NULL'),
+                ('batters_faced', 'INTEGER NOT NULL')) + \
+                tuple((column, 'INTEGER NOT NULL DEFAULT 0') for column in outcome_columns.values())
+
+column_definitions = ', '.join('"' + column + '" ' + column_type for column, column_type in game_columns)
+column_names = ', '.join('"' + column + '"' for column, column_type in game_columns)
+
+schema = [f"CREATE TABLE IF NOT EXISTS games (id INTEGER PRIMARY KEY, {column_definitions})",
+            # Top scores overall, per pitcher and per source
+            "CREATE INDEX IF NOT EXISTS games_by_score ON games (score)",
+            "CREATE INDEX IF NOT EXISTS games_by_pitcher_score ON games (pitcher, score)",
+            "CREATE INDEX IF NOT EXISTS games_by_source_score ON games (source, score)"]
+
+insert_game = f"INSERT INTO games ({column_names}) VALUES ({', '.join(['?'] * len(game_columns))})"
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def where_clause(pitcher=None, source=None):
+    """Return the WHERE clause and its parameters that select the games of a pitcher and/or source.
+    source is one source, e.g. 'game', or a tuple of them, e.g. player_sources."""
+    conditions, parameters = [], []
+    if pitcher is not None:
+        conditions.append('pitcher = ?')
+        parameters.append(pitcher)
+    if isinstance(source, str):
+        conditions.append('source = ?')
+        parameters.append(source)
+    elif source is not None:
+        conditions.append(f"source IN ({', '.join(['?'] * len(source))})")
+        parameters.extend(source)
+    return ('WHERE ' + ' AND '.join(conditions) if conditions else ''), parameters
+
+
+
+
+# -------------------- Leaderboard Class -------------------- #
+
+class Leaderboard:
+    """The Leaderboard class records finished games and answers leaderboard queries.
+    record_game() only buffers a game; the buffer is written when it holds
+    batch_size games, when its oldest game has waited flush_interval seconds,
+    and on flush() or close(). timeout is how long (seconds) a write or query waits
+    for another connection to release the database. It can be used as a context manager:
+        with Leaderboard() as leaderboard:
+            leaderboard.record_game('Clayton Kershaw', 'Seattle Mariners', 12000, 14, outcome_counts)"""
+
+    def __init__(self, filename=leaderboard_filename, batch_size=default_batch_size,
+                flush_interval=default_flush_interval, timeout=busy_timeout):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.pending_since = None
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # WAL lets the leaderboard be read while games are written, and only
+        # needs a full sync at checkpoints, so batches are cheap to commit
+        self.connection = sqlite3.connect(filename, timeout=timeout)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            for statement in schema:
+                self.connection.execute(statement)
+
+    def record_game(self, pitcher, opponent, score, batters_faced, outcome_counts, source='game',
+                    game_id=None, played_at=None):
+        """Buffer one finished game.
+        pitcher, opponent = names, e.g. "Clayton Kershaw", "Seattle Mariners"
+        outcome_counts = {PA outcome: count}, e.g. GameStats.outcome_counts
+        source = 'game', 'server' or 'simulation'
+        game_id = optional seed or game number
+        played_at = time the game finished (Unix time), now by default"""
+        now = time.time()
+        self.pending.append((now if played_at is None else played_at, source, game_id,
+                            str(pitcher), str(opponent), score, batters_faced) +
+                            tuple(outcome_counts.get(outcome, 0) for outcome in outcome_columns))
+        if self.pending_since is None:
+            self.pending_since = now
+        if len(self.pending) >= self.batch_size or now - self.pending_since >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered games in one transaction."""
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(insert_game, self.pending)
+        self.pending = []
+        self.pending_since = None
+
+    def close(self):
+        """Write any buffered games and close the database."""
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """Number of games written to the leaderboard."""
+        return self.connection.execute('SELECT COUNT(*) FROM games').fetchone()[0]
+
+    def top_scores(self, n=10, pitcher=None, source=None):
+        """Return the n best games (of a pitcher and/or source), best first,
+        as dictionaries of the game's columns."""
+        where, parameters = where_clause(pitcher, source)
+        cursor = self.connection.execute(f'SELECT * FROM games {where} ORDER BY score DESC, id LIMIT ?',
+                                        parameters + [n])
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def pitcher_summary(self, source=None):
+        """Return {pitcher: {'games', 'best', 'average'}} for every pitcher on the leaderboard."""
+        where, parameters = where_clause(None, source)
+        cursor = self.connection.execute(f'SELECT pitcher, COUNT(*), MAX(score), AVG(score) FROM games {where} '
+                                        'GROUP BY pitcher ORDER BY MAX(score) DESC', parameters)
+        return {pitcher: {'games': games, 'best': best, 'average': average}
+                for pitcher, games, best, average in cursor}
+
+    def percentile_rank(self, score, pitcher=None, source=None):
+        """Return the percentage of games (of a pitcher and/or source) that scored below score,
+        or None if there are no games."""
+        where, parameters = where_clause(pitcher, source)
+        below_where = f"{where} AND score < ?" if where else "WHERE score < ?"
+        total = self.connection.execute(f'SELECT COUNT(*) FROM games {where}', parameters).fetchone()[0]
+        if total == 0:
+            return None
+        below = self.connection.execute(f'SELECT COUNT(*) FROM games {below_where}',
+                                        parameters + [score]).fetchone()[0]
+        return 100 * below / total
+
+    def score_at_percentile(self, percentile, pitcher=None, source=None):
+        """Return the score that percentile percent of games (of a pitcher and/or source)
+        scored at or below, e.g. score_at_percentile(50) is the median. None if there are no games."""
+        where, parameters = where_clause(pitcher, source)
+        total = self.connection.execute(f'SELECT COUNT(*) FROM games {where}', parameters).fetchone()[0]
+        if total == 0:
+            return None
+        offset = min(total - 1, max(0, round(percentile / 100 * total) - 1))
+        return self.connection.execute(f'SELECT score FROM games {where} ORDER BY score LIMIT 1 OFFSET ?',
+                                        parameters + [offset]).fetchone()[0]
+
+
+
+
+# -------------------- Command Line Access -------------------- #
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Show the StrikeZone Arcade '21 leaderboard.")
+    parser.add_argument('filename', nargs='?', default=leaderboard_filename, help='leaderboard database')
+    parser.add_argument('--top', type=int, default=10, help='number of top scores to show')
+    parser.add_argument('--pitcher', default=None, help='only games of this pitcher')
+    parser.add_argument('--source', default=None, choices=game_sources, help='only games played here')
+    args = parser.parse_args()
+
+    with Leaderboard(args.filename) as leaderboard:
+        print(f"{len(leaderboard)} games on the leaderboard")
+        print()
+        print(f"Top {args.top} scores:")
+        for rank, game in enumerate(leaderboard.top_scores(args.top, args.pitcher, args.source), start=1):
+            print(f"{rank:>4}. {game['score']:>8}  {game['pitcher']} against the {game['opponent']} "
+                    f"({game['batters_faced']} batters, {game['source']})")
+        print()
+        print("Score percentiles:")
+        for percentile in (50, 90, 99):
+            print(f"    {percentile}th: {leaderboard.score_at_percentile(percentile, args.pitcher, args.source)}")
+        print()
+        print("Pitchers:")
+        for pitcher, summary in leaderboard.pitcher_summary(args.source).items():
+            print(f"    {pitcher}: {summary['games']} games, best {summary['best']}, average {summary['average']:.1f}")
@@ -6,11 +6,126 @@ Baseball Teams to play with."""
 
 
 # -------------------- Import Modules -------------------- #
+from collections import OrderedDict
+from collections.abc import Mapping
+import json
+import os
+import os.path
+
 from players.player import Player
 from players.baseballteam import BaseballTeam
-from players.pitcher import Pitcher
+from players.pitcher import Pitcher, popz_json_filepath
+from players.popzstore import PopzStore, popz_store_filename
+from game_structure.instrumentation import instruments
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Pitcher names, teams and repertoires, keyed by POPZ file name (e.g. clayton_kershaw)
+pitcher_info_filename = os.path.join( os.path.split(os.path.dirname(__file__))[0] , 'data/pitcher_info.json' )
+
+# Number of pitchers whose POPZ tables are kept loaded
+default_cache_size = 16
+
+# The PitcherRegistry shared by every menu iteration and game, created on first use
+pitcher_registry = None
+
+
+
+
+# -------------------- PitcherRegistry Class -------------------- #
+
+class PitcherRegistry(Mapping):
+    """The PitcherRegistry class discovers every pitcher in data/popz/
+    (JSON files and the binary POPZ store) with a single directory scan
+    that only reads names and metadata. It acts like a dictionary of
+    {"Clayton Kershaw": Pitcher}, but a Pitcher's POPZ table is only
+    loaded when that Pitcher is first requested. The most recently used
+    Pitchers are kept in a bounded LRU cache. A Pitcher whose POPZ table
+    cannot be loaded raises a ValueError and is not cached."""
+
+    def __init__(self, popz_dir=popz_json_filepath, store_filename=popz_store_filename,
+                info_filename=pitcher_info_filename, cache_size=default_cache_size):
+        self.popz_dir = popz_dir
+        self.cache_size = cache_size
+        self.loaded = OrderedDict()
+
+        # Optional names, teams and repertoires
+        try:
+            with open(info_filename, 'r') as infile:
+                pitcher_info = json.load(infile)
+        except FileNotFoundError:
+            pitcher_info = {}
 
+        # Pitchers in the binary POPZ store (only its index is read)
+        self.store = None
+        if os.path.exists(store_filename):
+            self.store = PopzStore(store_filename)
+            keys = set(self.store.keys())
+        else:
+            keys = set()
 
+        # Pitchers with a JSON file
+        with os.scandir(popz_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json'):
+                    keys.add(entry.name[:-len('.json')])
+
+        # {"Clayton Kershaw": metadata dictionary}, in alphabetical order
+        self.pitchers = {}
+        for key in sorted(keys):
+            info = dict(pitcher_info.get(key, {}))
+            if 'first_name' not in info:
+                # Build the name from the file name, e.g. clayton_kershaw
+                first_name, _, last_name = key.partition('_')
+                info['first_name'] = first_name.title()
+                info['last_name'] = last_name.replace('_', ' ').title()
+            info['key'] = key
+            self.pitchers[f"{info['first_name']} {info['last_name']}".title()] = info
+
+    def __getitem__(self, name):
+        # Serve from the cache, marking this Pitcher as most recently used
+        if name in self.loaded:
+            self.loaded.move_to_end(name)
+            return self.loaded[name]
+
+        info = self.pitchers[name]
+        pitcher = Pitcher(info['first_name'], info['last_name'],
+                            info.get('team_city', '?'), info.get('team_name', '?'))
+
+        # Prefer the memory-mapped store, and fall back to the JSON file
+        started = instruments.start()
+        if self.store is not None and info['key'] in self.store:
+            pitcher.popz = self.store.get_popz(info['key'])
+        else:
+            pitcher.load_popz_from_json(os.path.join(self.popz_dir, info['key'] + '.json'))
+        instruments.stop('popz load', started)
+
+        # Without a known repertoire, the pitcher throws every pitch type with data in their POPZ table
+        if 'repertoire' in info:
+            pitcher.pitch_types = tuple(info['repertoire'])
+        else:
+            pitcher.pitch_types = tuple(pitch_type for pitch_type, zones in pitcher.popz.items()
+                                        if any(any(zone_dict.values()) for zone_dict in zones.values()))
+
+        # A Pitcher without a POPZ table or pitch types fails on its first pitch, so do not hand it out
+        if not pitcher.popz or not pitcher.pitch_types:
+            raise ValueError(f"{name}'s POPZ table could not be loaded.")
+
+        # Add to the cache, evicting the least recently used Pitcher if it is full
+        self.loaded[name] = pitcher
+        if len(self.loaded) > self.cache_size:
+            self.loaded.popitem(last=False)
+        return pitcher
+
+    def __iter__(self):
+        return iter(self.pitchers)
+
+    def __len__(self):
+        return len(self.pitchers)
+
+    def __contains__(self, name):
+        return name in self.pitchers
 
 
 
@@ -38,12 +153,9 @@ def create_baseball_teams():
     return loaded_teams
 
 def create_pitchers():
-    """This function loads available pitchers and returns them in a dictionary."""
-    loaded_pitchers = {}
-
-    # -- Clayton Kershaw
-    kershaw = Pitcher("Clayton", "Kershaw", "Los Angeles", "Dodgers", repertoire=('Fastball', 'Breaking'))
-    kershaw.load_popz_from_json()
-    loaded_pitchers['Clayton Kershaw'] = kershaw
-
-    return loaded_pitchers
\ No newline at end of file
+    """This function returns the available pitchers as a dictionary-like PitcherRegistry.
+    The registry scans data/popz/ once per process and loads each Pitcher on first use."""
+    global pitcher_registry
+    if pitcher_registry is None:
+        pitcher_registry = PitcherRegistry()
+    return pitcher_registry
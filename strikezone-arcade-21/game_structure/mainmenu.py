@@ -2,17 +2,28 @@
 
 """The MainMenu class creates and displays a menu for the game
 so that the user may select from different options. Currently,
-the Main Menu let's the user [1] Play the game and [2] Learn
-how the game's engine works."""
+the Main Menu let's the user [1] Play the game, [2] Learn
+how the game's engine works, [3] Change the game speed,
+[4] Turn on instrumentation that times each part of a game,
+[5] See the leaderboard of every finished game and [6] Resume
+the last game that was quit before it was over."""
 
 
 # -------------------- Import Modules -------------------- #
-from os import system
+import sqlite3
 
+from game_structure import pacing
+from game_structure.instrumentation import instruments
 from game_structure.loadgame import create_pitchers
 from game_structure.loadgame import create_baseball_teams
 from game_structure.baseballgame import BaseballGame
+from game_structure.gamerecord import GameRecorder, recording_filename
+from game_structure.gamesnapshot import autosave_filename, load_snapshot
+from game_structure.leaderboard import Leaderboard, player_sources
+from game_structure.pitcheventstore import PitchEventStore
 from game_structure.plateappearance import PA_outcome_scoring_dict
+from game_structure.renderer import clear_screen
+from game_structure.sessioncontext import SessionContext
 from players.batter import Batter
 
 
@@ -28,12 +39,23 @@ class MainMenu:
     def __init__(self):
 
         # Enter user input loop
-        menu_options = ['1', '2']
+        menu_options = ['1', '2', '3', '4', '5', '6']
         recent_score = 0
+        recent_rank = None
+
+        # This player's session: it seeds each game and counts the games played
+        self.context = SessionContext()
+
+        # Leaderboard that every finished game is added to
+        try:
+            self.leaderboard = Leaderboard()
+        except sqlite3.Error as err:
+            print(f'The leaderboard is not available: {type(err)} {err}')
+            self.leaderboard = None
 
         while True:
             # Clear console for prettier printing
-            system('clear')
+            clear_screen()
             
             # Print Main Menu header
             print()
@@ -47,12 +69,28 @@ class MainMenu:
             print()
             print("2: Game Information")
             print()
+            print(f"3: Game Speed (currently {pacing.clock})")
+            print()
+            print(f"4: Instrumentation (currently {instruments})")
+            print()
+            print("5: Leaderboard")
+            print()
+            # The game autosaved before the user quit, if it was not over
+            try:
+                snapshot = load_snapshot(autosave_filename)
+            except (OSError, ValueError):
+                snapshot = None
+            if snapshot is not None:
+                print(f"6: Resume Game ({snapshot.pitcher} against the {snapshot.team}, score {snapshot.player_score})")
+                print()
             print()
             print('Press q to quit the game.')
             print()
             print()
             if recent_score != 0:
                 print(f"Last Player Score: {recent_score}")
+                if recent_rank is not None:
+                    print(f"Better than {recent_rank:.1f}% of players' games")
                 print()
                 print()
 
@@ -65,6 +103,8 @@ class MainMenu:
                 print()
                 print("Thank you for playing!")
                 print()
+                if self.leaderboard is not None:
+                    self.leaderboard.close()
                 quit()
 
             # Case: User provides invalid input
@@ -98,7 +138,12 @@ class MainMenu:
                         
                         # Case: Game setup continues
                         elif command.strip().lower().title() in pitchers.keys():
-                            player_pitcher = pitchers[command.strip().lower().title()]
+                            try:
+                                player_pitcher = pitchers[command.strip().lower().title()]
+                            except ValueError as err:
+                                # The pitcher's POPZ table is missing or broken
+                                print(err)
+                                continue
 
                             # Load baseball teams to pitch against
                             teams = create_baseball_teams()
@@ -127,13 +172,21 @@ class MainMenu:
                                     # Tell the user:
                                     print(f'Beginning game as {player_pitcher.first_name} {player_pitcher.last_name} against {player_opponent}!')
                                     
-                                    # Begin BaseballGame!
-                                    baseballgame = BaseballGame(player_pitcher, player_opponent)
+                                    # Record the game so it can be replayed later,
+                                    # and keep its pitches with those of past games
+                                    seed = self.context.new_game_seed()
+                                    recorder = GameRecorder(seed, player_pitcher, player_opponent, settings=self.context.settings)
+                                    event_store = PitchEventStore()
+
+                                    # Begin BaseballGame! It is autosaved so it can be resumed if the user quits
+                                    baseballgame = BaseballGame(player_pitcher, player_opponent, seed=seed, recorder=recorder,
+                                                                event_store=event_store, context=self.context,
+                                                                autosave=autosave_filename)
                                     # BaseballGame returns 'quit' if user quits before begins
                                     if baseballgame == 'quit':
                                         break
                                     else:
-                                        recent_score = baseballgame.play_ball()
+                                        recent_score, recent_rank = self.play_game(baseballgame, recorder, event_store)
                                         # Return to Main Menu when game is over
                                         break
 
@@ -229,5 +282,136 @@ class MainMenu:
                     print()
                     input("Press enter to return to Main Menu.")
 
+                # 3 Case: Change how long the game pauses between pitches and batters
+                elif command.lower() == '3':
+                    print()
+                    print("Pick a game speed:")
+                    print("normal:  the game pauses for dramatic effect")
+                    print("fast:    pauses are a quarter as long")
+                    print("instant: no pauses at all")
+                    print()
+                    command = input("Input a game speed (e.g. fast): ")
+                    try:
+                        pacing.clock.set_mode(command)
+                    except ValueError:
+                        print()
+                        print("Please provide a valid game speed.")
+                        print()
+                        input("Press enter to return to Main Menu.")
+
+                # 4 Case: Time each part of the game and report it when the game ends
+                elif command.lower() == '4':
+                    print()
+                    print("Pick an instrumentation mode:")
+                    print("off:     no timings (fastest)")
+                    print("on:      time each part of the game and report it at game end")
+                    print("profile: also save cProfile stats of each game to data/profiles/")
+                    print()
+                    command = input("Input an instrumentation mode (e.g. on): ")
+                    try:
+                        instruments.set_mode(command)
+                    except ValueError:
+                        print()
+                        print("Please provide a valid instrumentation mode.")
+                        print()
+                        input("Press enter to return to Main Menu.")
+
+                # 5 Case: Show the best games played and each pitcher's best score
+                elif command.lower() == '5':
+                    print()
+                    if self.leaderboard is None:
+                        print("The leaderboard is not available.")
+                    else:
+                        print("------ Leaderboard ------")
+                        print()
+                        top_games = self.leaderboard.top_scores(10, source=player_sources)
+                        if not top_games:
+                            print("No games have been finished yet. Take the mound!")
+                        for rank, game in enumerate(top_games, start=1):
+                            print(f"{rank:>3}. {game['score']:>7}  {game['pitcher']} against the {game['opponent']} "
+                                    f"({game['batters_faced']} batters)")
+                        print()
+                        for pitcher, summary in self.leaderboard.pitcher_summary(player_sources).items():
+                            print(f"{pitcher}: best {summary['best']}, average {summary['average']:.0f} "
+                                    f"over {summary['games']} games")
+                    print()
+                    input("Press enter to return to Main Menu.")
+
+                # 6 Case: Continue the last game from its autosave
+                elif command.lower() == '6':
+                    print()
+                    pitchers = create_pitchers()
+                    teams = create_baseball_teams()
+                    if snapshot is None:
+                        print("There is no game to resume.")
+                        print()
+                        input("Press enter to return to Main Menu.")
+                    elif snapshot.pitcher not in pitchers or snapshot.team not in teams:
+                        print("The saved game's pitcher or team is no longer available.")
+                        print()
+                        input("Press enter to return to Main Menu.")
+                    else:
+                        try:
+                            pitcher = pitchers[snapshot.pitcher]
+                        except ValueError as err:
+                            # The pitcher's POPZ table is missing or broken
+                            print(err)
+                            print()
+                            input("Press enter to return to Main Menu.")
+                            continue
+                        print(f'Resuming game as {snapshot.pitcher} against the {snapshot.team}!')
+
+                        # Keep recording the game if its recording holds every pitch up to the snapshot
+                        recorder = None
+                        try:
+                            recorder = GameRecorder.load(recording_filename(snapshot.game_id))
+                            if recorder.pitches_recorded() != snapshot.stats['pitches']:
+                                recorder = None
+                        except (OSError, ValueError, KeyError):
+                            recorder = None
+                        event_store = PitchEventStore()
+
+                        baseballgame = BaseballGame(pitcher, teams[snapshot.team], recorder=recorder,
+                                                    event_store=event_store, context=self.context,
+                                                    autosave=autosave_filename, snapshot=snapshot)
+                        recent_score, recent_rank = self.play_game(baseballgame, recorder, event_store)
+
                 else:
-                    break
\ No newline at end of file
+                    break
+
+    def play_game(self, baseballgame, recorder, event_store):
+        """This method plays a BaseballGame, new or resumed, then saves its recording
+        and pitches and adds it to the leaderboard if it was played to the end.
+        It returns the player's score and its percentile among players' games (or None)."""
+        try:
+            score = baseballgame.play_ball()
+        finally:
+            # Write out the game's pitches whether or not the game or its recording fails
+            try:
+                event_store.close()
+            except OSError as err:
+                print(f'An error occurred while saving the pitch events: {type(err)} {err}')
+
+        rank = None
+        try:
+            if recorder is not None:
+                print(f"Game recording saved to {recorder.save()}")
+        except OSError as err:
+            print(f'An error occurred while saving the game recording: {type(err)} {err}')
+
+        # Add the game to the leaderboard if it was played to the end
+        if self.leaderboard is not None and baseballgame.mound_visits == 0:
+            try:
+                self.leaderboard.record_game(
+                    f"{baseballgame.pitcher.first_name} {baseballgame.pitcher.last_name}",
+                    baseballgame.opponent, score, baseballgame.stats.batters_faced,
+                    baseballgame.stats.outcome_counts, 'game', baseballgame.game_id)
+                self.leaderboard.flush()
+                rank = self.leaderboard.percentile_rank(score, source=player_sources)
+            except sqlite3.Error as err:
+                print(f'An error occurred while saving to the leaderboard: {type(err)} {err}')
+
+        # Leave the instrumentation report on screen until the user is done with it
+        if instruments.enabled:
+            input("Press enter to return to Main Menu.")
+        return score, rank
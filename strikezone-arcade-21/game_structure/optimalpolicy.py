@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+"""The OptimalPolicy module finds the best pitch to throw at every Count.
+For a Pitcher and a Batter, the pitch type and zone with the highest
+expected score is solved for each Count with dynamic programming over
+the Count states of the CountModel module. The results are saved as
+compact policy tables in data/policies/, loaded lazily and looked up
+in constant time by bots, the at bat hint line or the headless engine.
+Tables are kept per PitchSettings, as the best pitches depend on the
+league batting average, difficulty and batting average buckets."""
+
+
+# -------------------- Import Modules -------------------- #
+import json
+import os.path
+import random
+
+import players.pitcher
+from players.pitcher import pitch_types, pitch_zones, PitchSettings
+from game_structure.plateappearance import PA_outcome_scoring_dict
+from game_structure.countmodel import count_states, count_state_transitions
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Data directory shortcuts
+policy_json_dir = 'data/policies/'
+policy_json_filepath = os.path.join( os.path.split(os.path.dirname(__file__))[0] , policy_json_dir )
+
+# Policy tables already loaded from disk, shared by every OptimalPitchPolicy
+# {policy json filename: {PitchSettings: {bat_avg string: {count string: pitch command}}}}
+loaded_policy_tables = {}
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def pitch_command(pitch_type, zone):
+    """Encode a pitch as a user pitch command, e.g. ('Fastball', 'zone3') -> 'F3'."""
+    return f"{pitch_type[0]}{zone.strip('zone')}"
+
+def decode_pitch_command(command):
+    """Decode a pitch command into a pitch, e.g. 'B12' -> ('Breaking', 'zone12')."""
+    pitch_decode = {pitch_type[0]: pitch_type for pitch_type in pitch_types}
+    return (pitch_decode[command[0].upper()], 'zone' + command[1:])
+
+def count_key(the_count):
+    """Encode a Count as a table key, e.g. [3, 2] -> '3-2'."""
+    return f"{the_count[0]}-{the_count[1]}"
+
+def bat_avg_key(bat_avg):
+    """Encode a batting average as a table key, e.g. 0.273 -> '0.273'."""
+    return f"{float(bat_avg):.3f}"
+
+def current_pitch_settings():
+    """Return the current players.pitcher globals as a PitchSettings,
+    the settings Pitcher.pitch() uses when a game gives none."""
+    return PitchSettings(players.pitcher.avg_bat_avg, players.pitcher.difficulty_mult,
+                        players.pitcher.bat_avg_bucket_size)
+
+def solve_optimal_policy(pitcher, batter, settings=None):
+    """This function solves the pitch that maximizes the expected score at every Count.
+    Each Count is solved after all the Counts it can move to, so the value of a pitch is
+    its chance of each PA outcome times its points, plus its chance of each next Count
+    times the value of that Count. With 2 strikes, a Foul Ball keeps the same Count,
+    so a pitch's value there is (value of leaving the Count) / (1 - chance of a Foul Ball).
+    The optional settings are the PitchSettings the pitches are thrown with
+    (the current globals by default).
+    It returns two dictionaries keyed by (balls, strikes):
+    the best (pitch_type, zone) and its expected score."""
+
+    # Outcome probabilities (as fractions) of every pitch in the Pitcher's repertoire
+    pitch_probs = {}
+    for pitch_type in pitcher.pitch_types:
+        for zone in pitch_zones:
+            zone_dict = pitcher.pitch(pitch_type, zone, batter, settings).get_zone_outcome_probs()
+            pitch_probs[(pitch_type, zone)] = {outcome: prob / 100 for outcome, prob in zone_dict.items()}
+
+    best_pitches = {}
+    values = {}
+    for state in count_states:
+        for chosen_pitch, outcome_probs in pitch_probs.items():
+            value = 0.0
+            stay_prob = 0.0
+            for pitch_outcome, prob in outcome_probs.items():
+                kind, result = count_state_transitions[state][pitch_outcome]
+                if kind == 'outcome':
+                    value += prob * PA_outcome_scoring_dict[result]
+                elif result == state:
+                    stay_prob += prob
+                else:
+                    value += prob * values[result]
+
+            # A pitch that can only be fouled off never ends the PA, so it is never chosen
+            if stay_prob >= 1.0:
+                continue
+            value = value / (1.0 - stay_prob)
+
+            if state not in values or value > values[state]:
+                values[state] = value
+                best_pitches[state] = chosen_pitch
+
+    return best_pitches, values
+
+def get_policy_json_filename(pitcher):
+    """Return the policy table filename for this Pitcher,
+    e.g. data/policies/clayton_kershaw.json"""
+    return policy_json_filepath + pitcher.first_name.lower() + '_' + pitcher.last_name.lower() + '.json'
+
+def load_policy_tables(pitcher, settings=None):
+    """Return the policy tables for this Pitcher and PitchSettings (the current globals
+    by default), reading the Pitcher's JSON file the first time only. The file keeps
+    the tables of each settings solved so far, with all three settings, so tables
+    solved with another avg_bat_avg, difficulty_mult or bat_avg_bucket_size are not used."""
+
+    if settings is None:
+        settings = current_pitch_settings()
+    settings = PitchSettings(*settings)
+
+    policy_json_filename = get_policy_json_filename(pitcher)
+    if policy_json_filename not in loaded_policy_tables:
+        settings_tables = {}
+        try:
+            with open(policy_json_filename, 'r') as infile:
+                saved = json.load(infile)
+            for saved_settings in saved.get('settings', []):
+                saved_key = PitchSettings(*(saved_settings.get(field) for field in PitchSettings._fields))
+                settings_tables[saved_key] = saved_settings['tables']
+        except FileNotFoundError:
+            # No tables solved yet for this pitcher
+            pass
+        loaded_policy_tables[policy_json_filename] = settings_tables
+    return loaded_policy_tables[policy_json_filename].setdefault(settings, {})
+
+def write_policy_tables(pitcher):
+    """Write this Pitcher's loaded policy tables, for every settings, to a JSON file in data/policies/"""
+    policy_json_filename = get_policy_json_filename(pitcher)
+    load_policy_tables(pitcher)
+    saved = [dict(settings._asdict(), tables=tables)
+            for settings, tables in loaded_policy_tables[policy_json_filename].items() if tables]
+    os.makedirs(policy_json_filepath, exist_ok=True)
+    with open(policy_json_filename, 'w+') as outfile:
+        json.dump({'settings': saved}, outfile, indent=1, sort_keys=True)
+
+def get_policy_table(pitcher, batter, save=False, settings=None):
+    """Return the policy table for this Pitcher and Batter under these PitchSettings
+    (the current globals by default), solving it if it has not been solved before.
+    The table maps count strings to pitch commands, e.g. {'0-0': 'F3', '0-1': 'B12', ...}.
+    Set save to write new tables to disk."""
+
+    tables = load_policy_tables(pitcher, settings)
+    key = bat_avg_key(batter.bat_avg)
+    if key not in tables:
+        best_pitches, values = solve_optimal_policy(pitcher, batter, settings)
+        tables[key] = {count_key(state): pitch_command(*best_pitches[state]) for state in count_states}
+        if save:
+            write_policy_tables(pitcher)
+    return tables[key]
+
+
+
+
+# -------------------- OptimalPitchPolicy Class -------------------- #
+
+class OptimalPitchPolicy:
+    """This pitch-selection policy throws the pitch with the highest expected
+    score for the current Batter and Count, using the cached policy tables.
+    It can be used by the headless simulation, a bot player or the at bat hint.
+    Set save to write newly solved tables to data/policies/. settings are the
+    PitchSettings of the games it advises (e.g. SessionContext.settings); by
+    default it follows the current players.pitcher globals."""
+
+    def __init__(self, save=False, settings=None):
+        self.save = save
+        self.settings = None if settings is None else PitchSettings(*settings)
+        # Decoded pitches per (pitcher, settings, bat_avg key, count key) for constant time lookups
+        self.pitches = {}
+
+    def get_pitch(self, pitcher, batter, the_count):
+        """Return the best (pitch_type, zone) for this Count."""
+        settings = self.settings if self.settings is not None else current_pitch_settings()
+        key = (pitcher, settings, bat_avg_key(batter.bat_avg), the_count[0], the_count[1])
+        if key not in self.pitches:
+            table = get_policy_table(pitcher, batter, self.save, settings)
+            for state in count_states:
+                self.pitches[key[:3] + state] = decode_pitch_command(table[count_key(state)])
+        return self.pitches[key]
+
+    def __call__(self, pitcher, batter, the_count, rng=random):
+        return self.get_pitch(pitcher, batter, the_count)
+
+    def distribution(self, pitcher, batter, the_count):
+        """Return the best pitch with probability 1, see RandomPitchPolicy.distribution()."""
+        return {self.get_pitch(pitcher, batter, the_count): 1.0}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""The OutcomeSampler module compiles a dictionary of outcome
+probabilities into a cumulative distribution so that outcomes
+can be drawn quickly and with exact float probabilities."""
+
+
+# -------------------- Import Modules -------------------- #
+from bisect import bisect_right
+import random
+
+
+
+
+
+
+# -------------------- OutcomeSampler Class -------------------- #
+
+class OutcomeSampler:
+    """The OutcomeSampler class is created from a dictionary of
+    outcomes and their probabilities (in any scale, e.g. percentages).
+    The probabilities are stored as a cumulative distribution (CDF),
+    and each call to sample() draws one random float and finds its
+    outcome with a binary search, so no objects are built per draw.
+    If a codes dictionary is given (e.g. pitch_outcome_codes), sample()
+    returns the code of each outcome instead of its key."""
+
+    def __init__(self, outcome_probs, codes=None):
+        # Outcomes and their running (cumulative) probability totals, in the same order
+        if codes is None:
+            self.outcomes = tuple(outcome_probs.keys())
+        else:
+            self.outcomes = tuple(codes[outcome] for outcome in outcome_probs.keys())
+        cdf = []
+        total = 0.0
+        last_index = -1
+        for index, prob in enumerate(outcome_probs.values()):
+            total += float(prob)
+            cdf.append(total)
+            # Remember the last outcome that can actually happen
+            if float(prob) > 0.0:
+                last_index = index
+
+        if last_index < 0:
+            raise ValueError('Cannot sample outcomes when every probability is zero.')
+
+        self.cdf = tuple(cdf)
+        self.total = total
+        self.last_index = last_index
+
+    def sample(self, rng=random):
+        """This method draws one outcome. The rng parameter can be a random.Random
+        instance for seeded simulations, and is the global random module by default."""
+
+        # Find the first outcome whose cumulative total is above the random number
+        index = bisect_right(self.cdf, rng.random() * self.total)
+
+        # Floating point rounding can land exactly on the total, so stay in bounds
+        if index > self.last_index:
+            index = self.last_index
+
+        return self.outcomes[index]
+
+    def __repr__(self):
+        return f"OutcomeSampler({dict(zip(self.outcomes, self.cdf))})"
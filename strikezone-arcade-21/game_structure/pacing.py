@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""The Pacing module controls the dramatic pauses of the game, such as
+the wind up before a pitch or the countdown before the next batter.
+Every pause in the game goes through a PacingClock, which can play the
+game at normal speed, faster (scaled pauses) or instantly (no pauses).
+The shared clock's mode can be picked in the Main Menu or with the
+STRIKEZONE_PACING environment variable, e.g. STRIKEZONE_PACING=instant
+or STRIKEZONE_PACING=0.5 for pauses at half length."""
+
+
+# -------------------- Import Modules -------------------- #
+import math
+import os
+import time
+
+from game_structure.instrumentation import instruments
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Pacing modes and how much they scale each pause
+pacing_modes = {'normal': 1.0, 'fast': 0.25, 'instant': 0.0}
+
+# Environment variable used to pick the pacing mode
+pacing_env_var = 'STRIKEZONE_PACING'
+
+
+
+
+# -------------------- PacingClock Class -------------------- #
+
+class PacingClock:
+    """The PacingClock class replaces time.sleep() in the game.
+    Its mode is 'normal', 'fast' or 'instant', or a number that
+    every pause length is multiplied by."""
+
+    def __init__(self, mode='normal'):
+        self.set_mode(mode)
+
+    def set_mode(self, mode):
+        """Set the pacing mode by name ('normal', 'fast', 'instant') or as a scale, e.g. 0.5.
+        Raises a ValueError for anything else."""
+        if isinstance(mode, str) and mode.strip().lower() in pacing_modes:
+            self.mode = mode.strip().lower()
+            self.scale = pacing_modes[self.mode]
+        else:
+            scale = float(mode)
+            # 'inf' and 'nan' also parse as floats, but cannot be slept for
+            if not math.isfinite(scale) or scale < 0:
+                raise ValueError('The pacing scale must be a number of 0 or more.')
+            self.mode = str(mode)
+            self.scale = scale
+
+    def delay(self, seconds):
+        """Return how long a pause of this many seconds lasts with the current mode."""
+        return seconds * self.scale
+
+    def sleep(self, seconds):
+        """Pause the game for a scaled number of seconds. Instant mode does not pause at all."""
+        if self.scale > 0:
+            started = instruments.start()
+            time.sleep(seconds * self.scale)
+            instruments.stop('pacing sleep', started)
+
+    def __str__(self):
+        return self.mode
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def clock_from_environment():
+    """Create a PacingClock with the mode in the STRIKEZONE_PACING environment variable,
+    or in normal mode if it is not set or not valid."""
+    try:
+        return PacingClock(os.environ.get(pacing_env_var, 'normal'))
+    except ValueError:
+        print(f'Invalid {pacing_env_var} value, using normal pacing.')
+        return PacingClock()
+
+# The clock used by every game unless another one is passed in
+clock = clock_from_environment()
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
 """The Pitch module saves pitch-related information in a container,
-making it easier to transfer information from the Pitcher to the Batter."""
+making it easier to transfer information from the Pitcher to the Batter.
+Pitch objects are shared: the Pitcher hands out the same Pitch for the
+same pitch type, zone and batting average, so the pitch histories of a
+long game or simulation hold references rather than copies."""
 
 
+# -------------------- Import Modules -------------------- #
+from game_structure.outcomesampler import OutcomeSampler
 
 
 
@@ -13,16 +18,32 @@ making it easier to transfer information from the Pitcher to the Batter."""
 class Pitch:
     """This class represents a Pitch delivered by a Pitcher.
     It holds a dictionary of pitch outcomes with their probabilities
-    as created by the Pitcher for use by the Batter."""
+    as created by the Pitcher for use by the Batter, and the integer
+    codes of its pitch type and zone (see the CountRules module).
+    A Pitch may be shared, so its zone dictionary should not be changed."""
 
-    def __init__(self, pitch_type, zone, zone_dict):
+    __slots__ = ('pitch_type', 'zone', 'zone_dict', 'sampler', 'pitch_type_code', 'zone_code')
+
+    def __init__(self, pitch_type, zone, zone_dict, sampler=None, pitch_type_code=None, zone_code=None):
         self.pitch_type = pitch_type
         self.zone = zone
         self.zone_dict = zone_dict
+        self.sampler = sampler
+        self.pitch_type_code = pitch_type_code
+        self.zone_code = zone_code
 
     def get_zone_outcome_probs(self):
         return self.zone_dict
 
+    def get_outcome_sampler(self):
+        """Return the OutcomeSampler for this Pitch's probabilities, which draws
+        PitchOutcome codes, compiling it the first time it is needed."""
+        if self.sampler is None:
+            # Imported here, as the CountRules module is built from the Pitcher module, which imports this one
+            from game_structure.countrules import pitch_outcome_codes
+            self.sampler = OutcomeSampler(self.zone_dict, pitch_outcome_codes)
+        return self.sampler
+
     def __str__(self):
         return f"{self.pitch_type[0]}{self.zone.strip('zone')}"
 
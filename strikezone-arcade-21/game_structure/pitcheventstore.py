@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+"""The PitchEventStore module keeps every pitch of played and simulated
+games on disk. Pitches are appended to compact typed arrays, one per
+column (game id, batter index, Count, pitch type, zone, outcome and
+score change), and every few thousand pitches the arrays are flushed
+to the end of a binary file as one chunk and emptied, so no Python
+objects are kept alive for past pitches. An event file is read back by
+memory-mapping it, and its columns can be used without parsing:
+    python3 -m game_structure.pitcheventstore data/events/played_games.pev"""
+
+
+# -------------------- Import Modules -------------------- #
+from array import array
+import mmap
+import os
+import os.path
+import struct
+import sys
+
+from players.pitcher import pitch_outcomes
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Data directory shortcuts
+event_dir = 'data/events/'
+event_filepath = os.path.join( os.path.split(os.path.dirname(__file__))[0] , event_dir )
+played_games_filename = os.path.join(event_filepath, 'played_games.pev')
+
+# Columns and their array typecodes, widest first so every column stays aligned.
+#  - game_id: game number, e.g. the game's seed or its number in a simulation
+#  - batter_index: number of batters faced in the game before this one
+#  - count: Count code before the pitch (see the CountRules module)
+#  - pitch_type, zone, outcome: PitchType, Zone and PitchOutcome codes
+#  - score_delta: points scored by this pitch, non-zero only when it ends the Plate Appearance
+event_columns = (('game_id', 'Q'),
+                ('batter_index', 'I'),
+                ('score_delta', 'i'),
+                ('count', 'B'),
+                ('pitch_type', 'B'),
+                ('zone', 'B'),
+                ('outcome', 'B'))
+event_row_size = sum(array(typecode).itemsize for name, typecode in event_columns)
+
+# Chunk layout (little-endian): a header with the magic, version and number of pitches,
+# then each column's values one after another, padded to a multiple of 8 bytes
+event_store_magic = b'PEVT'
+event_store_version = 1
+chunk_header_struct = struct.Struct('<4sHxxQ')
+
+# Pitches held in memory before a chunk is written
+default_chunk_rows = 65536
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def chunk_size(n_rows):
+    """Return the number of bytes a chunk of n_rows pitches takes in the file."""
+    size = chunk_header_struct.size + n_rows * event_row_size
+    return size + (-size % 8)
+
+
+
+
+# -------------------- PitchEventStore Class -------------------- #
+
+class PitchEventStore:
+    """The PitchEventStore class appends pitch events to a file.
+    Events are buffered in one array per column and written as a
+    chunk whenever chunk_rows pitches are buffered, and when the
+    store is closed. It can be used as a context manager:
+        with PitchEventStore('events.pev') as event_store:
+            simulate_game(pitcher, team, event_store=event_store)"""
+
+    def __init__(self, filename=played_games_filename, chunk_rows=default_chunk_rows):
+        self.filename = filename
+        self.chunk_rows = chunk_rows
+        self.columns = {name: array(typecode) for name, typecode in event_columns}
+        self.rows_written = 0
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def append(self, game_id, batter_index, count, pitch_type, zone, outcome, score_delta=0):
+        """Append one pitch. All values are integers (codes for the Count, pitch type,
+        zone and outcome). A full buffer is written to the file as a chunk."""
+        columns = self.columns
+        columns['game_id'].append(game_id)
+        columns['batter_index'].append(batter_index)
+        columns['score_delta'].append(score_delta)
+        columns['count'].append(count)
+        columns['pitch_type'].append(pitch_type)
+        columns['zone'].append(zone)
+        columns['outcome'].append(outcome)
+        if len(columns['game_id']) >= self.chunk_rows:
+            self.flush()
+
+    def __len__(self):
+        """Number of pitches appended, written or still buffered."""
+        return self.rows_written + len(self.columns['game_id'])
+
+    def flush(self):
+        """Write the buffered pitches to the end of the file as one chunk and empty the buffers."""
+        n_rows = len(self.columns['game_id'])
+        if n_rows == 0:
+            return
+
+        chunk = bytearray(chunk_header_struct.pack(event_store_magic, event_store_version, n_rows))
+        for name, typecode in event_columns:
+            column = self.columns[name]
+            if sys.byteorder != 'little':
+                column.byteswap()
+            chunk += column.tobytes()
+        chunk += bytes(-len(chunk) % 8)
+
+        # The whole chunk is written at once, so a reader never sees half of it
+        with open(self.filename, 'ab') as outfile:
+            outfile.write(chunk)
+
+        self.rows_written += n_rows
+        self.columns = {name: array(typecode) for name, typecode in event_columns}
+
+    def close(self):
+        """Write any buffered pitches."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+
+
+# -------------------- PitchEventReader Class -------------------- #
+
+class PitchEventReader:
+    """The PitchEventReader class memory-maps an event file written by a
+    PitchEventStore. Each chunk's columns are read in place as memoryviews,
+    so a file of millions of pitches is not loaded into memory. A chunk
+    that was cut off (e.g. the program stopped while writing it) is skipped."""
+
+    def __init__(self, filename=played_games_filename):
+        self.filename = filename
+        self.chunks = []
+        self.n_rows = 0
+
+        # An empty file cannot be mapped
+        if os.path.getsize(filename) == 0:
+            self.mapped = b''
+            return
+
+        with open(filename, 'rb') as infile:
+            self.mapped = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Find the complete chunks: [(offset of the first column, number of pitches)]
+        offset = 0
+        while offset + chunk_header_struct.size <= len(self.mapped):
+            magic, version, n_rows = chunk_header_struct.unpack_from(self.mapped, offset)
+            if magic != event_store_magic or version != event_store_version:
+                raise ValueError(f'{filename} is not a version {event_store_version} pitch event file.')
+            if offset + chunk_size(n_rows) > len(self.mapped):
+                break
+            self.chunks.append((offset + chunk_header_struct.size, n_rows))
+            self.n_rows += n_rows
+            offset += chunk_size(n_rows)
+
+    def __len__(self):
+        return self.n_rows
+
+    def iter_chunks(self):
+        """Yield each chunk as a dictionary of {column name: sequence of integers}.
+        The sequences are memoryviews of the mapped file on little-endian machines."""
+        for start, n_rows in self.chunks:
+            chunk = {}
+            for name, typecode in event_columns:
+                itemsize = array(typecode).itemsize
+                view = memoryview(self.mapped)[start:start + n_rows * itemsize]
+                if sys.byteorder == 'little':
+                    chunk[name] = view.cast(typecode)
+                else:
+                    chunk[name] = array(typecode, view.tobytes())
+                    chunk[name].byteswap()
+                start += n_rows * itemsize
+            yield chunk
+
+    def column(self, name):
+        """Return a whole column of the file as one array, e.g. reader.column('outcome')."""
+        typecode = dict(event_columns)[name]
+        values = array(typecode)
+        for chunk in self.iter_chunks():
+            values.extend(chunk[name])
+        return values
+
+    def summarize(self):
+        """Count the games, pitches and each pitch outcome in the file and add up the score.
+        Returns a dictionary {'games', 'pitches', 'score', 'outcomes': {outcome: count}}."""
+        game_ids = set()
+        score = 0
+        outcome_counts = [0] * len(pitch_outcomes)
+        for chunk in self.iter_chunks():
+            game_ids.update(chunk['game_id'])
+            score += sum(chunk['score_delta'])
+            for outcome in chunk['outcome']:
+                outcome_counts[outcome] += 1
+        return {'games': len(game_ids),
+                'pitches': self.n_rows,
+                'score': score,
+                'outcomes': dict(zip(pitch_outcomes, outcome_counts))}
+
+
+
+
+# -------------------- Command Line Access -------------------- #
+
+if __name__ == "__main__":
+
+    # Summarize the event files given, or the played games file
+    for filename in sys.argv[1:] or [played_games_filename]:
+        summary = PitchEventReader(filename).summarize()
+        print(f"{filename}: {summary['pitches']} pitches in {summary['games']} games, score {summary['score']}")
+        for outcome, count in summary['outcomes'].items():
+            print(f"    {outcome}: {count}")
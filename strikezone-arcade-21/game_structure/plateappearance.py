@@ -6,16 +6,22 @@ It also scores the PA outcomes based on a scoring dictionary."""
 
 
 # -------------------- Import Modules -------------------- #
-from os import system
-import time
-
+from itertools import zip_longest
+import random
+
+from players.pitcher import pitch_outcomes
+from game_structure import pacing
+from game_structure.countrules import advance_count, ball_outcomes, strike_outcomes, foul_outcomes, count_code
+from game_structure.renderer import FrameRenderer, clip
+from game_structure.gamestats import GameStats
+from game_structure.instrumentation import instruments
 from game_structure.strikezone import StrikeZone
 from game_structure.strikezoneexceptions import PitchTypeError
 
 
 # -------------------- Initialize Global Variables -------------------- #
 
-# Scoring dictionary for Plate Appearance outcomes
+# Scoring dictionary for Plate Appearance outcomes, in the order of the PA_outcomes global
 PA_outcome_scoring_dict = {
                             # Batter-friendly outcomes = negative points
                             "Single": -1000,
@@ -29,8 +35,11 @@ PA_outcome_scoring_dict = {
                             "In Play Out": 2000
                             }
 
+# Pitch outcomes that are shown on the strike zone
+strikezone_outcomes = ball_outcomes | strike_outcomes | foul_outcomes
 
-
+# Width of the compact at bat screen, drawn on terminals too short for the full one
+compact_screen_width = 80
 
 
 
@@ -43,26 +52,30 @@ class PlateAppearance:
     StrikeZone object to display past pitches to the user; and it is 
     the primary point of interaction for the user during game-mode."""
 
-    plate_app_count = 0
-
-    def __init__(self, Pitcher = None, Batter = None, player_score = 0, mound_visits = 2, outcome_history = []):
+    def __init__(self, Pitcher = None, Batter = None, player_score = 0, mound_visits = 2, stats = None, pitch_advisor = None,
+                rng = random, recorder = None, clock = None, renderer = None, event_store = None, game_id = 0,
+                context = None, autosave = None):
         
         # Validate parameters first
         if Pitcher is None or Batter is None:
             print("Please provide valid Pitcher and Batter.")
             return None
         else:
-            # Increment count of plate appearances
-            PlateAppearance.plate_app_count += 1
+            # Count this plate appearance in the session, whose pitch settings it uses
+            self.context = context
+            self.settings = None
+            if context is not None:
+                context.plate_appearances += 1
+                self.settings = context.settings
 
             # Initialize players
             self.pitcher = Pitcher
             self.batter = Batter
             self.pitch_decode = {'F': 'Fastball', 'O': 'Offspeed', 'B': 'Breaking'}
 
-            # Continue player score and outcome history
+            # Continue player score and the game's live statistics
             self.player_score = player_score
-            self.game_outcome_history = outcome_history
+            self.game_stats = stats if stats is not None else GameStats()
 
             # Initialize trackers
             self.the_count = [0, 0] # The Balls & Strikes for this At Bat
@@ -75,6 +88,27 @@ class PlateAppearance:
             self.strikezone_big_legend = self.strikezone.get_a_strikezone('zones', 'string')
             self.strikezone_small_legend = self.strikezone.get_a_strikezone('legend', 'string')
 
+            # Optional pitch-selection policy (e.g. OptimalPitchPolicy) used to show a hint
+            self.pitch_advisor = pitch_advisor
+
+            # Random number generator for pitch outcomes and optional GameRecorder
+            self.rng = rng
+            self.recorder = recorder
+
+            # Optional PitchEventStore that every pitch is appended to as game game_id
+            self.event_store = event_store
+            self.game_id = game_id
+
+            # Optional GameAutosave that saves the game after every pitch of this Plate Appearance
+            self.autosave = autosave
+
+            # Pauses use the given PacingClock, or the game's shared clock
+            self.clock = clock if clock is not None else pacing.clock
+
+            # FrameRenderer that draws the at bat screen, starting with a full redraw
+            self.renderer = renderer if renderer is not None else FrameRenderer()
+            self.renderer.invalidate()
+
             # Outcome of Plate Appearance
             self.PA_outcome = ''
 
@@ -85,14 +119,13 @@ class PlateAppearance:
 
         # Begin main while loop
         while True:
-            # Clear the console
-            system('clear')
-        
-            # Print the At Bat Header string
+            # Draw the At Bat screen over the last one
             self.display_at_bat()
             
             # Prompt user for pitch command
+            started = instruments.start()
             command = input('Please provide a pitch command (q to quit): ')
+            instruments.stop('input', started)
             
             # Case: User quits
             if command.lower() in ['', 'q', 'quit', 'exit']:
@@ -101,102 +134,97 @@ class PlateAppearance:
             
             # Try user's command
             else:
-                proceed = False
-
-                # Validate command input
+                # Validate command input and try to pitch the inputted Pitch
                 try:
-                    command_pitch_code = self.pitch_decode[command[0].upper()]
-                    command_pitch_zone = int(command[1:])
-                    proceed = True
-
-                except:
+                    the_pitch = self.get_pitch(command)
+                except ValueError:
                     print("Please provide a valid pitch command.")
-
-                # Try to pitch the inputted Pitch
-                if proceed:
+                except PitchTypeError:
+                    print(f"{self.pitcher.first_name} {self.pitcher.last_name} does not have that pitch type.")
+                    self.clock.sleep(3)
+                    continue
+                except Exception as err:
+                    print(f"An error occurred during the At Bat: {type(err)} {err}")
+                    self.clock.sleep(3)
+                    continue
+
+                else:
                     try:
-                        the_pitch = self.pitcher.pitch(command_pitch_code,
-                                                        'zone' + str(command_pitch_zone),
-                                                        self.batter)
-                        
                         # Announce that the pitcher is pitching
-                        time.sleep(0.5)
+                        self.clock.sleep(0.5)
                         print()
                         print("The wind up... ", end='', flush=True)
-                        time.sleep(0.25)
+                        self.clock.sleep(0.25)
                         print("and the pitch!", flush=True)
                         
                         # Get outcome from the batter
-                        time.sleep(1)
-                        pitch_outcome = self.batter.get_pitch_outcome(the_pitch)
+                        self.clock.sleep(1)
+                        pitch_outcome = self.deliver_pitch(the_pitch)
                         print(f"\nPitch resulted in a {pitch_outcome}.")
-                        
-                        # Update the pitch and outcome histories
-                        self.pitch_history.append(the_pitch)
-                        self.pitch_outcome_history.append(pitch_outcome)
-
-                        # Evaluate the outcome and update game status accordingly
-
-                        # Case: Strike, Ball, or Foul Ball
-                        if pitch_outcome in ["Called Strike", "Swinging Strike", "Ball", "Foul Ball"]:
-                            # Update the strikezone
-                            self.strikezone.update_strikezone(the_pitch, pitch_outcome)
-                            
-
-                            # Update the Count and then the PA_outcome if one is triggered:
-
-                            # If it's a Ball
-                            if pitch_outcome in ["Ball"]:
-                                self.the_count[0] += 1
-                                
-                                # If this Ball results in a walk, set the PA_outcome and end PA
-                                if self.the_count[0] == 4:
-                                    self.PA_outcome = "Walk"
-                                    break
-                            
-                            # If it's a true Strike
-                            elif pitch_outcome in ["Called Strike", "Swinging Strike"]:
-                                self.the_count[1] += 1
-
-                                # If this Strike results in a strikeout, set the PA_outcome and end PA
-                                if self.the_count[1] == 3:
-                                    self.PA_outcome = "Strikeout"
-                                    break
-
-                            # If it's a Foul Ball
-                            elif pitch_outcome in ["Foul Ball"]:
-                                # Increment Strikes if there are less than 2
-                                if self.the_count[1] < 2:
-                                    self.the_count[1] += 1
-                                else:
-                                    # Foul Balls cannot result in a strikeout
-                                    pass
-                        
-                        # Case: Base Hit
-                        elif pitch_outcome in ["Single", "Double", "Triple", "Homerun", "Hit By Pitch"]:
-                            # Base Hit results end the Plate Appearance.
-                            # Set the PA_outcome and end the PA
-                            self.PA_outcome = pitch_outcome
+                        if self.PA_outcome != '':
                             break
-                        
-                        # Case: In Play Out
-                        elif pitch_outcome in ["In Play Out"]:
-                            # An in play out ends the Plate Appearance.
-                            # Set the PA_outcome and end the PA
-                            self.PA_outcome = pitch_outcome
-                            break
-                    
-                    except PitchTypeError:
-                        print(f"{self.pitcher.first_name} {self.pitcher.last_name} does not have that pitch type.")
-                        time.sleep(3)
-                        continue
+
                     except Exception as err:
                         print(f"An error occurred during the At Bat: {type(err)} {err}")
-                        time.sleep(3)
+                        self.clock.sleep(3)
                         continue
                 
                 # Rest before presenting the updated strikezone
-                time.sleep(2.5)
+                self.clock.sleep(2.5)
+
+    def get_pitch(self, command):
+        """This method decodes a pitch command (e.g. F2, B12) and returns the Pitch
+        from the Pitcher. It raises a ValueError if the command is not valid, and
+        a PitchTypeError if the Pitcher does not throw that pitch type."""
+        try:
+            command_pitch_code = self.pitch_decode[command[0].upper()]
+            command_pitch_zone = int(command[1:])
+        except (IndexError, KeyError, ValueError):
+            raise ValueError(f"{command!r} is not a valid pitch command.")
+
+        started = instruments.start()
+        the_pitch = self.pitcher.pitch(command_pitch_code, 'zone' + str(command_pitch_zone), self.batter, self.settings)
+        instruments.stop('pitch', started)
+        instruments.count('pitches')
+        return the_pitch
+
+    def deliver_pitch(self, the_pitch):
+        """This method gets the Batter's outcome for a Pitch and updates the Plate
+        Appearance with it: the histories, game statistics, strike zone, Count,
+        recorder, event store and autosave. It returns the pitch outcome string for display, and sets
+        PA_outcome (e.g. "Walk") if the pitch ended the Plate Appearance.
+        at_bat() and the game server both throw every pitch through this method."""
+
+        started = instruments.start()
+        outcome_code = self.batter.get_pitch_outcome_code(the_pitch, self.rng)
+        instruments.stop('outcome', started)
+        if self.recorder is not None:
+            self.recorder.record_pitch(the_pitch, outcome_code)
+
+        # Update the pitch and outcome histories, which are displayed with the outcome's string
+        pitch_outcome = pitch_outcomes[outcome_code]
+        self.pitch_history.append(the_pitch)
+        self.pitch_outcome_history.append(pitch_outcome)
+        self.game_stats.record_pitch(the_pitch.zone, outcome_code)
+
+        # Case: Strike, Ball, or Foul Ball
+        if outcome_code in strikezone_outcomes:
+            # Update the strikezone
+            started = instruments.start()
+            self.strikezone.update_strikezone(the_pitch, outcome_code)
+            instruments.stop('strikezone', started)
+
+        # Evaluate the outcome and update the Count, ending the PA if an outcome is triggered
+        count_before = count_code(*self.the_count)
+        self.PA_outcome = advance_count(self.the_count, outcome_code)
+        if self.event_store is not None:
+            self.event_store.append(self.game_id, self.game_stats.batters_faced, count_before,
+                                    the_pitch.pitch_type_code, the_pitch.zone_code, outcome_code, PA_outcome_scoring_dict.get(self.PA_outcome, 0))
+
+        # Save the game mid Plate Appearance; a pitch that ends it is saved once the game has scored it
+        if self.autosave is not None and self.PA_outcome == '':
+            self.autosave.save(self)
+        return pitch_outcome
 
 
     def score_at_bat(self):
@@ -209,69 +237,113 @@ class PlateAppearance:
             return {}
     
     def display_at_bat(self):
-        """This method prints the common header during an at bat.
+        """This method draws the at bat screen from get_at_bat_frame() with the FrameRenderer,
+        or from get_compact_at_bat_frame() if the full screen does not fit the terminal."""
+        started = instruments.start()
+        self.renderer.render(self.get_at_bat_frame(), self.get_compact_at_bat_frame)
+        instruments.stop('render', started)
+        instruments.count('frames')
+
+    def get_at_bat_frame(self):
+        """This method returns the common header during an at bat as a list of lines.
         The header reports the following information to the user:
          - Player Score
          - Pitch History
          - Outcome History
          - The Count
          - And a mini legend of the strike zone after the first pitch has been thrown"""
-        
+
+        frame = []
 
         # Game Information
-        print("\n----------------- BASEBALL GAME INFO -----------------")
-        print()
+        frame += ["", "----------------- BASEBALL GAME INFO -----------------", ""]
 
         # Report Player Score and Pitcher Info
-        print(f"Player Score: {self.player_score}")
-        print(f"Mound Visits Remaining: {self.mound_visits}")
-        print()
-        print(f"Pitching as: {self.pitcher}")
-        print(f"Pitch Types Available:", ' '.join(self.pitcher.pitch_types))
-        print()
-        print(f"Batters Faced: {len(self.game_outcome_history)}")
-        print(f"Game Outcome History: {self.game_outcome_history}")
-        print()
-        
+        frame.append(f"Player Score: {self.player_score}")
+        frame.append(f"Mound Visits Remaining: {self.mound_visits}")
+        frame.append("")
+        frame.append(f"Pitching as: {self.pitcher}")
+        frame.append(f"Pitch Types Available: {' '.join(self.pitcher.pitch_types)}")
+        frame.append("")
+        frame += self.game_stats.header_lines()
+        frame.append("")
+
         # Information for this At Bat
-        print()
-        print("-------------------- AT BAT INFO --------------------")
-        print()
-        print()
-        print(f"Up to bat: {self.batter} - Bat Avg: {self.batter.bat_avg}")
-        print()
+        frame += ["", "-------------------- AT BAT INFO --------------------", "", ""]
+        frame.append(f"Up to bat: {self.batter} - Bat Avg: {self.batter.bat_avg}")
+        frame.append("")
         # Report recent pitches from end of Pitch History
-        print("  Pitch History: ", self.pitch_history)
+        frame.append(f"  Pitch History:  {self.pitch_history}")
 
         # Report recent outcomes from end of Outcome History
-        print("Outcome History: ", self.pitch_outcome_history)
-        print("\n")
+        frame.append(f"Outcome History:  {self.pitch_outcome_history}")
+        frame += ["", ""]
 
         # Report the Count
-        print(f"Count: {self.the_count[0]} balls   (0's)")
-        print(f"       {self.the_count[1]} strikes (X's)")
+        frame.append(f"Count: {self.the_count[0]} balls   (0's)")
+        frame.append(f"       {self.the_count[1]} strikes (X's)")
+
+        # If a pitch advisor is available, suggest a pitch for this Count
+        if self.pitch_advisor is not None:
+            hint_type, hint_zone = self.pitch_advisor(self.pitcher, self.batter, self.the_count)
+            frame.append(f"Hint: the best pitch at this Count is {hint_type[0]}{hint_zone.strip('zone')}")
 
         # If a pitch has been thrown, display the strikezone and a small zone legend below
         if self.the_count[0] > 0 or self.the_count[1] > 0:
-            print(self.strikezone)
-            print(self.strikezone_small_legend)
+            frame += str(self.strikezone).split('\n')
+            frame += self.strikezone_small_legend.split('\n')
         # If a pitch has not been thrown display a large zone legend
         elif self.the_count[0] == 0 and self.the_count[1] == 0:
-            print()
-            print("                     Zone Legend:", end='')
-            print(self.strikezone_big_legend)
-            print("\n-------------------- USER INPUTS --------------------")
-            print('\n')
+            frame.append("")
+            frame += ("                     Zone Legend:" + self.strikezone_big_legend).split('\n')
+            frame += ["", "-------------------- USER INPUTS --------------------", "", ""]
 
         # Show how inputs work
-        print("Command format: [pitch][zone]")
-        print("            ex: F2, B12")
-        print()
+        frame.append("Command format: [pitch][zone]")
+        frame.append("            ex: F2, B12")
+        frame.append("")
 
         # Show pitch options to user
-        print("Pitch codes:  ", end='')
-        for k in self.pitch_decode:
-            print(k + ': ' + self.pitch_decode[k], end=' ')
-        print()
-        print("      Zones:  1 - 14")
-        print("\n")
\ No newline at end of file
+        frame.append("Pitch codes:  " + ''.join(k + ': ' + self.pitch_decode[k] + ' ' for k in self.pitch_decode))
+        frame.append("      Zones:  1 - 14")
+        frame += ["", ""]
+
+        return frame
+
+    def get_compact_at_bat_frame(self):
+        """This method returns a short at bat screen for small terminals (24 lines) as a list
+        of lines: the player's score and the batter, then the strike zone (or the zone legend
+        before the first pitch) with the pitcher, the Count, the histories and the inputs
+        beside it. Long histories are cut to their latest entries."""
+
+        # The strike zone without its margins
+        if self.the_count[0] > 0 or self.the_count[1] > 0:
+            zone_lines = self.strikezone.compact_lines()
+            zone_width = StrikeZone.get_compact_width('blank') + 3
+        else:
+            zone_lines = StrikeZone.get_compact_template('zones')
+            zone_width = StrikeZone.get_compact_width('zones') + 3
+        info_width = compact_screen_width - zone_width
+
+        # Information beside the strike zone
+        info = [f"Pitching as: {self.pitcher.first_name} {self.pitcher.last_name}",
+                f"Pitch Types: {' '.join(self.pitcher.pitch_types)}",
+                f"Count: {self.the_count[0]} balls (O's), {self.the_count[1]} strikes (X's)",
+                clip(f"Pitches: {self.pitch_history}", info_width, keep_end=True),
+                clip(f"Outcomes: {self.pitch_outcome_history}", info_width, keep_end=True),
+                clip(f"Recent PAs: {self.game_stats.recent_outcomes}", info_width, keep_end=True)]
+        if self.pitch_advisor is not None:
+            hint_type, hint_zone = self.pitch_advisor(self.pitcher, self.batter, self.the_count)
+            info.append(f"Hint: the best pitch is {hint_type[0]}{hint_zone.strip('zone')}")
+        info.append("")
+        info += StrikeZone.get_compact_template('legend')
+        info += ["",
+                "Command: [pitch][zone], ex: F2, B12",
+                clip("Codes: " + ', '.join(k + ' ' + self.pitch_decode[k] for k in self.pitch_decode), info_width)]
+
+        frame = [clip(f"Player Score: {self.player_score}   Mound Visits Remaining: {self.mound_visits}   "
+                        f"Batters Faced: {self.game_stats.batters_faced}", compact_screen_width),
+                clip(f"Up to bat: {self.batter} - Bat Avg: {self.batter.bat_avg}", compact_screen_width)]
+        frame += [(zone_line.ljust(zone_width) + info_line).rstrip()
+                    for zone_line, info_line in zip_longest(zone_lines, info, fillvalue='')]
+        return frame
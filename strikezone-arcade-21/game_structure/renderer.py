@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+"""The Renderer module draws full-screen frames, such as the at bat
+screen, to the terminal. A frame is composed as a list of lines and
+written in a single call using ANSI escape sequences to clear and
+position the cursor, instead of running the 'clear' command. After
+the first frame, only the lines that changed since the previous frame
+are rewritten, which keeps redraws fast over slow connections. That
+needs the frame to fit on the screen, so the screen's height is given
+by the caller (e.g. a game server player's terminal) or measured from
+the console, and a screen can give render() a shorter layout to draw
+when its frame does not fit."""
+
+
+# -------------------- Import Modules -------------------- #
+import shutil
+import sys
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# ANSI escape sequences
+cursor_home = '\x1b[H'
+clear_screen_code = '\x1b[2J'
+clear_line_code = '\x1b[K'
+clear_below_code = '\x1b[J'
+
+# Lines kept free below a frame for messages and the input prompt: an at bat
+# writes the prompt, the wind up and the pitch result (with their blank lines)
+# below its frame. If a frame would not fit above them, the whole frame is
+# redrawn, since the terminal may have scrolled and moved the old lines.
+prompt_lines = 6
+
+# Height of a standard terminal (VT100), for screens whose height cannot be measured
+default_screen_rows = 24
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def move_cursor(row, col=1):
+    """Return the ANSI escape sequence that moves the cursor to this row and column (1-based)."""
+    return f'\x1b[{row};{col}H'
+
+def clip(text, width, keep_end=False):
+    """Shorten text to at most width characters, marking the cut with '...'.
+    keep_end keeps the end of the text, e.g. the latest pitches of a history."""
+    if len(text) <= width:
+        return text
+    if keep_end:
+        return '...' + text[len(text) - width + 3:]
+    return text[:width - 3] + '...'
+
+def clear_screen(out=None):
+    """Clear the terminal and move the cursor to the top left corner,
+    without starting a subprocess. Nothing is written if out is not a terminal."""
+    out = out if out is not None else sys.stdout
+    if out.isatty():
+        out.write(cursor_home + clear_screen_code)
+        out.flush()
+
+
+
+
+# -------------------- FrameRenderer Class -------------------- #
+
+class FrameRenderer:
+    """The FrameRenderer class draws frames (lists of lines) to a terminal.
+    It remembers the last frame drawn so the next one only rewrites the
+    lines that differ, then clears everything below the frame so old
+    messages and prompts disappear. When the output is not a terminal
+    (e.g. piped to a file) each frame is written out in full, without
+    escape sequences.
+    screen_rows is the height of the terminal drawn to. If it is not given,
+    the console's height is measured for every frame, so resizing is followed."""
+
+    def __init__(self, out=None, screen_rows=None):
+        self.out = out if out is not None else sys.stdout
+        self.ansi = self.out.isatty()
+        self.screen_rows = screen_rows
+        # Lines of the last frame drawn, or None to redraw everything next time
+        self.last_frame = None
+
+    def get_screen_rows(self):
+        """Return the height of the screen in lines."""
+        if self.screen_rows is not None:
+            return self.screen_rows
+        return shutil.get_terminal_size((80, default_screen_rows)).lines
+
+    def fits(self, frame, screen_rows=None):
+        """Return True if this frame can be drawn with room for the prompt
+        below it, so that it can be updated in place. screen_rows is the
+        screen height if it has already been measured for this frame."""
+        if not self.ansi:
+            return True
+        if screen_rows is None:
+            screen_rows = self.get_screen_rows()
+        return len(frame) + prompt_lines <= screen_rows
+
+    def invalidate(self):
+        """Redraw the whole screen on the next frame, e.g. after other output has scrolled it."""
+        self.last_frame = None
+
+    def compose(self, frame, screen_rows=None):
+        """Return the string that draws this frame over the last one.
+        screen_rows is the screen height if it has already been measured."""
+
+        # Case: not a terminal, so write the frame as plain text
+        if not self.ansi:
+            return '\n'.join(frame) + '\n'
+
+        # Case: first frame, or the frame is too tall to be sure the old lines have not scrolled
+        if self.last_frame is None or not self.fits(frame, screen_rows):
+            return cursor_home + clear_screen_code + '\n'.join(frame) + '\n'
+
+        # Case: rewrite only the lines that changed
+        buffer = []
+        for row, line in enumerate(frame):
+            if row >= len(self.last_frame) or line != self.last_frame[row]:
+                buffer.append(move_cursor(row + 1) + line + clear_line_code)
+
+        # Clear everything below the frame and leave the cursor there
+        buffer.append(move_cursor(len(frame) + 1) + clear_below_code)
+        return ''.join(buffer)
+
+    def render(self, frame, shorter_frame=None):
+        """Draw a frame, given as a list of lines without newlines, in a single write.
+        shorter_frame is an optional function that returns a shorter layout of the
+        frame, which is drawn instead when the frame does not fit the screen."""
+        screen_rows = self.get_screen_rows() if self.ansi else None
+        if shorter_frame is not None and not self.fits(frame, screen_rows):
+            frame = shorter_frame()
+        self.out.write(self.compose(frame, screen_rows))
+        self.out.flush()
+        self.last_frame = list(frame)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+"""The SessionContext module holds the state that belongs to one player's
+session instead of to the whole process: its random number generator
+(which seeds each game), its pitch settings (league batting average,
+difficulty and batting average buckets) and its counters of games and
+Plate Appearances. The Main Menu and each game server connection own a
+SessionContext and hand it to their games, so any number of games can
+run at once in threads or asyncio tasks without sharing state."""
+
+
+# -------------------- Import Modules -------------------- #
+import random
+
+import players.pitcher
+from players.pitcher import PitchSettings
+
+
+
+
+# -------------------- SessionContext Class -------------------- #
+
+class SessionContext:
+    """The SessionContext class is created once per session and passed to each
+    BaseballGame, which passes it on to its PlateAppearances. Settings that are
+    not given start at the current players.pitcher globals.
+     - rng: random.Random that draws each game's seed (seeded with seed, if given)
+     - settings: PitchSettings passed to Pitcher.pitch()
+     - games_played, plate_appearances: counts for this session"""
+
+    def __init__(self, seed=None, avg_bat_avg=None, difficulty_mult=None, bat_avg_bucket_size=None):
+        self.rng = random.Random(seed)
+        self.settings = PitchSettings(
+            players.pitcher.avg_bat_avg if avg_bat_avg is None else avg_bat_avg,
+            players.pitcher.difficulty_mult if difficulty_mult is None else difficulty_mult,
+            players.pitcher.bat_avg_bucket_size if bat_avg_bucket_size is None else bat_avg_bucket_size)
+
+        # Counters for this session
+        self.games_played = 0
+        self.plate_appearances = 0
+
+    def new_game_seed(self):
+        """Draw the seed of a new game from this session's random number generator."""
+        return self.rng.randrange(2 ** 32)
+
+    def __str__(self):
+        return (f"{self.games_played} games, {self.plate_appearances} plate appearances, "
+                f"league avg {self.settings.avg_bat_avg}, difficulty {self.settings.difficulty_mult}")
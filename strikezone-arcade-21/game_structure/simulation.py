@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+"""The Simulation module plays full BaseballGames headlessly, without
+any user input, console clearing or sleeping. It reuses the Count rules
+from the CountRules module and the Mound Visit rules from the
+GameStats module, but runs at CPU speed. Pitches are chosen by a
+pitch-selection policy instead of by the user, which makes it possible
+to simulate large numbers of games to balance scoring and difficulty."""
+
+
+# -------------------- Import Modules -------------------- #
+import random
+
+from players.batter import Batter
+from players.pitcher import pitch_zones
+from game_structure.plateappearance import PA_outcome_scoring_dict
+from game_structure.countrules import PA_outcomes, advance_count_code, count_code
+from game_structure.gamestats import GameStats
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Points of each PA outcome, indexed by PAOutcome code
+PA_outcome_scores = tuple(PA_outcome_scoring_dict[outcome] for outcome in PA_outcomes)
+
+
+
+
+
+
+# -------------------- Pitch-Selection Policies -------------------- #
+
+class RandomPitchPolicy:
+    """A pitch-selection policy picks the pitch to throw for a given Count.
+    Policies are called as policy(pitcher, batter, the_count, rng) and return
+    a (pitch_type, zone) tuple, e.g. ('Fastball', 'zone3').
+    This policy picks a pitch type from the Pitcher's repertoire and a zone
+    uniformly at random."""
+
+    def __call__(self, pitcher, batter, the_count, rng=random):
+        return (rng.choice(pitcher.pitch_types), rng.choice(pitch_zones))
+
+    def distribution(self, pitcher, batter, the_count):
+        """Return the probability of each pitch this policy may throw at this Count,
+        as a dictionary of {(pitch_type, zone): probability}. Used by the CountModel module."""
+        prob = 1.0 / (len(pitcher.pitch_types) * len(pitch_zones))
+        return {(pitch_type, zone): prob for pitch_type in pitcher.pitch_types for zone in pitch_zones}
+
+    def choose_batch(self, pitcher, balls, strikes, rng):
+        """Batch version of this policy used by the BatchSimulation module.
+        balls, strikes = NumPy arrays holding the Count of each Plate Appearance
+        rng = numpy.random.Generator
+        It returns arrays of indices into the pitch_types and pitch_zones globals."""
+        from players.popztensor import pitch_type_indices
+
+        repertoire = pitch_type_indices(pitcher.pitch_types)
+        pitch_type_index = repertoire[rng.integers(len(repertoire), size=len(balls))]
+        zone_index = rng.integers(len(pitch_zones), size=len(balls))
+        return (pitch_type_index, zone_index)
+
+
+class FixedPitchPolicy:
+    """This policy always throws the same pitch type to the same zone."""
+
+    def __init__(self, pitch_type='Fastball', zone='zone5'):
+        self.pitch_type = pitch_type
+        self.zone = zone
+
+    def __call__(self, pitcher, batter, the_count, rng=random):
+        return (self.pitch_type, self.zone)
+
+    def distribution(self, pitcher, batter, the_count):
+        """Return this policy's only pitch with probability 1, see RandomPitchPolicy.distribution()."""
+        return {(self.pitch_type, self.zone): 1.0}
+
+    def choose_batch(self, pitcher, balls, strikes, rng):
+        """Batch version of this policy, see RandomPitchPolicy.choose_batch()."""
+        from players.popztensor import np, pitch_type_indices, zone_indices
+
+        return (np.full(len(balls), pitch_type_indices(self.pitch_type)),
+                np.full(len(balls), zone_indices(self.zone)))
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def simulate_plate_appearance(pitcher, batter, policy, rng=random, event_store=None, game_id=0, batter_index=0,
+                            stats=None):
+    """This function plays out one Plate Appearance without user interaction.
+    The policy picks every pitch and the Count is updated with the same rules
+    as PlateAppearance.at_bat(). It returns the PAOutcome code, e.g. PAOutcome.WALK
+    (PA_outcomes[code] is its string). Outcomes stay integer codes from the
+    Batter through the Count rules and the event store.
+    Every pitch is appended to the optional PitchEventStore as game game_id
+    and batter batter_index, and added to the optional GameStats."""
+
+    the_count = [0, 0]
+    while True:
+        pitch_type, zone = policy(pitcher, batter, the_count, rng)
+        the_pitch = pitcher.pitch(pitch_type, zone, batter)
+        pitch_outcome = batter.get_pitch_outcome_code(the_pitch, rng)
+        count_before = count_code(*the_count)
+        PA_outcome = advance_count_code(the_count, pitch_outcome)
+        if stats is not None:
+            stats.record_pitch(zone, pitch_outcome)
+        if event_store is not None:
+            event_store.append(game_id, batter_index, count_before, the_pitch.pitch_type_code, the_pitch.zone_code,
+                                pitch_outcome, PA_outcome_scores[PA_outcome] if PA_outcome is not None else 0)
+        if PA_outcome is not None:
+            return PA_outcome
+
+def simulate_game(pitcher, team, policy=None, rng=random, max_batters=None, event_store=None, game_id=0):
+    """This function plays a full BaseballGame without user interaction, input(),
+    sleep() or console clearing. The game ends with the same rules as
+    BaseballGame.play_ball(): once the Pitcher is out of Mound Visits.
+    pitcher = Pitcher object with a loaded POPZ table
+    team = BaseballTeam whose players form the batting order
+    policy = pitch-selection policy, RandomPitchPolicy() by default
+    rng = random.Random instance for seeded simulations (global random module by default)
+    max_batters = optional cap on the number of batters faced, as a good policy
+                  can keep the game going for a long time
+    event_store = optional PitchEventStore that every pitch is appended to as game game_id
+    The game's statistics are kept in a GameStats, so a game of any length
+    runs in constant memory. It returns a dictionary with the final score,
+    batters faced, pitches thrown, mound visits used and a count of each PA outcome."""
+
+    if policy is None:
+        policy = RandomPitchPolicy()
+
+    # Batters are created once per lineup spot and reused through the batting order
+    batting_order = [Batter(player) for player in team.players]
+    batting_order_index = 0
+
+    # Begin game with 0 Player Points and 3 Mound Visits
+    mound_visits = 3
+    mound_visit_break = 3
+    stats = GameStats()
+
+    while mound_visits > 0:
+        if max_batters is not None and stats.batters_faced >= max_batters:
+            break
+
+        # Batting order returns to the first batter after the last batter
+        if batting_order_index == len(batting_order):
+            batting_order_index = 0
+        batter = batting_order[batting_order_index]
+        mound_visit_break -= 1
+
+        # Play through the Plate Appearance and score it
+        PA_outcome = simulate_plate_appearance(pitcher, batter, policy, rng,
+                                                event_store, game_id, stats.batters_faced, stats)
+        stats.record_plate_appearance(PA_outcomes[PA_outcome], PA_outcome_scores[PA_outcome], batting_order_index)
+        batting_order_index += 1
+
+        # Check if the manager comes out for a Mound Visit
+        reason = stats.mound_visit_reason(mound_visit_break)
+        if reason is not None:
+            mound_visits -= 1
+            mound_visit_break = 3
+
+    return {'score': stats.score,
+            'batters_faced': stats.batters_faced,
+            'pitches': stats.pitches,
+            'mound_visits_used': 3 - mound_visits,
+            'outcomes': stats.outcome_counts}
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""The SimulationRunner module runs large numbers of headless games
+across multiple processes. The games are split into fixed-size shards,
+and each shard gets its own seeded random number generator, so the
+same seed gives the same totals no matter how many workers are used."""
+
+
+# -------------------- Import Modules -------------------- #
+from concurrent.futures import ProcessPoolExecutor
+import os
+import os.path
+import random
+
+from game_structure.loadgame import create_pitchers
+from game_structure.loadgame import create_baseball_teams
+from game_structure.plateappearance import PA_outcome_scoring_dict
+from game_structure.simulation import simulate_game
+from game_structure.simulation import RandomPitchPolicy, FixedPitchPolicy
+from game_structure.optimalpolicy import OptimalPitchPolicy, decode_pitch_command
+from game_structure.pitcheventstore import PitchEventStore
+from game_structure.leaderboard import Leaderboard
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Number of games simulated by each shard (the unit of work sent to a worker)
+default_shard_size = 1000
+
+# Games each shard buffers before writing them to the leaderboard
+leaderboard_batch_size = 10000
+
+# Pitchers and teams loaded by this process, so each worker only loads them once
+loaded_pitchers = {}
+loaded_teams = {}
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def shard_rng(seed, shard_index):
+    """Return the independent random number generator for one shard.
+    It only depends on the seed and the shard index, never on the worker."""
+    return random.Random(f"strikezone-{seed}-{shard_index}")
+
+def get_policy(policy_name):
+    """Create a pitch-selection policy from its name:
+    'random', 'optimal', or a pitch command such as 'F5' to always throw that pitch."""
+    if policy_name.lower() == 'random':
+        return RandomPitchPolicy()
+    elif policy_name.lower() == 'optimal':
+        return OptimalPitchPolicy()
+    else:
+        return FixedPitchPolicy(*decode_pitch_command(policy_name))
+
+def empty_summary():
+    """Return a simulation summary with no games in it."""
+    return {'games': 0,
+            'total_score': 0,
+            'min_score': None,
+            'max_score': None,
+            'batters_faced': 0,
+            'mound_visits_used': 0,
+            'outcomes': {outcome: 0 for outcome in PA_outcome_scoring_dict}}
+
+def add_game(summary, result):
+    """Add the result of one simulate_game() call to a simulation summary."""
+    summary['games'] += 1
+    summary['total_score'] += result['score']
+    summary['batters_faced'] += result['batters_faced']
+    summary['mound_visits_used'] += result['mound_visits_used']
+    for outcome, count in result['outcomes'].items():
+        summary['outcomes'][outcome] += count
+    if summary['min_score'] is None or result['score'] < summary['min_score']:
+        summary['min_score'] = result['score']
+    if summary['max_score'] is None or result['score'] > summary['max_score']:
+        summary['max_score'] = result['score']
+
+def merge_summaries(summaries):
+    """Add up simulation summaries into one. Summaries are merged in the order
+    given, which the runner keeps as shard order for a deterministic reduction."""
+    merged = empty_summary()
+    for summary in summaries:
+        if summary['games'] == 0:
+            continue
+        merged['games'] += summary['games']
+        merged['total_score'] += summary['total_score']
+        merged['batters_faced'] += summary['batters_faced']
+        merged['mound_visits_used'] += summary['mound_visits_used']
+        for outcome, count in summary['outcomes'].items():
+            merged['outcomes'][outcome] += count
+        if merged['min_score'] is None or summary['min_score'] < merged['min_score']:
+            merged['min_score'] = summary['min_score']
+        if merged['max_score'] is None or summary['max_score'] > merged['max_score']:
+            merged['max_score'] = summary['max_score']
+    return merged
+
+def shard_event_filename(events_dir, shard_index):
+    """Return the pitch event file of one shard, e.g. events_dir/shard_00003.pev"""
+    return os.path.join(events_dir, f"shard_{shard_index:05d}.pev")
+
+def run_shard(shard):
+    """Simulate one shard of games. The shard is a tuple of
+    (shard_index, first_game, n_games, seed, pitcher_name, team_name, policy_name, max_batters, events_dir,
+    leaderboard_filename) so that it can be sent to a worker process. Returns (shard_index, summary).
+    If events_dir is given, every pitch is written to the shard's own event file,
+    with games numbered from first_game. If leaderboard_filename is given, every game
+    is added to that leaderboard as a 'simulation' game."""
+
+    (shard_index, first_game, n_games, seed, pitcher_name, team_name, policy_name,
+        max_batters, events_dir, leaderboard_filename) = shard
+
+    # Load the pitcher and team once per process
+    if pitcher_name not in loaded_pitchers:
+        loaded_pitchers[pitcher_name] = create_pitchers()[pitcher_name]
+    if team_name not in loaded_teams:
+        loaded_teams[team_name] = create_baseball_teams()[team_name]
+
+    pitcher = loaded_pitchers[pitcher_name]
+    team = loaded_teams[team_name]
+    policy = get_policy(policy_name)
+    rng = shard_rng(seed, shard_index)
+
+    # Each shard writes its own event file, replacing the one from an earlier run
+    event_store = None
+    if events_dir is not None:
+        event_filename = shard_event_filename(events_dir, shard_index)
+        if os.path.exists(event_filename):
+            os.remove(event_filename)
+        event_store = PitchEventStore(event_filename)
+
+    # Workers share the leaderboard; WAL mode and large batches keep their writes from blocking each other
+    leaderboard = None
+    if leaderboard_filename is not None:
+        leaderboard = Leaderboard(leaderboard_filename, batch_size=leaderboard_batch_size, flush_interval=float('inf'))
+
+    summary = empty_summary()
+    for game in range(n_games):
+        result = simulate_game(pitcher, team, policy, rng, max_batters, event_store, first_game + game)
+        add_game(summary, result)
+        if leaderboard is not None:
+            leaderboard.record_game(pitcher_name, team_name, result['score'], result['batters_faced'],
+                                    result['outcomes'], 'simulation', first_game + game)
+
+    if event_store is not None:
+        event_store.close()
+    if leaderboard is not None:
+        leaderboard.close()
+    return shard_index, summary
+
+def run_simulations(pitcher_name='Clayton Kershaw', team_name='Seattle Mariners', n_games=1000,
+                    seed=0, workers=None, policy_name='random', max_batters=None,
+                    shard_size=default_shard_size, events_dir=None, leaderboard_filename=None):
+    """This function simulates n_games headless games split into shards of shard_size games.
+    pitcher_name, team_name = names as listed by create_pitchers() and create_baseball_teams()
+    seed = base seed; shard i always uses the same random stream for the same seed
+    workers = number of worker processes, os.cpu_count() by default (1 runs in this process)
+    policy_name = 'random', 'optimal' or a pitch command such as 'F5'
+    max_batters = optional cap on batters faced per game
+    events_dir = optional directory where every pitch is kept, one pitch event file per shard
+    leaderboard_filename = optional leaderboard database every game is added to
+    It returns the merged summary of all games."""
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    shards = []
+    for shard_index, start in enumerate(range(0, n_games, shard_size)):
+        shards.append((shard_index, start, min(shard_size, n_games - start), seed,
+                        pitcher_name, team_name, policy_name, max_batters, events_dir, leaderboard_filename))
+
+    if workers == 1:
+        results = [run_shard(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_shard, shards))
+
+    # Merge in shard order so the totals do not depend on which worker ran which shard
+    results.sort(key=lambda result: result[0])
+    return merge_summaries([summary for shard_index, summary in results])
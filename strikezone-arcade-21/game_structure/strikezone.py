@@ -9,12 +9,23 @@ as are the two legend representations."""
 # -------------------- Import Modules -------------------- #
 import os.path
 
+from game_structure.countrules import PitchOutcome, pitch_outcome_codes
+
 
 # -------------------- Initialize Global Variables -------------------- #
 
 strikezone_dir = 'data/strikezone/'
 strikezone_filepath = os.path.join( os.path.split(os.path.dirname(__file__))[0] , strikezone_dir )
 
+# Count slots are 'X' or 'O' and at least 2 digits, e.g. 'X12', and up to 3 digits where the
+# strike zone's lines leave room. Counts that do not fit are shown as e.g. 'X9+'
+min_slot_width = 3
+max_slot_width = 4
+
+# Pitch outcomes counted as strikes (X) and balls (O) on the strike zone
+strikezone_X_outcomes = frozenset({PitchOutcome.CALLED_STRIKE, PitchOutcome.SWINGING_STRIKE, PitchOutcome.FOUL_BALL})
+strikezone_O_outcomes = frozenset({PitchOutcome.BALL, PitchOutcome.HIT_BY_PITCH})
+
 
 
 
@@ -23,111 +34,176 @@ strikezone_filepath = os.path.join( os.path.split(os.path.dirname(__file__))[0]
 
 class StrikeZone:
     """The StrikeZone class handles the string representation of
-    the strike zone for this plate appearance/at bat. A blank string
-    is loaded from a txt file in the data/strikezone folder and then
-    converted to a list of strings from there on. This class can
-    return a string or a list of strings, see get_a_strikezone() below."""
+    the strike zone for this plate appearance/at bat. The txt files
+    in the data/strikezone folder are loaded once per process and
+    shared by every StrikeZone. Each StrikeZone keeps a grid of
+    characters copied from the blank strike zone, and counts are
+    written into its cells in place. This class can return a string
+    or a list of strings, see get_a_strikezone() below."""
+
+    # Saving coordinates for updating the string representation
+    # Padding is the blank lines / blank spaces before each row / col in the strikezone txt files
+    row_pad = 0
+    col_pad = 8
+    O_rows = {'zone1': row_pad + 5, 'zone2': row_pad + 5, 'zone3': row_pad + 5,
+                'zone4': row_pad + 8, 'zone5': row_pad + 8, 'zone6': row_pad + 8,
+                'zone7': row_pad + 11, 'zone8': row_pad + 11, 'zone9': row_pad + 11,
+                'zone11': row_pad + 2, 'zone12': row_pad + 2,
+                'zone13': row_pad + 14, 'zone14': row_pad + 14
+                }
+    O_cols = {'zone1': col_pad + 11, 'zone4': col_pad + 11, 'zone7': col_pad + 11,
+                'zone2': col_pad + 18, 'zone5': col_pad + 18, 'zone8': col_pad + 18,
+                'zone3': col_pad + 25, 'zone6': col_pad + 25, 'zone9': col_pad + 25,
+                'zone11': col_pad + 3, 'zone13': col_pad + 3,
+                'zone12': col_pad + 33, 'zone14': col_pad + 33}
+    X_rows = dict(zip(O_rows, (row + 1 for row in O_rows.values())))
+    X_cols = dict(O_cols)
+
+    # Template lines already loaded, shared by every StrikeZone: {version: tuple of lines}
+    templates = {}
+
+    # Width of each count slot in the blank strike zone, {(row, col): width}, measured once
+    slot_widths = {}
+
+    # Rows of each template that are not blank and the width of the left margin they share,
+    # {version: (rows, margin)}, measured once for the compact at bat screen
+    compact_layouts = {}
+
+    # Template lines cut down for the compact at bat screen, {version: tuple of lines}
+    compact_templates = {}
 
     def __init__(self):
-        # Saving coordinates for updating the string representation
-        # Padding is the blank lines / blank spaces before each row / col in the strikezone txt files
-        self.row_pad = 0
-        self.col_pad = 8
-        self.O_rows = {'zone1': self.row_pad + 5, 'zone2': self.row_pad + 5, 'zone3': self.row_pad + 5,
-                        'zone4': self.row_pad + 8, 'zone5': self.row_pad + 8, 'zone6': self.row_pad + 8,
-                        'zone7': self.row_pad + 11, 'zone8': self.row_pad + 11, 'zone9': self.row_pad + 11,
-                        'zone11': self.row_pad + 2, 'zone12': self.row_pad + 2,
-                        'zone13': self.row_pad + 14, 'zone14': self.row_pad + 14
-                        }
-        self.O_cols = {'zone1': self.col_pad + 11, 'zone4': self.col_pad + 11, 'zone7': self.col_pad + 11,
-                        'zone2': self.col_pad + 18, 'zone5': self.col_pad + 18, 'zone8': self.col_pad + 18,
-                        'zone3': self.col_pad + 25, 'zone6': self.col_pad + 25, 'zone9': self.col_pad + 25,
-                        'zone11': self.col_pad + 3, 'zone13': self.col_pad + 3,
-                        'zone12': self.col_pad + 33, 'zone14': self.col_pad + 33}
-        self.X_rows = {zone: self.O_rows[zone] + 1 for zone in self.O_rows}
-        self.X_cols = {zone: self.O_cols[zone] for zone in self.O_cols}
-
         # Dictionary that holds count of balls and strikes in each zone
         self.zone_OXs = {'zone' + str(i) : {'balls': 0, 'strikes': 0}
                         for i in [1,2,3,4,5,6,7,8,9,11,12,13,14]}
 
-        # Initialize with blank strike zone
-        self.strikezone = self.get_a_strikezone('blank')
+        # Initialize with a grid of characters copied from the blank strike zone
+        self.grid = [list(line) for line in self.get_template('blank')]
+
+    @classmethod
+    def get_template(cls, version='blank'):
+        """This class method returns the lines of a strike zone txt file as a tuple,
+        reading the file only the first time each version is asked for."""
+        if version not in cls.templates:
+            strikezone_txt_filename = strikezone_filepath + 'strikezone_' + str(version) + '.txt'
+            with open(strikezone_txt_filename, 'rt') as infile:
+                cls.templates[version] = tuple(infile)
+        return cls.templates[version]
 
     @classmethod
-    def get_a_strikezone(self, version='blank', style='list'):
+    def get_a_strikezone(cls, version='blank', style='list'):
         """This is a class method that loads a version of the strike zone string from a text file.
         The version parameter can be: 'blank', 'zones', legend' 
         and is 'blank' by default.
         It can return either a single 'string' or a 'list' of strings depending on the 'style' parameter."""
 
-        if style.lower() == 'string':
-            strikezone = ''
-        elif style.lower() == 'list':
-            strikezone = []
-
         try:
-            strikezone_txt_filename = strikezone_filepath + 'strikezone_' + str(version) + '.txt'
-            with open(strikezone_txt_filename, 'rt') as infile:
-                for line in infile:
-                    if style.lower() == 'string':
-                        strikezone += line
-                    elif style.lower() == 'list':
-                        strikezone.append(line)
-
-            return strikezone
+            template = cls.get_template(version)
+            if style.lower() == 'string':
+                return ''.join(template)
+            elif style.lower() == 'list':
+                return list(template)
 
         except FileNotFoundError:
-            print(f'File {strikezone_txt_filename} not found.')
+            print(f'File {strikezone_filepath}strikezone_{version}.txt not found.')
         except Exception as err:
             print(f'An error occured while loading {version} strikezone: {type(err)} {err}')
 
+    @classmethod
+    def get_compact_layout(cls, version='blank'):
+        """Return the rows of a template that are not blank and the width of the
+        blank left margin they all share, measuring them the first time only."""
+        if version not in cls.compact_layouts:
+            template = cls.get_template(version)
+            rows = tuple(row for row, line in enumerate(template) if line.strip())
+            margin = min(len(template[row]) - len(template[row].lstrip(' ')) for row in rows)
+            cls.compact_layouts[version] = (rows, margin)
+        return cls.compact_layouts[version]
+
+    @classmethod
+    def get_compact_template(cls, version='blank'):
+        """Return the lines of a template without newlines, blank lines or their left margin
+        as a tuple, e.g. the zone legend drawn beside other information on the compact at bat
+        screen. The lines are only cut the first time each version is asked for."""
+        if version not in cls.compact_templates:
+            rows, margin = cls.get_compact_layout(version)
+            template = cls.get_template(version)
+            cls.compact_templates[version] = tuple(template[row][margin:].rstrip('\n') for row in rows)
+        return cls.compact_templates[version]
+
+    @classmethod
+    def get_compact_width(cls, version='blank'):
+        """Return the width of the widest line of get_compact_template(). Counts are written
+        over blank cells, so it is also the width of compact_lines() for the 'blank' version."""
+        return max(len(line) for line in cls.get_compact_template(version))
+
+    def compact_lines(self):
+        """The strike zone like get_compact_template('blank'), with its counts."""
+        rows, margin = self.get_compact_layout('blank')
+        return [''.join(self.grid[row][margin:]).rstrip('\n') for row in rows]
+
+    @classmethod
+    def get_slot_width(cls, row, col):
+        """Return how many characters a count slot starting at (row, col) can use:
+        the blank cells up to one space before the next line of the strike zone,
+        between min_slot_width and max_slot_width."""
+        if (row, col) not in cls.slot_widths:
+            line = cls.get_template('blank')[row].rstrip('\n')
+            blank_end = col + 1
+            while blank_end < len(line) and line[blank_end] == ' ':
+                blank_end += 1
+            cls.slot_widths[(row, col)] = min(max_slot_width, max(min_slot_width, blank_end - 1 - col))
+        return cls.slot_widths[(row, col)]
+
+    def write_count(self, row, col, marker, count):
+        """Write a marker and count, e.g. 'X12', into the grid cells at (row, col).
+        A count too wide for its slot is capped, e.g. 'X9+' in a 3 character slot."""
+        width = self.get_slot_width(row, col)
+        text = marker + str(count)
+        if len(text) > width:
+            text = marker + '9' * (width - 2) + '+'
+        self.grid[row][col:col + width] = text.ljust(width)
+
+    @property
+    def strikezone(self):
+        """The strike zone as a list of strings, one per line."""
+        return [''.join(row) for row in self.grid]
+
     def update_strikezone(self, pitch, pitch_outcome):
         """This method updates the strike zone based on the pitch that was just pitched
         as well as the outcome that occurred based on the Batter handling the pitch.
         pitch = Pitch object
-        pitch_outcome = string representation of outcome, e.g. "Called Strike", "Homerun" """
+        pitch_outcome = string representation of outcome, e.g. "Called Strike", "Homerun",
+                        or its PitchOutcome code"""
+
+        if pitch_outcome.__class__ is str:
+            pitch_outcome = pitch_outcome_codes[pitch_outcome]
 
         # Fetch the zone where the ball was pitched from the passed Pitch object
         zone_pitched = pitch.zone.lower()
 
         # Case: Strike
-        if pitch_outcome in ['Called Strike', 'Swinging Strike', 'Foul Ball']:
+        if pitch_outcome in strikezone_X_outcomes:
             self.zone_OXs[zone_pitched]['strikes'] = self.zone_OXs[zone_pitched].get('strikes') + 1
             
-            # Update string representation to report how many STRIKES have been thrown in that zone
-            row_str = self.strikezone[self.X_rows[zone_pitched]]
-            row_str = row_str[:self.X_cols[zone_pitched]] \
-                        + 'X' \
-                        + str(self.zone_OXs[zone_pitched]['strikes']) \
-                        + row_str[(self.X_cols[zone_pitched] + 2):]
-            self.strikezone[self.X_rows[zone_pitched]] = row_str
+            # Update the grid to report how many STRIKES have been thrown in that zone
+            self.write_count(self.X_rows[zone_pitched], self.X_cols[zone_pitched],
+                            'X', self.zone_OXs[zone_pitched]['strikes'])
         
         # Case: Ball
-        elif pitch_outcome in ['Ball', 'Hit By Pitch']:
+        elif pitch_outcome in strikezone_O_outcomes:
             self.zone_OXs[zone_pitched]['balls'] = self.zone_OXs[zone_pitched].get('balls') + 1
 
-            # Update string representation to report how many BALLS have been thrown in that zone
-            row_str = self.strikezone[self.O_rows[zone_pitched]]
-            row_str = row_str[:self.O_cols[zone_pitched]] \
-                        + 'O' \
-                        + str(self.zone_OXs[zone_pitched]['balls']) \
-                        + row_str[(self.O_cols[zone_pitched] + 2):]
-            self.strikezone[self.O_rows[zone_pitched]] = row_str
+            # Update the grid to report how many BALLS have been thrown in that zone
+            self.write_count(self.O_rows[zone_pitched], self.O_cols[zone_pitched],
+                            'O', self.zone_OXs[zone_pitched]['balls'])
 
         # Case: something else happened that doesn't affect the strikezone, like a base hit
         else:
             pass
 
     def __str__(self):
-        s = ''
-        for line in self.strikezone:
-            s += line
-        return s
+        return ''.join(''.join(row) for row in self.grid)
 
     def __repr__(self):
-        s = ''
-        for line in self.strikezone:
-            s += line
-        return s
-
+        return self.__str__()
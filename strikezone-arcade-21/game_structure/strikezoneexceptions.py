@@ -8,4 +8,13 @@ class PitchTypeError(Exception):
         self.message = f"Pitch Type not in this Pitcher's repertoire."
 
     def __str__(self):
-        return self.message
\ No newline at end of file
+        return self.message
+
+
+class SessionClosedError(Exception):
+    """Indicates that a game server player disconnected or was idle for too long."""
+    def __init__(self, reason='disconnected'):
+        self.message = f"Game session closed: {reason}."
+
+    def __str__(self):
+        return self.message
@@ -14,15 +14,12 @@ class BaseballTeam:
     """The BaseballTeam class holds baseball Players in their
     batting order. Initialization requires a City, Team Name, 
     and a list of Player objects."""
-    
-    num_of_teams = 0
 
-    def __init__(self, team_city='?', team_name='?', players=[]):
-        # Increment number of teams
-        BaseballTeam.num_of_teams += 1
+    def __init__(self, team_city='?', team_name='?', players=None):
         self.team_city = team_city
         self.team_name = team_name
-        self.players = players
+        # Each team gets its own list of players
+        self.players = players if players is not None else []
 
     def __str__(self):
         return f"{self.team_city} {self.team_name}"
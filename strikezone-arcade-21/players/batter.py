@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-"""The Batter module builds upon the Player class to provide
+"""The Batter module wraps the Player class to provide
 further, batter-specific actions. A Player becomes a Batter
 when they step up to the plate."""
 
@@ -9,6 +9,7 @@ when they step up to the plate."""
 import random
 
 from players.player import Player
+from players.pitcher import pitch_outcomes
 
 
 
@@ -17,56 +18,93 @@ from players.player import Player
 
 # -------------------- Batter Class -------------------- #
 
-class Batter(Player):
-    """The Batter class is a child of the Player class. 
-    It is a representation of a baseball Player in the phase
-    of batting, i.e. one who has just stepped up to the plate.
-    The primary action added in this class is the get_pitch_outcome()
-    method, which gives them the ability to read a Pitch and
-    determine an outcome."""
+class Batter:
+    """The Batter class is a representation of a baseball Player
+    in the phase of batting, i.e. one who has just stepped up to
+    the plate. The primary action added in this class is the
+    get_pitch_outcome() method, which gives them the ability to
+    read a Pitch and determine an outcome.
+    A Batter wraps the roster's Player object instead of copying it,
+    so its name, team and position are read from (and written to)
+    that Player. It is not a Player itself, so it holds only the
+    Player and its batting average, which is read for every pitch
+    and is fixed for the plate appearance."""
+
+    __slots__ = ('player', 'bat_avg')
 
     def __init__(self, player_object=None, first_name = "?", last_name = "?", team_city = "?", team_name = "?", position = "?", bat_avg = 0.0):
         
-        # If we don't have a Player object to create this around, pass parameters to parent for initializing
+        # If we don't have a Player object to create this around, create one from the parameters
         if player_object is None:
-            super().__init__(first_name, last_name, team_city, team_name, position, bat_avg)
-        
-        # If we already have a Player object to create around, use their attributes
-        else:
-            super().__init__(player_object.first_name,
-                            player_object.last_name,
-                            player_object.team_city,
-                            player_object.team_name,
-                            player_object.position,
-                            player_object.bat_avg)
-
-    def get_pitch_outcome(self, pitch):
+            player_object = Player(first_name, last_name, team_city, team_name, position, bat_avg)
+
+        # Wrap the Player object rather than copying its attributes
+        self.player = player_object
+        self.bat_avg = player_object.bat_avg
+
+    def __str__(self):
+        return str(self.player)
+
+    def __repr__(self):
+        return repr(self.player)
+
+    @property
+    def first_name(self):
+        return self.player.first_name
+
+    @first_name.setter
+    def first_name(self, value):
+        self.player.first_name = value
+
+    @property
+    def last_name(self):
+        return self.player.last_name
+
+    @last_name.setter
+    def last_name(self, value):
+        self.player.last_name = value
+
+    @property
+    def team_city(self):
+        return self.player.team_city
+
+    @team_city.setter
+    def team_city(self, value):
+        self.player.team_city = value
+
+    @property
+    def team_name(self):
+        return self.player.team_name
+
+    @team_name.setter
+    def team_name(self, value):
+        self.player.team_name = value
+
+    @property
+    def position(self):
+        return self.player.position
+
+    @position.setter
+    def position(self, value):
+        self.player.position = value
+
+    def get_pitch_outcome(self, pitch, rng=random):
         """This method determines the outcome of delivering a Pitcher's pitch to
         this batter. The outcome is determined probabilistically with randomness
-        included for a variety of outcomes given the same inputs."""
-
-        pitch_thrown_probs = pitch.get_zone_outcome_probs()
-
-        # Create a new dictionary whose values are ranges of integers
-        # based on the probabilities. E.g. 4 inputs of 25% would result in:
-        # 1 - 25, 26 - 50, 51 - 75, 76 - 100
-        prob_ranges = {}
-        sum = 1
-        for outcome in pitch_thrown_probs.keys():
-            # Convert this float probability to an integer by rounding
-            this_prob = round(pitch_thrown_probs[outcome])
-            
-            # Add range of integers to dict
-            prob_ranges[outcome] = range(sum, sum + this_prob)
-            sum += this_prob
-
-
-        # Pick a random number between 0 and 100
-        # If this number falls in a given range, that outcome occurs
-        r_num = random.randint(1, 99)
-        pitch_outcome = [outcome for outcome,probs in prob_ranges.items() if r_num in probs][0]
-
-        # The outcome is a string.
-        return pitch_outcome
+        included for a variety of outcomes given the same inputs.
+        The rng parameter can be a random.Random instance for seeded simulations,
+        and is the global random module by default."""
+
+        # The outcome is a string, e.g. "Ball"
+        return pitch_outcomes[self.get_pitch_outcome_code(pitch, rng)]
+
+    def get_pitch_outcome_code(self, pitch, rng=random):
+        """This method is get_pitch_outcome() returning the outcome's PitchOutcome code,
+        e.g. 2 for PitchOutcome.BALL, which the game, the simulations and the replays
+        pass through the Count rules without converting it to a string."""
+
+        # Draw an outcome from the Pitch's compiled cumulative distribution.
+        # Every outcome keeps its exact float probability, even those below 1%.
+        return pitch.get_outcome_sampler().sample(rng)
 
 
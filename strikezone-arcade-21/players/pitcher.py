@@ -9,11 +9,13 @@ batter to receive."""
 
 
 # -------------------- Import Modules -------------------- #
+from collections import namedtuple
 import json
 import os.path
 
 from players.player import Player
 from game_structure.pitch import Pitch
+from game_structure.outcomesampler import OutcomeSampler
 from game_structure.strikezoneexceptions import PitchTypeError
 
 
@@ -32,6 +34,8 @@ pitch_outcomes = ("Called Strike",
                 "Triple",
                 "Homerun",
                 "Hit By Pitch")
+# Position of each outcome, which is its PitchOutcome code in the CountRules module
+pitch_outcome_indices = {outcome: index for index, outcome in enumerate(pitch_outcomes)}
 
 # Statcast attack zones per baseballsavant.mlb.com
 # Zone 10 is skipped to match statcast
@@ -48,6 +52,17 @@ avg_bat_avg = 0.245
 # Game difficulty exponent (I'm still figuring out the best way to make this game difficult)
 difficulty_mult = 8
 
+# Optional bucket size for batting averages in the pitch cache, e.g. 0.005.
+# Batters within a bucket share one adjusted table. None keeps exact batting averages.
+bat_avg_bucket_size = None
+
+# Outcomes that are factored up/down by the batter's batting average
+batter_favored = ('Single', 'Double', 'Triple', 'Homerun')
+
+# The settings above as one value, so a game can use its own (see the SessionContext module).
+# pitch() and adjust_zone_probs() use the current globals when no settings are given.
+PitchSettings = namedtuple('PitchSettings', ['avg_bat_avg', 'difficulty_mult', 'bat_avg_bucket_size'])
+
 
 # -------------------- Pitcher Class -------------------- #
 
@@ -66,8 +81,35 @@ class Pitcher(Player):
 
         self.pitch_types = repertoire
 
+        # Cache of batter-adjusted Pitch objects for each PitchSettings, see pitch()
+        # {settings: {(pitch_type, zone, bat_avg): Pitch}}
+        self.pitch_cache = {}
+        # The most recently used (settings, cache) pair, replaced as one value so threads never mix them up
+        self.recent_pitch_cache = (None, None)
+
         self.popz = {}
+
+        # Optional NumPy backend, compiled from the POPZ table on first use
+        self.popz_tensor = None
     
+    @property
+    def popz(self):
+        """This Pitcher's POPZ table. Replacing it clears the pitch cache."""
+        return self._popz
+
+    @popz.setter
+    def popz(self, popz):
+        self._popz = popz
+        self.invalidate_pitch_cache()
+
+    def invalidate_pitch_cache(self):
+        """Clear the cached Pitch objects of pitch() and the POPZ tensor of
+        simulate_pitches(). Call this after changing the POPZ table in place;
+        replacing it with a new table clears the caches itself."""
+        self.pitch_cache = {}
+        self.recent_pitch_cache = (None, None)
+        self.popz_tensor = None
+
     def interactive_popz_to_json(self):
         """This method creates a POPZ table by guiding the user to
         input outcome probabilities for each zone and each pitch type.
@@ -106,6 +148,7 @@ class Pitcher(Player):
 
             # Add this pitch_type_dict to the POPZ dict
             self.popz[pitch_type] = pitch_type_dict
+            self.invalidate_pitch_cache()
             print(f'Pitch type {pitch_type} added to POPZ.\n')
 
         # Calling method to save to json file
@@ -121,7 +164,9 @@ class Pitcher(Player):
                 print(f'Writing POPZ data to {popz_json_filename}')
                 # Open file for writing
                 with open(popz_json_filename, 'w+') as outfile:
-                    json.dump(self.popz, outfile)
+                    # Copy into plain dictionaries, as the POPZ table may be a view of a PopzStore
+                    json.dump({pitch_type: {zone: dict(zone_dict) for zone, zone_dict in zones.items()}
+                                for pitch_type, zones in self.popz.items()}, outfile)
                 print(f'POPZ data saved to {popz_json_filename}')
             except:
                 print('An error occurred while saving POPZ table to JSON file.')
@@ -129,8 +174,8 @@ class Pitcher(Player):
             # No POPZ data created yet, so there's nothing to save
             print(f'This pitcher has no POPZ data yet. Import an existing JSON file or manually input with interactive_popz_to_json().')
 
-    def load_popz_from_json(self):
-        """Load a POPZ table from a JSON file in data/popz/"""
+    def load_popz_from_json(self, popz_json_filename=None):
+        """Load a POPZ table from a JSON file in data/popz/, or from popz_json_filename if given"""
         if self.popz != {}:
             print(f"{self.first_name} {self.last_name}'s POPZ table is not currently empty.")
             print(f"Importing a POPZ table from JSON will overwrite this pitcher's data.")
@@ -148,7 +193,8 @@ class Pitcher(Player):
                     print('Please provide a valid input.')
         try:
             # example filename = data/popz/clayton_kershaw.json
-            popz_json_filename = popz_json_filepath + self.first_name.lower() + '_' + self.last_name.lower() + '.json'
+            if popz_json_filename is None:
+                popz_json_filename = popz_json_filepath + self.first_name.lower() + '_' + self.last_name.lower() + '.json'
             # Open file for reading
             with open(popz_json_filename, 'r') as infile:
                 self.popz = json.load(infile)
@@ -157,48 +203,107 @@ class Pitcher(Player):
         except Exception as err:
             print(f'An error occurred while importing json data: {type(err)} {err}')
 
-    def pitch(self, pitch_type, zone, batter=None):
+    def load_popz_from_store(self, store_filename=None):
+        """Load this pitcher's POPZ table from a binary POPZ store (see players/popzstore.py).
+        The store is memory-mapped, so the table is read in place instead of parsed.
+        Returns False if the store or this pitcher is not found."""
+
+        # Import here to avoid a circular import with the PopzStore module
+        from players.popzstore import get_popz_store, pitcher_key, popz_store_filename
+
+        try:
+            store = get_popz_store(store_filename or popz_store_filename)
+        except FileNotFoundError:
+            print(f'File not found.')
+            return False
+
+        key = pitcher_key(self.first_name, self.last_name)
+        if key not in store:
+            print(f'{self.first_name} {self.last_name} is not in the POPZ store.')
+            return False
+
+        self.popz = store.get_popz(key)
+        return True
+
+    def pitch(self, pitch_type, zone, batter=None, settings=None):
         """This method acts as a getter to pull the correct Probability of Outcome
         based on the provided Pitch Type and Zone. It returns a Pitch object containing
         the zone dictionary with normalized values (all add up to 100.00%).
         The Batter parameter is used to factor the probabilities based on their batting
-        average. A good batter will have a better chance of hitting a base hit."""
+        average. A good batter will have a better chance of hitting a base hit.
+        The optional settings are a PitchSettings to use instead of the avg_bat_avg,
+        difficulty_mult and bat_avg_bucket_size globals, so games with different
+        settings can share this Pitcher.
+        Pitches are cached per settings, pitch type, zone and batting average, so each table
+        is only computed once for a lineup and the same Pitch is shared. The cache is cleared
+        when the POPZ table is replaced."""
 
         # Check if pitch_type is in this Pitcher's repertoire
         if pitch_type not in self.pitch_types:
             # Raise custom exception to be handled by PlateAppearance
             raise PitchTypeError
 
-        # Get zone_dict from input - create shallow copy to not alter original
-        zone_dict = self.popz[pitch_type][zone].copy()
-        
-        # Factor the probabilities up/down based on the batter's batting avg
-        bat_avg = batter.bat_avg
-        league_avg = avg_bat_avg
-        # bat_avg_factor = 1.0 + (0.1 * (bat_avg - league_avg) * 100)
-        # bat_avg_factor_sign = (bat_avg - league_avg) / abs(bat_avg - league_avg)
-        bat_avg_factor = 1.0 + 10.0 * (bat_avg - league_avg)
-        batter_favored = ['Single', 'Double', 'Triple', 'Homerun']
-        
-        if batter is not None:
-            
-            for outcome in zone_dict:
-                
-                # Manipulate probabilities of outcomes if they are batter-favored
-                if outcome in batter_favored:
-                    
-                    # If this is a good batter, 0.0 chance base hits become non-zero and amplified by factor
-                    if bat_avg_factor > 1.0 and zone_dict[outcome] == 0.0:
-                        zone_dict[outcome] = bat_avg_factor * ( min(zone_dict.values()) )
-                        
-                    elif bat_avg_factor > 1.0:
-                        zone_dict[outcome] = (bat_avg_factor ** difficulty_mult) * zone_dict.get(outcome)
-
-                    # If this is a bad batter, reduce batter-favored outcomes by the factor
-                    elif bat_avg_factor < 1.0:
-                        # Use max() to prevent a negative value
-                        zone_dict[outcome] = max(0, zone_dict.get(outcome) * bat_avg_factor)
-        
+        # The cache of these settings (a plain tuple and a PitchSettings with the same values are the same key).
+        # Comparing with the most recent settings is faster than hashing them on every pitch.
+        if settings is None:
+            settings = (avg_bat_avg, difficulty_mult, bat_avg_bucket_size)
+        recent_settings, pitch_cache = self.recent_pitch_cache
+        if settings != recent_settings:
+            pitch_cache = self.pitch_cache.setdefault(settings, {})
+            self.recent_pitch_cache = (settings, pitch_cache)
+
+        bat_avg = None if batter is None else batter.bat_avg
+        bucket_size = settings[2]
+        if bat_avg is not None and bucket_size is not None:
+            bat_avg = round(bat_avg / bucket_size) * bucket_size
+
+        # Create a Pitch object the first time, then return the shared one
+        key = (pitch_type, zone, bat_avg)
+        if key not in pitch_cache:
+            zone_dict = self.adjust_zone_probs(self.popz[pitch_type][zone], bat_avg, settings)
+            # The codes of the CountRules module are the positions in the tuples above
+            pitch_cache[key] = Pitch(pitch_type, zone, zone_dict, OutcomeSampler(zone_dict, pitch_outcome_indices),
+                                    pitch_types.index(pitch_type), pitch_zones.index(zone))
+        return pitch_cache[key]
+
+    def adjust_zone_probs(self, zone_probs, bat_avg=None, settings=None):
+        """This method returns a new zone dictionary with the batter-favored outcomes
+        factored up/down by the batting average, normalized to add up to 100%.
+        A bat_avg of None leaves the probabilities unadjusted. The optional settings
+        are a PitchSettings to use instead of the avg_bat_avg and difficulty_mult globals."""
+
+        if settings is None:
+            league_avg, difficulty = avg_bat_avg, difficulty_mult
+        else:
+            league_avg, difficulty = settings[0], settings[1]
+
+        # Create a copy to not alter the original
+        zone_dict = dict(zone_probs)
+
+        if bat_avg is not None:
+            # Factor the probabilities up/down based on the batter's batting avg
+            # bat_avg_factor = 1.0 + (0.1 * (bat_avg - league_avg) * 100)
+            # bat_avg_factor_sign = (bat_avg - league_avg) / abs(bat_avg - league_avg)
+            bat_avg_factor = 1.0 + 10.0 * (bat_avg - league_avg)
+
+            # Smallest chance in the zone, which 0.0 chance base hits are raised from.
+            # It includes the 0.0 chance itself, so these base hits stay at zero.
+            min_prob = min(zone_dict.values())
+
+            for outcome in batter_favored:
+
+                # If this is a good batter, 0.0 chance base hits become non-zero and amplified by factor
+                if bat_avg_factor > 1.0 and zone_dict[outcome] == 0.0:
+                    zone_dict[outcome] = bat_avg_factor * min_prob
+
+                elif bat_avg_factor > 1.0:
+                    zone_dict[outcome] = (bat_avg_factor ** difficulty) * zone_dict.get(outcome)
+
+                # If this is a bad batter, reduce batter-favored outcomes by the factor
+                elif bat_avg_factor < 1.0:
+                    # Use max() to prevent a negative value
+                    zone_dict[outcome] = max(0, zone_dict.get(outcome) * bat_avg_factor)
+
         # Normalize values so they all add up to 100% (make sure they're floats)
         zone_prob_sum = 0
         # Get the sum of all values
@@ -207,8 +312,58 @@ class Pitcher(Player):
         # Update the values to standardized values
         for key in zone_dict.keys():
             zone_dict[key] = float(zone_dict[key]) * 100 / zone_prob_sum
-        
-        # Create a Pitch object and return it
-        return Pitch(pitch_type, zone, zone_dict)
-
 
+        return zone_dict
+
+    def get_popz_tensor(self):
+        """Return this Pitcher's POPZ table compiled into a PopzTensor (NumPy backend).
+        The tensor is rebuilt if the POPZ table has been replaced since it was compiled,
+        or changed in place and invalidate_pitch_cache() called."""
+
+        # Import here so NumPy stays an optional dependency of the game
+        from players.popztensor import PopzTensor
+
+        if self.popz_tensor is None or self.popz_tensor.popz is not self.popz:
+            self.popz_tensor = PopzTensor(self.popz, self.pitch_types)
+        return self.popz_tensor
+
+    def sample_outcomes(self, pitch_types, zones, batters=None, n=None, rng=None, settings=None):
+        """This method draws many pitch outcomes in one vectorized call using the
+        NumPy backend, with the same probabilities as pitch() and get_pitch_outcome().
+        pitch_types = pitch type name(s) or index(es) into the pitch_types global
+        zones = zone name(s), e.g. 'zone3', or index(es) into the pitch_zones global
+        batters = a single Batter, a sequence of batting averages (one per pitch),
+                  or None for unadjusted probabilities
+        n = number of pitches to draw when single values are given above
+        rng = numpy.random.Generator for seeded simulations
+        settings = optional PitchSettings, as in pitch()
+        It returns a NumPy integer array of indices into the pitch_outcomes global."""
+
+        from players.popztensor import np, pitch_type_indices, zone_indices
+
+        popz_tensor = self.get_popz_tensor()
+        if settings is None:
+            settings = PitchSettings(avg_bat_avg, difficulty_mult, bat_avg_bucket_size)
+
+        # Convert names to indices and repeat single values to n pitches
+        pitch_type_index = pitch_type_indices(pitch_types)
+        zone_index = zone_indices(zones)
+        if batters is None:
+            bat_avgs = None
+        elif hasattr(batters, 'bat_avg'):
+            bat_avgs = np.array(batters.bat_avg, dtype=float)
+        else:
+            bat_avgs = np.asarray(batters, dtype=float)
+
+        shapes = [pitch_type_index, zone_index] if bat_avgs is None else [pitch_type_index, zone_index, bat_avgs]
+        size = np.broadcast_shapes(*[array.shape for array in shapes], () if n is None else (n,))
+        pitch_type_index = np.broadcast_to(pitch_type_index, size).ravel()
+        zone_index = np.broadcast_to(zone_index, size).ravel()
+        if bat_avgs is not None:
+            bat_avgs = np.broadcast_to(bat_avgs, size).ravel()
+            # Bucket batting averages the same way as pitch()
+            if settings.bat_avg_bucket_size is not None:
+                bat_avgs = np.round(bat_avgs / settings.bat_avg_bucket_size) * settings.bat_avg_bucket_size
+
+        return popz_tensor.sample(pitch_type_index, zone_index, bat_avgs,
+                                    settings.avg_bat_avg, settings.difficulty_mult, rng)
@@ -15,7 +15,11 @@ other modules."""
 class Player:
     """A Player's attributes include their name, their team's
     city and name, their fielding position, and their batting
-    average. A Player's only methods are string representations."""
+    average. A Player's only methods are string representations.
+    Attributes are kept in slots, as rosters can hold many Players."""
+
+    __slots__ = ('first_name', 'last_name', 'team_city', 'team_name', 'position', 'bat_avg')
+
     def __init__(self, 
                 first_name = "?", 
                 last_name = "?", 
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+"""The PopzStore module packs the POPZ tables of many pitchers into
+one binary file that is memory-mapped instead of parsed. Each pitcher
+is a fixed-shape float32 [pitch type, zone, outcome] block, found
+through an index of pitcher names in the file header, so opening a
+pitcher only reads the index. The module can be run to convert the
+JSON files in data/popz/ into a store:
+    python3 -m players.popzstore"""
+
+
+# -------------------- Import Modules -------------------- #
+from array import array
+from collections.abc import Mapping
+import glob
+import json
+import mmap
+import os.path
+import struct
+import sys
+
+from players.pitcher import pitch_types, pitch_zones, pitch_outcomes, popz_json_filepath
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Default store location, next to the JSON files it is built from
+popz_store_filename = os.path.join(popz_json_filepath, 'popz_store.bin')
+
+# File layout (little-endian):
+#  - header: magic, version, number of pitch types, zones, outcomes and pitchers
+#  - index: one entry per pitcher with its name (e.g. clayton_kershaw),
+#           a bitmask of the pitch types it has and the offset of its block
+#  - blocks: one float32 [pitch type, zone, outcome] block per pitcher
+popz_store_magic = b'POPZ'
+popz_store_version = 1
+header_struct = struct.Struct('<4sHHHHI')
+index_struct = struct.Struct('<64sB7xQ')
+block_floats = len(pitch_types) * len(pitch_zones) * len(pitch_outcomes)
+block_size = block_floats * 4
+
+# Stores already opened by this process, {filename: PopzStore}
+open_popz_stores = {}
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def pitcher_key(first_name, last_name):
+    """Return a pitcher's key in the store, the same as their JSON filename,
+    e.g. ('Clayton', 'Kershaw') -> 'clayton_kershaw'."""
+    return first_name.lower() + '_' + last_name.lower()
+
+def get_popz_store(filename=popz_store_filename):
+    """Return the PopzStore for this file, opening and mapping it only once per process."""
+    if filename not in open_popz_stores:
+        open_popz_stores[filename] = PopzStore(filename)
+    return open_popz_stores[filename]
+
+def stored_float(value):
+    """Round a float32 value back to the shortest decimal that it represents,
+    so 0.3 is read back as 0.3 rather than 0.30000001192092896."""
+    return float(f'{value:.7g}')
+
+def write_popz_store(popz_tables, filename=popz_store_filename):
+    """This function writes POPZ tables to a binary store file.
+    popz_tables = dictionary of {pitcher key: POPZ dictionary}
+    Pitch types missing from a POPZ table are stored as zeros and left out when read."""
+
+    names = sorted(popz_tables)
+    data_offset = header_struct.size + index_struct.size * len(names)
+    # Align the float blocks to 8 bytes
+    data_offset += -data_offset % 8
+
+    with open(filename + '.tmp', 'wb') as outfile:
+        outfile.write(header_struct.pack(popz_store_magic, popz_store_version,
+                                        len(pitch_types), len(pitch_zones), len(pitch_outcomes), len(names)))
+        for i, name in enumerate(names):
+            if len(name.encode('utf-8')) > 64:
+                raise ValueError(f'Pitcher key {name} is longer than 64 bytes.')
+            mask = 0
+            for p, pitch_type in enumerate(pitch_types):
+                if pitch_type in popz_tables[name]:
+                    mask |= 1 << p
+            outfile.write(index_struct.pack(name.encode('utf-8'), mask, data_offset + i * block_size))
+        outfile.write(b'\0' * (data_offset - outfile.tell()))
+
+        for name in names:
+            popz = popz_tables[name]
+            block = array('f', bytes(block_size))
+            for p, pitch_type in enumerate(pitch_types):
+                if pitch_type not in popz:
+                    continue
+                for z, zone in enumerate(pitch_zones):
+                    for o, outcome in enumerate(pitch_outcomes):
+                        block[(p * len(pitch_zones) + z) * len(pitch_outcomes) + o] = float(popz[pitch_type][zone][outcome])
+            if sys.byteorder != 'little':
+                block.byteswap()
+            outfile.write(block.tobytes())
+
+    # Replace the old store only once the new one is complete
+    os.replace(filename + '.tmp', filename)
+
+def convert_json_directory(json_dir=popz_json_filepath, filename=popz_store_filename):
+    """Convert every POPZ JSON file in json_dir into one binary store.
+    Returns the list of pitcher keys written."""
+    popz_tables = {}
+    for json_filename in sorted(glob.glob(os.path.join(json_dir, '*.json'))):
+        with open(json_filename, 'r') as infile:
+            popz_tables[os.path.splitext(os.path.basename(json_filename))[0]] = json.load(infile)
+    write_popz_store(popz_tables, filename)
+    return sorted(popz_tables)
+
+
+
+
+# -------------------- PopzStore Class -------------------- #
+
+class PopzStore:
+    """The PopzStore class memory-maps a binary store file and reads
+    its index of pitchers. A pitcher's POPZ table is returned as a
+    read-only PopzView over the mapped floats, so nothing is copied
+    or parsed until a zone is actually used."""
+
+    def __init__(self, filename=popz_store_filename):
+        self.filename = filename
+        with open(filename, 'rb') as infile:
+            self.mapped = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_types, n_zones, n_outcomes, n_pitchers = header_struct.unpack_from(self.mapped, 0)
+        if magic != popz_store_magic or version != popz_store_version:
+            raise ValueError(f'{filename} is not a version {popz_store_version} POPZ store.')
+        if (n_types, n_zones, n_outcomes) != (len(pitch_types), len(pitch_zones), len(pitch_outcomes)):
+            raise ValueError(f'{filename} does not match the game\'s pitch types, zones and outcomes.')
+
+        # {pitcher key: (pitch type mask, block offset)}
+        self.index = {}
+        for i in range(n_pitchers):
+            name, mask, offset = index_struct.unpack_from(self.mapped, header_struct.size + i * index_struct.size)
+            self.index[name.rstrip(b'\0').decode('utf-8')] = (mask, offset)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def keys(self):
+        return self.index.keys()
+
+    def get_floats(self, key):
+        """Return a pitcher's block as a flat sequence of floats in
+        [pitch type, zone, outcome] order, without copying on little-endian machines."""
+        mask, offset = self.index[key]
+        block = memoryview(self.mapped)[offset:offset + block_size]
+        if sys.byteorder == 'little':
+            return block.cast('f')
+        floats = array('f', block)
+        floats.byteswap()
+        return floats
+
+    def get_popz(self, key):
+        """Return a pitcher's POPZ table as a PopzView, e.g. store.get_popz('clayton_kershaw')."""
+        mask, offset = self.index[key]
+        present = tuple(pitch_type for p, pitch_type in enumerate(pitch_types) if mask & (1 << p))
+        return PopzView(self.get_floats(key), present)
+
+
+
+
+# -------------------- PopzView Class -------------------- #
+
+class PopzView(Mapping):
+    """The PopzView class reads like a POPZ dictionary,
+    popz[pitch_type][zone][outcome], but is backed by a flat block of floats.
+    Each zone is turned into a small outcome dictionary only when accessed."""
+
+    def __init__(self, floats, present_pitch_types):
+        self.floats = floats
+        self.present_pitch_types = present_pitch_types
+
+    def __getitem__(self, pitch_type):
+        if pitch_type not in self.present_pitch_types:
+            raise KeyError(pitch_type)
+        return PitchTypeView(self.floats, pitch_types.index(pitch_type))
+
+    def __iter__(self):
+        return iter(self.present_pitch_types)
+
+    def __len__(self):
+        return len(self.present_pitch_types)
+
+
+class PitchTypeView(Mapping):
+    """One pitch type of a PopzView: a mapping of zone -> outcome dictionary."""
+
+    def __init__(self, floats, pitch_type_index):
+        self.floats = floats
+        self.start = pitch_type_index * len(pitch_zones) * len(pitch_outcomes)
+
+    def __getitem__(self, zone):
+        if zone not in pitch_zones:
+            raise KeyError(zone)
+        z = pitch_zones.index(zone)
+        start = self.start + z * len(pitch_outcomes)
+        return {outcome: stored_float(self.floats[start + o]) for o, outcome in enumerate(pitch_outcomes)}
+
+    def __iter__(self):
+        return iter(pitch_zones)
+
+    def __len__(self):
+        return len(pitch_zones)
+
+
+
+
+# -------------------- Command Line Access -------------------- #
+
+if __name__ == "__main__":
+
+    # Convert the JSON files in data/popz/ into the default store
+    written = convert_json_directory()
+    print(f'Wrote {len(written)} pitchers to {popz_store_filename}')
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+"""The PopzTensor module is an optional NumPy backend for POPZ tables.
+It compiles a Pitcher's nested POPZ dictionary into a dense
+[pitch type, zone, outcome] array so that millions of pitch outcomes
+can be drawn in a few vectorized calls. NumPy is only needed when
+this backend is used; the rest of the game runs without it."""
+
+
+# -------------------- Import Modules -------------------- #
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from players.pitcher import pitch_types, pitch_zones, pitch_outcomes, batter_favored
+from game_structure.strikezoneexceptions import PitchTypeError
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Outcomes that are factored up/down by the batter's batting average (see Pitcher.adjust_zone_probs)
+batter_favored_index = [pitch_outcomes.index(outcome) for outcome in batter_favored]
+
+# Number of pitches sampled per block, to bound memory on very large draws
+default_block_size = 2 ** 18
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def require_numpy():
+    """Raise an ImportError with a helpful message if NumPy is not installed."""
+    if np is None:
+        raise ImportError('The POPZ tensor backend requires NumPy. Install it with: pip install numpy')
+
+def compile_popz(popz):
+    """This function converts a nested POPZ dictionary (pitch type -> zone -> outcome)
+    into a float array of shape [pitch type, zone, outcome], indexed in the order of the
+    pitch_types, pitch_zones and pitch_outcomes globals. Pitch types missing from the
+    POPZ table are left as zeros."""
+    require_numpy()
+
+    tensor = np.zeros((len(pitch_types), len(pitch_zones), len(pitch_outcomes)))
+    for p, pitch_type in enumerate(pitch_types):
+        if pitch_type not in popz:
+            continue
+        for z, zone in enumerate(pitch_zones):
+            zone_dict = popz[pitch_type][zone]
+            for o, outcome in enumerate(pitch_outcomes):
+                tensor[p, z, o] = float(zone_dict[outcome])
+    return tensor
+
+def to_index_array(values, names):
+    """Convert a sequence (or single value) of names, e.g. 'Fastball' or 'zone3',
+    or of integer indices into an integer index array."""
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu':
+        return values.astype(np.intp)
+    lookup = {name: index for index, name in enumerate(names)}
+    try:
+        return np.vectorize(lookup.__getitem__, otypes=[np.intp])(values)
+    except KeyError as err:
+        raise ValueError(f'Unknown value {err} - expected one of {names}')
+
+def pitch_type_indices(values):
+    """Convert pitch type name(s), e.g. 'Fastball', to indices into pitch_types."""
+    return to_index_array(values, pitch_types)
+
+def zone_indices(values):
+    """Convert zone name(s), e.g. 'zone3', to indices into pitch_zones."""
+    return to_index_array(values, pitch_zones)
+
+
+
+
+# -------------------- PopzTensor Class -------------------- #
+
+class PopzTensor:
+    """The PopzTensor class holds a Pitcher's compiled POPZ array and
+    the batter-adjusted cumulative distributions built from it.
+    Adjusted tables are cached per batting average, since a lineup
+    only has a handful of distinct batters."""
+
+    def __init__(self, popz, repertoire=pitch_types):
+        require_numpy()
+
+        # Keep a reference to the source dictionary so the Pitcher can tell when it changes
+        self.popz = popz
+        self.tensor = compile_popz(popz)
+        self.repertoire_mask = np.array([pitch_type in repertoire for pitch_type in pitch_types])
+
+        # Cache of {(bat_avg, league_avg, difficulty_mult): (cdf, last_nonzero)}
+        self.batter_cdfs = {}
+
+    def adjusted_probs(self, bat_avg, league_avg, difficulty_mult):
+        """This method applies the same batting average adjustment as Pitcher.adjust_zone_probs()
+        to every pitch type and zone at once, and normalizes each zone to 100%.
+        A bat_avg of None leaves the probabilities unadjusted."""
+
+        probs = self.tensor.copy()
+
+        if bat_avg is not None:
+            bat_avg_factor = 1.0 + 10.0 * (bat_avg - league_avg)
+            favored = probs[..., batter_favored_index]
+
+            # A good batter amplifies base hits. Zero chances stay at zero, as in Pitcher.adjust_zone_probs()
+            # where they are replaced by the factored minimum of the zone (which is zero).
+            if bat_avg_factor > 1.0:
+                favored = favored * (bat_avg_factor ** difficulty_mult)
+            # A bad batter reduces base hits, without going negative
+            elif bat_avg_factor < 1.0:
+                favored = np.maximum(0, favored * bat_avg_factor)
+
+            probs[..., batter_favored_index] = favored
+
+        # Normalize each zone so its outcomes add up to 100%
+        zone_sums = probs.sum(axis=-1, keepdims=True)
+        return np.divide(probs * 100, zone_sums, out=np.zeros_like(probs), where=zone_sums > 0)
+
+    def get_batter_cdf(self, bat_avg, league_avg, difficulty_mult):
+        """Return the cached (cdf, last_nonzero) arrays for this batting average.
+        cdf has shape [pitch type, zone, outcome] and last_nonzero holds the last
+        outcome index with a non-zero probability for each pitch type and zone."""
+
+        key = (bat_avg, league_avg, difficulty_mult)
+        if key not in self.batter_cdfs:
+            probs = self.adjusted_probs(bat_avg, league_avg, difficulty_mult)
+            cdf = np.cumsum(probs, axis=-1)
+            nonzero = probs > 0
+            last_nonzero = len(pitch_outcomes) - 1 - np.argmax(nonzero[..., ::-1], axis=-1)
+            self.batter_cdfs[key] = (cdf, last_nonzero)
+        return self.batter_cdfs[key]
+
+    def sample(self, pitch_type_index, zone_index, bat_avgs, league_avg, difficulty_mult,
+               rng=None, block_size=default_block_size):
+        """This method draws one outcome per pitch, vectorized over all pitches.
+        pitch_type_index, zone_index = integer arrays of the same length
+        bat_avgs = array of batting averages (one per pitch), or None for no adjustment
+        rng = numpy.random.Generator, a new default_rng() if not provided
+        Random numbers are drawn in blocks of block_size pitches.
+        It returns an integer array of indices into the pitch_outcomes global."""
+
+        if rng is None:
+            rng = np.random.default_rng()
+
+        if not self.repertoire_mask[pitch_type_index].all():
+            raise PitchTypeError
+
+        n = len(pitch_type_index)
+        outcomes = np.empty(n, dtype=np.intp)
+
+        # Group the pitches by batter so each distinct batter's table is built only once
+        if bat_avgs is None:
+            unique_avgs = [None]
+            batter_index = np.zeros(n, dtype=np.intp)
+        else:
+            unique_avgs, batter_index = np.unique(bat_avgs, return_inverse=True)
+            unique_avgs = unique_avgs.tolist()
+        batter_tables = [self.get_batter_cdf(bat_avg, league_avg, difficulty_mult) for bat_avg in unique_avgs]
+        cdfs = np.stack([cdf for cdf, last_nonzero in batter_tables])
+        last_nonzeros = np.stack([last_nonzero for cdf, last_nonzero in batter_tables])
+
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            b = batter_index[start:stop]
+            p = pitch_type_index[start:stop]
+            z = zone_index[start:stop]
+
+            # Look up each pitch's cumulative distribution and draw a block of random numbers
+            rows = cdfs[b, p, z]
+            r_nums = rng.random(stop - start) * rows[:, -1]
+
+            # The outcome is the number of cumulative totals at or below the random number
+            # (a vectorized binary search), kept within the last possible outcome
+            drawn = (rows <= r_nums[:, None]).sum(axis=1)
+            outcomes[start:stop] = np.minimum(drawn, last_nonzeros[b, p, z])
+
+        return outcomes
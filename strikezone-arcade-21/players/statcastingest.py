@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+"""The StatcastIngest module builds POPZ tables from pitch-level Statcast
+CSV exports (as downloaded from baseballsavant.mlb.com) instead of by hand.
+The CSV is streamed line by line in byte-range chunks, which are spread
+across worker processes, and only outcome counts per pitcher, pitch type
+and zone are kept in memory, so multi-gigabyte season files can be read
+in bounded memory. In incremental mode the counts and the position reached
+in the CSV are saved, so a later run only reads newly appended rows.
+The module can be run from the command line:
+    python3 -m players.statcastingest statcast_2021.csv --incremental"""
+
+
+# -------------------- Import Modules -------------------- #
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
+import os
+import os.path
+
+from players.pitcher import pitch_types, pitch_zones, pitch_outcomes, popz_json_filepath
+
+
+# -------------------- Initialize Global Variables -------------------- #
+
+# Statcast pitch type codes grouped into the game's pitch types
+statcast_pitch_types = {'FF': 'Fastball', 'FA': 'Fastball', 'FT': 'Fastball', 'SI': 'Fastball', 'FC': 'Fastball',
+                        'CH': 'Offspeed', 'FS': 'Offspeed', 'FO': 'Offspeed', 'SC': 'Offspeed',
+                        'SL': 'Breaking', 'ST': 'Breaking', 'SV': 'Breaking', 'CU': 'Breaking',
+                        'KC': 'Breaking', 'CS': 'Breaking', 'KN': 'Breaking', 'EP': 'Breaking'}
+
+# Statcast pitch descriptions translated to the game's pitch outcomes.
+# Balls put in play are translated with the 'events' column instead.
+statcast_descriptions = {'called_strike': 'Called Strike',
+                        'swinging_strike': 'Swinging Strike',
+                        'swinging_strike_blocked': 'Swinging Strike',
+                        'foul_tip': 'Swinging Strike',
+                        'missed_bunt': 'Swinging Strike',
+                        'ball': 'Ball',
+                        'blocked_ball': 'Ball',
+                        'intent_ball': 'Ball',
+                        'pitchout': 'Ball',
+                        'foul': 'Foul Ball',
+                        'foul_bunt': 'Foul Ball',
+                        'bunt_foul_tip': 'Foul Ball',
+                        'hit_by_pitch': 'Hit By Pitch'}
+statcast_hit_events = {'single': 'Single', 'double': 'Double', 'triple': 'Triple', 'home_run': 'Homerun'}
+
+# Statcast zone numbers (as they appear in the CSV) translated to the game's zones
+statcast_zones = {zone.strip('zone'): zone for zone in pitch_zones}
+
+# Counts are stored per pitcher as a flat list in [pitch type, zone, outcome] order
+counts_size = len(pitch_types) * len(pitch_zones) * len(pitch_outcomes)
+
+# Bytes of CSV read by each chunk of work
+default_chunk_size = 64 * 1024 * 1024
+
+
+
+
+# -------------------- Module Functions -------------------- #
+
+def pitcher_key_from_statcast(player_name):
+    """Convert a Statcast player_name to a POPZ file name,
+    e.g. 'Kershaw, Clayton' -> 'clayton_kershaw'."""
+    last_name, _, first_name = player_name.partition(',')
+    return '_'.join((first_name.strip() + ' ' + last_name.strip()).lower().replace('.', '').split())
+
+def row_count_index(row, columns):
+    """Return the position of this CSV row's outcome in a pitcher's counts list,
+    or None if the row cannot be used (unknown pitch type, zone or description)."""
+    pitch_type = statcast_pitch_types.get(row[columns['pitch_type']])
+    # Zones may be written as '5' or '5.0'
+    zone = statcast_zones.get(row[columns['zone']].split('.')[0])
+    description = row[columns['description']]
+    if description.startswith('hit_into_play'):
+        outcome = statcast_hit_events.get(row[columns['events']], 'In Play Out')
+    else:
+        outcome = statcast_descriptions.get(description)
+
+    if pitch_type is None or zone is None or outcome is None:
+        return None
+    return ((pitch_types.index(pitch_type) * len(pitch_zones) + pitch_zones.index(zone)) * len(pitch_outcomes)
+            + pitch_outcomes.index(outcome))
+
+def read_complete_lines(infile, end, position, hold_partial=False):
+    """Yield decoded lines that start before byte position end. After each line,
+    position[0] is set to the byte position just past it. The final line of the file
+    may have no newline; with hold_partial (incremental runs) it may still be being
+    written, so it is left for a later run, otherwise it is read like any other line."""
+    while infile.tell() < end:
+        line = infile.readline()
+        if not line or (hold_partial and not line.endswith(b'\n')):
+            break
+        position[0] = infile.tell()
+        yield line.decode('utf-8')
+
+def count_chunk(chunk):
+    """Count outcomes in one byte range of the CSV. The chunk is a tuple of
+    (csv_filename, start, end, columns, pitcher_keys, hold_partial) so it can be sent to a
+    worker process. Lines are owned by the chunk they start in. With hold_partial, a final
+    line without a newline is not read (see read_complete_lines()).
+    Returns ({pitcher key: counts list}, rows used, position after the last line read),
+    where the position is None if no complete line starts in this chunk."""
+
+    csv_filename, start, end, columns, pitcher_keys, hold_partial = chunk
+    counts = {}
+    rows_used = 0
+    position = [None]
+
+    with open(csv_filename, 'rb') as infile:
+        # Move to the first line that starts in this chunk
+        infile.seek(start - 1)
+        if infile.read(1) != b'\n':
+            infile.readline()
+
+        for row in csv.reader(read_complete_lines(infile, end, position, hold_partial)):
+            if len(row) < len(columns):
+                continue
+            key = pitcher_key_from_statcast(row[columns['player_name']])
+            if pitcher_keys is not None and key not in pitcher_keys:
+                continue
+            index = row_count_index(row, columns)
+            if index is None:
+                continue
+            if key not in counts:
+                counts[key] = [0] * counts_size
+            counts[key][index] += 1
+            rows_used += 1
+
+    return counts, rows_used, position[0]
+
+def counts_to_popz(counts):
+    """Convert a pitcher's counts list to a POPZ dictionary. Each value is the percentage
+    of all this pitcher's pitches, to 2 decimals like hand-entered tables, and outcomes
+    that happened are kept at 0.01% or more. A zone where a pitch type was never thrown
+    uses that pitch type's outcome mix over all zones, since Pitcher.pitch() normalizes
+    each zone on its own. Pitch types never thrown are all zeros."""
+
+    total = sum(counts)
+    popz = {}
+    for p, pitch_type in enumerate(pitch_types):
+        type_start = p * len(pitch_zones) * len(pitch_outcomes)
+        type_counts = [sum(counts[type_start + z * len(pitch_outcomes) + o] for z in range(len(pitch_zones)))
+                        for o in range(len(pitch_outcomes))]
+
+        pitch_type_dict = {}
+        for z, zone in enumerate(pitch_zones):
+            zone_counts = counts[type_start + z * len(pitch_outcomes):type_start + (z + 1) * len(pitch_outcomes)]
+            if sum(zone_counts) == 0:
+                zone_counts = type_counts
+
+            zone_dict = {}
+            for outcome, count in zip(pitch_outcomes, zone_counts):
+                prob = round(100 * count / total, 2) if total > 0 else 0.0
+                if count > 0 and prob == 0.0:
+                    prob = 0.01
+                zone_dict[outcome] = prob
+            pitch_type_dict[zone] = zone_dict
+        popz[pitch_type] = pitch_type_dict
+    return popz
+
+def ingest_statcast_csv(csv_filename, output_dir=popz_json_filepath, incremental=False, state_filename=None,
+                        workers=None, pitcher_keys=None, chunk_size=default_chunk_size):
+    """This function reads a Statcast CSV and writes a POPZ JSON file per pitcher.
+    output_dir = where POPZ files are written, data/popz/ by default
+    incremental = fold only rows appended since the last incremental run into the saved counts
+    state_filename = where counts and the CSV position are saved, <csv_filename>.popz_state.json by default
+    workers = worker processes, os.cpu_count() by default (1 reads in this process)
+    pitcher_keys = optional collection of pitchers to keep, e.g. {'clayton_kershaw'}
+    It returns a dictionary with the number of rows used and the pitchers written."""
+
+    if state_filename is None:
+        state_filename = csv_filename + '.popz_state.json'
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if pitcher_keys is not None:
+        pitcher_keys = set(pitcher_keys)
+
+    # Read the header to find the columns
+    with open(csv_filename, 'rb') as infile:
+        header_line = infile.readline()
+        header = next(csv.reader([header_line.decode('utf-8-sig')]))
+        data_start = infile.tell()
+    columns = {name: header.index(name) for name in ('player_name', 'pitch_type', 'zone', 'description', 'events')}
+
+    # Start from the saved position if the CSV has only been appended to since then
+    counts = {}
+    start = data_start
+    file_size = os.path.getsize(csv_filename)
+    if incremental and os.path.exists(state_filename):
+        with open(state_filename, 'r') as infile:
+            state = json.load(infile)
+        if state['header'] == header and state['position'] <= file_size:
+            counts = state['counts']
+            start = state['position']
+
+    # Split the unread part of the CSV into byte-range chunks
+    n_chunks = max(workers, (file_size - start) // chunk_size + 1)
+    bounds = [start + (file_size - start) * i // n_chunks for i in range(n_chunks + 1)]
+    # Only incremental runs hold back an unterminated last line, which may still be being appended
+    chunks = [(csv_filename, bounds[i], bounds[i + 1], columns, pitcher_keys, incremental) for i in range(n_chunks)]
+
+    if workers == 1:
+        results = [count_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(count_chunk, chunks))
+
+    # Fold the chunk counts into the running counts
+    rows_used = 0
+    updated = set()
+    position = start
+    for chunk_counts, chunk_rows, chunk_position in results:
+        rows_used += chunk_rows
+        if chunk_position is not None:
+            position = max(position, chunk_position)
+        for key, key_counts in chunk_counts.items():
+            if key not in counts:
+                counts[key] = [0] * counts_size
+            counts[key] = [a + b for a, b in zip(counts[key], key_counts)]
+            updated.add(key)
+
+    # Write the POPZ tables of the pitchers with new rows
+    os.makedirs(output_dir, exist_ok=True)
+    for key in sorted(updated):
+        with open(os.path.join(output_dir, key + '.json'), 'w+') as outfile:
+            json.dump(counts_to_popz(counts[key]), outfile)
+
+    # Save the counts and position for the next incremental run
+    if incremental:
+        with open(state_filename + '.tmp', 'w') as outfile:
+            json.dump({'header': header, 'position': position, 'counts': counts}, outfile)
+        os.replace(state_filename + '.tmp', state_filename)
+
+    return {'rows': rows_used, 'pitchers': sorted(updated)}
+
+
+
+
+# -------------------- Command Line Access -------------------- #
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Build POPZ tables from a Statcast pitch-level CSV export.')
+    parser.add_argument('csv_filename', help='Statcast CSV file')
+    parser.add_argument('--output-dir', default=popz_json_filepath, help='directory for POPZ JSON files')
+    parser.add_argument('--incremental', action='store_true', help='only read rows appended since the last run')
+    parser.add_argument('--state', default=None, help='incremental state file')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--pitcher', action='append', default=None,
+                        help='only keep this pitcher, e.g. clayton_kershaw (can be repeated)')
+    args = parser.parse_args()
+
+    result = ingest_statcast_csv(args.csv_filename, args.output_dir, args.incremental, args.state,
+                                args.workers, args.pitcher)
+    print(f"Read {result['rows']} pitches and wrote {len(result['pitchers'])} POPZ tables to {args.output_dir}")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+"""This file runs a StrikeZone Arcade '21 game server, so many players
+can play at once from one process, each over their own TCP connection.
+For example:
+    python3 server.py --port 2121 --max-sessions 300
+Players connect with a terminal client such as: telnet localhost 2121"""
+
+
+# -------------------- Import Modules -------------------- #
+import argparse
+import asyncio
+
+from game_structure.gameserver import GameServer, ServerLeaderboard
+from game_structure.gameserver import default_host, default_port, default_max_sessions, default_idle_timeout
+from game_structure.pitcheventstore import PitchEventStore
+from game_structure.leaderboard import leaderboard_filename
+from game_structure.renderer import default_screen_rows
+
+
+
+# -------------------- Command Line Access -------------------- #
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Host StrikeZone Arcade '21 games for many players at once.")
+    parser.add_argument('--host', default=default_host, help=f'address to listen on (default: {default_host})')
+    parser.add_argument('--port', type=int, default=default_port, help=f'port to listen on (default: {default_port})')
+    parser.add_argument('--max-sessions', type=int, default=default_max_sessions, help='most players at once')
+    parser.add_argument('--pacing', default='normal', help="starting game speed: 'normal', 'fast', 'instant' or a scale")
+    parser.add_argument('--idle-timeout', type=float, default=default_idle_timeout,
+                        help='seconds a player may take to answer before being disconnected')
+    parser.add_argument('--screen-rows', type=int, default=default_screen_rows,
+                        help=f"height of the players' terminals, for fitting the at bat screen (default: {default_screen_rows})")
+    parser.add_argument('--events', default=None, help='pitch event file to append every pitch to')
+    parser.add_argument('--leaderboard', default=leaderboard_filename,
+                        help=f'leaderboard database finished games are added to (default: {leaderboard_filename})')
+    parser.add_argument('--no-leaderboard', action='store_true', help='do not keep a leaderboard')
+    args = parser.parse_args()
+
+    event_store = PitchEventStore(args.events) if args.events is not None else None
+    leaderboard = ServerLeaderboard(args.leaderboard) if not args.no_leaderboard else None
+    game_server = GameServer(args.host, args.port, args.max_sessions, args.pacing, args.idle_timeout, event_store,
+                            leaderboard, args.screen_rows)
+
+    async def main():
+        await game_server.start()
+        print(f"Serving StrikeZone Arcade '21 on {args.host}:{args.port} (Ctrl+C to stop)")
+        await game_server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print()
+        print("Server stopped.")
+    finally:
+        game_server.close()
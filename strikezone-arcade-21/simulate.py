@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+"""This file runs headless simulations of StrikeZone Arcade '21 games
+from the command line, spread across multiple processes. For example:
+    python3 simulate.py --games 100000 --seed 7 --workers 32
+The same seed always gives the same totals, whatever the number of workers."""
+
+
+# -------------------- Import Modules -------------------- #
+import argparse
+import time
+
+from game_structure.simulationrunner import run_simulations, default_shard_size
+from game_structure.leaderboard import leaderboard_filename
+
+
+
+# -------------------- Command Line Access -------------------- #
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Simulate StrikeZone Arcade '21 games without user input.")
+    parser.add_argument('--games', type=int, default=1000, help='number of games to simulate')
+    parser.add_argument('--seed', type=int, default=0, help='base random seed')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--pitcher', default='Clayton Kershaw', help='pitcher name, e.g. "Clayton Kershaw"')
+    parser.add_argument('--team', default='Seattle Mariners', help='opposing team, e.g. "Seattle Mariners"')
+    parser.add_argument('--policy', default='random', help="'random', 'optimal' or a pitch command such as F5")
+    parser.add_argument('--max-batters', type=int, default=None, help='cap on batters faced per game')
+    parser.add_argument('--shard-size', type=int, default=default_shard_size, help='games per shard')
+    parser.add_argument('--events', default=None, help='directory to keep every pitch in, one event file per shard')
+    parser.add_argument('--leaderboard', nargs='?', default=None, const=leaderboard_filename,
+                        help=f'add every game to a leaderboard database (default file: {leaderboard_filename})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = run_simulations(args.pitcher, args.team, args.games, args.seed, args.workers,
+                                args.policy, args.max_batters, args.shard_size, args.events, args.leaderboard)
+    elapsed = time.perf_counter() - start
+
+    # Report the results
+    print(f"Simulated {summary['games']} games as {args.pitcher} against the {args.team} in {elapsed:.2f}s")
+    if summary['games'] > 0:
+        print(f"Average score: {summary['total_score'] / summary['games']:.1f} "
+                f"(min {summary['min_score']}, max {summary['max_score']})")
+        print(f"Average batters faced: {summary['batters_faced'] / summary['games']:.2f}")
+        print()
+        print("Plate Appearance outcomes:")
+        for outcome, count in summary['outcomes'].items():
+            print(f"    {outcome}: {count} ({100 * count / max(1, summary['batters_faced']):.2f}%)")
+    if args.events is not None:
+        print()
+        print(f"Pitch events written to {args.events}")
+    if args.leaderboard is not None:
+        print()
+        print(f"Games added to the leaderboard {args.leaderboard}")